@@ -1,21 +1,35 @@
 # app_web.py
 
 import streamlit as st
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from langchain_core.messages import HumanMessage
 
 from utils.logs import logger
+from utils.deadline import criar_deadline
+from utils.tracing import Rastro, ativar
+from utils.profiler import PERFIS_CPU_DIR_PADRAO, Perfilador
+from utils.agendador import agendador
+from utils.custos import MODELOS_PADRAO, livro_custos
+from utils.transporte import cliente_httpx
 from rag.pipeline import HybridRAGPipeline
+from rag.adaptive import PoliticaProfundidade
+from rag.dedup import Deduplicador
+from rag.federado import ler_colecoes
 from rag.qdrant import QdrantRetriever
+from rag.rerank_vector import VectorReranker
+from rag.rerank_llm import LLMJudgeReranker
 from rag.web import WebSearch
 from graph.builder import build_graph
-
-from langfuse import Langfuse
+from graph.consulta import ConsultasCompartilhadas
+from services.warmup import Aquecimento
+from services.perfil_store import PERFIS_DB_PADRAO, PerfilStore
+from services.auditoria import AUDITORIA_DIR_PADRAO, AuditoriaConsultas
 
 # Components UI
 from components.perfil_select import selecionar_perfil
 from components.perfil_form import editar_perfil_form
 from components.perfil_upload import upload_perfil_json
+from components.perfil_import import importar_perfis_lote
+from components.chat_history import JANELA_PADRAO, adicionar_mensagem, renderizar_historico, sanitizar_novas
 
 
 # ===========================
@@ -25,25 +39,183 @@ st.set_page_config(page_title="Consultor Fiscal IA", page_icon="💼")
 st.title("💼 Assistente Fiscal Inteligente")
 
 
+# ===========================
+# Inicializar backends (uma vez por processo)
+# ===========================
+@st.cache_resource(show_spinner=False)
+def inicializar_backends():
+    """
+    Cria LLM, RAG, Web Search, Langfuse e o grafo uma única vez por processo
+    (reruns do Streamlit reutilizam os mesmos objetos) e dispara o aquecimento
+    do CrossEncoder e das conexões em background.
+    """
+    # Imports pesados adiados para cá: não pesam a cada rerun do script
+    from langchain_openai import ChatOpenAI
+    from langfuse import Langfuse
+
+    # Um modelo por etapa; cada chamada vai ao razão de custos (utils/custos.py)
+    modelo_juiz = st.secrets.get("MODELO_JUIZ", MODELOS_PADRAO["rag.llm_judge"])
+    modelo_final = st.secrets.get("MODELO_FINAL", MODELOS_PADRAO["generate_final"])
+    modelo_embedding = st.secrets.get("MODELO_EMBEDDING", MODELOS_PADRAO["embedding"])
+
+    # Chat e embeddings compartilham um pool keep‑alive; o SDK repete 429/5xx com backoff
+    openai_http = cliente_httpx("openai", timeout=60)
+    llm = ChatOpenAI(
+        model=modelo_final,
+        api_key=st.secrets["OPENAI_API_KEY"],
+        temperature=0.1,
+        stream_usage=True,
+        http_client=openai_http,
+        timeout=60,
+        max_retries=3,
+    )
+    llm_juiz = ChatOpenAI(
+        model=modelo_juiz,
+        api_key=st.secrets["OPENAI_API_KEY"],
+        temperature=0.1,
+        http_client=openai_http,
+        timeout=30,
+        max_retries=3,
+    )
+
+    retriever = QdrantRetriever(
+        url=st.secrets["QDRANT_URL"],
+        api_key=st.secrets["QDRANT_API_KEY"],
+        collection=st.secrets.get("QDRANT_COLECAO", "leis_fiscais_v1"),
+        embedding_model=modelo_embedding,
+        openai_key=st.secrets["OPENAI_API_KEY"],
+        prefer_grpc=bool(st.secrets.get("QDRANT_PREFER_GRPC", False)),
+    ).ativar_coalescencia(janela_ms=5)
+    # Busca federada: coleções extras (soluções de consulta, FAQs...) em paralelo
+    colecoes_extras = ler_colecoes(st.secrets.get("QDRANT_COLECOES_EXTRAS", ""))
+    if colecoes_extras:
+        retriever.ativar_federacao(colecoes_extras, fusao=st.secrets.get("QDRANT_FUSAO", "rrf"))
+    # Busca em dois estágios (coleção ingerida com o vetor "curto")
+    retriever.dim_curta = int(st.secrets.get("QDRANT_DIM_CURTA", 0)) or None
+    # Buscas só de ids, com texto/metadados do armazém local de chunks
+    if st.secrets.get("CHUNKS_DIR"):
+        retriever.usar_armazem(st.secrets["CHUNKS_DIR"])
+
+    rag_pipeline = HybridRAGPipeline(
+        qdrant_retriever=retriever,
+        llm=llm_juiz,
+        llm_reranker=LLMJudgeReranker(llm_juiz),
+        vector_top_k=6,
+        final_top_k=4,
+        politica_profundidade=PoliticaProfundidade(),
+        deduplicador=Deduplicador(),
+        # Um CrossEncoder por processo, compartilhado entre sessões em micro‑lotes
+        vector_reranker=VectorReranker().ativar_microlotes(max_lote=64, max_espera_ms=5),
+    )
+
+    # Razão de custos por dentro do hedge (mesma ordem das ferramentas em tools/)
+    from services.montagem import aplicar_hedging, contabilizar
+
+    llm = contabilizar(
+        llm, rag_pipeline,
+        {"generate_final": modelo_final, "rag.llm_judge": modelo_juiz, "embedding": modelo_embedding},
+    )
+    # Hedge opcional (HEDGE_PERCENTIL > 0): duplica chamadas idempotentes lentas
+    hedge_percentil = float(st.secrets.get("HEDGE_PERCENTIL", 0))
+    if hedge_percentil:
+        aplicar_hedging(rag_pipeline, hedge_percentil, float(st.secrets.get("HEDGE_MAX_EXTRA", 0.05)))
+
+    # Agendador de prioridades (AGENDADOR_OPENAI_CONCORRENCIA > 0): as sessões
+    # (interativas) passam à frente de lotes rodando no mesmo processo
+    concorrencia_openai = int(st.secrets.get("AGENDADOR_OPENAI_CONCORRENCIA", 0))
+    if concorrencia_openai:
+        from services.montagem import aplicar_agendador
+
+        agendador.registrar(
+            "openai", taxa=float(st.secrets.get("AGENDADOR_OPENAI_RPS", 0)) or None, concorrencia=concorrencia_openai,
+        )
+        agendador.registrar("rerank", concorrencia=int(st.secrets.get("AGENDADOR_RERANK_CONCORRENCIA", 2)))
+        llm = aplicar_agendador(llm, rag_pipeline, agendador)
+
+    # Cache persistente de consultas (CACHE_CONSULTAS_DB), aquecido offline por
+    # tools/aquecer_cache.py; respostas finais só com CACHE_RESPOSTAS
+    cache_respostas = None
+    if st.secrets.get("CACHE_CONSULTAS_DB"):
+        from services.montagem import aplicar_cache
+        from utils.cache import CachePersistente
+
+        cache_consultas = CachePersistente(st.secrets["CACHE_CONSULTAS_DB"])
+        aplicar_cache(rag_pipeline, cache_consultas, {"embedding": modelo_embedding, "rag.llm_judge": modelo_juiz})
+        if st.secrets.get("CACHE_RESPOSTAS", False):
+            cache_respostas = cache_consultas
+
+    web_tool = WebSearch(api_key=st.secrets["TAVILY_API_KEY"])
+
+    langfuse = Langfuse(
+        public_key=st.secrets["LANGFUSE_PUBLIC_KEY"],
+        secret_key=st.secrets["LANGFUSE_SECRET_KEY"]
+    )
+
+    # Trilha de auditoria (compliance): gravada fora da thread da requisição
+    auditoria = AuditoriaConsultas(diretorio=st.secrets.get("AUDITORIA_DIR", AUDITORIA_DIR_PADRAO))
+
+    app_graph = build_graph(
+        llm=llm, retriever=rag_pipeline, web_tool=web_tool, auditoria=auditoria, cache_respostas=cache_respostas,
+    )
+
+    # Perguntas idênticas (mesmo perfil) em voo compartilham uma execução do grafo
+    consultas = ConsultasCompartilhadas(app_graph, auditoria=auditoria)
+
+    aquecimento = Aquecimento({
+        "cross_encoder": rag_pipeline.vector_reranker.aquecer,
+        "qdrant_openai": retriever.aquecer,
+    }).iniciar()
+
+    return llm, rag_pipeline, web_tool, langfuse, app_graph, consultas, aquecimento
+
+
+llm, rag_pipeline, web_tool, langfuse, app_graph, consultas, aquecimento = inicializar_backends()
+
+
+@st.cache_resource(show_spinner=False)
+def inicializar_perfis(_embedder, _embedder_lote):
+    """Store de perfis em disco, compartilhado entre as sessões do processo."""
+    return PerfilStore(
+        caminho=st.secrets.get("PERFIS_DB", PERFIS_DB_PADRAO),
+        embedder=_embedder,
+        embedder_lote=_embedder_lote,
+        modelo=st.secrets.get("MODELO_EMBEDDING", MODELOS_PADRAO["embedding"]),
+    )
+
+
+perfis_store = inicializar_perfis(
+    rag_pipeline.retriever.embed_query, rag_pipeline.retriever.embeddings.embed_documents
+)
+usuario = st.query_params.get("usuario", "padrao")
+
+
 # ===========================
 # Sessão: Perfis
 # ===========================
 if "perfis" not in st.session_state:
-    st.session_state.perfis = {}
+    st.session_state.perfis = perfis_store.listar(usuario)
 
 if "perfil_ativo" not in st.session_state:
     st.session_state.perfil_ativo = None
 
 
 with st.sidebar:
+    if aquecimento.pronto:
+        st.caption("🟢 Modelos prontos")
+    else:
+        st.caption("🟡 Aquecendo modelos... a primeira resposta pode demorar mais.")
+
     st.header("🏢 Perfis da Empresa")
-    selecionar_perfil()
+    selecionar_perfil(store=perfis_store, usuario=usuario)
 
     st.subheader("➕ Criar / Editar Perfil")
-    editar_perfil_form()
+    editar_perfil_form(store=perfis_store, usuario=usuario)
 
     st.subheader("📤 Upload JSON do Perfil")
-    upload_perfil_json()
+    upload_perfil_json(store=perfis_store, usuario=usuario)
+
+    st.subheader("📥 Importar Perfis em Lote")
+    importar_perfis_lote(perfis_store, usuario=usuario)
 
 
 # ===========================
@@ -54,94 +226,50 @@ if not st.session_state.perfil_ativo:
     st.stop()
 
 perfil_cliente = st.session_state.perfis[st.session_state.perfil_ativo]
+perfil_artefatos = perfis_store.carregar(usuario, st.session_state.perfil_ativo)
 
 
 # ===========================
-# Histórico
+# Orçamento de latência por consulta (s)
 # ===========================
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-
-if "thread_id" not in st.session_state:
-    st.session_state.thread_id = "thread-1"
-
-
-def sanitize_history():
-    """Converte manualmente mensagens soltas em objetos HumanMessage/AIMessage."""
-    msgs = []
-    for msg in st.session_state.messages:
-        if isinstance(msg, BaseMessage):
-            msgs.append(msg)
-        elif isinstance(msg, dict):  # fallback caso algo tenha vindo em formato sujo
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            if role == "assistant":
-                msgs.append(AIMessage(content=content))
-            else:
-                msgs.append(HumanMessage(content=content))
-    st.session_state.messages = msgs
-
-
-sanitize_history()
+ORCAMENTO_CONSULTA_S = float(st.secrets.get("ORCAMENTO_CONSULTA_S", 25))
 
 
 # ===========================
-# Inicializar LLM
+# Perfilamento opcional (?perfilar=1 na URL ou amostragem por PERFIL_TAXA)
 # ===========================
-llm = ChatOpenAI(
-    model="gpt-4o",
-    api_key=st.secrets["OPENAI_API_KEY"],
-    temperature=0.1
+perfilador = Perfilador(
+    diretorio=st.secrets.get("PERFIS_CPU_DIR", PERFIS_CPU_DIR_PADRAO),
+    taxa=float(st.secrets.get("PERFIL_TAXA", 0)),
+    max_arquivos=int(st.secrets.get("PERFIS_CPU_MAX", 50)),
 )
 
 
 # ===========================
-# Inicializar RAG Híbrido
+# Histórico
 # ===========================
-retriever = QdrantRetriever(
-    url=st.secrets["QDRANT_URL"],
-    api_key=st.secrets["QDRANT_API_KEY"],
-    collection="leis_fiscais_v1",
-    embedding_model="text-embedding-3-small",
-    openai_key=st.secrets["OPENAI_API_KEY"],
-)
-
-rag_pipeline = HybridRAGPipeline(
-    qdrant_retriever=retriever,
-    llm=llm,
-    vector_top_k=6,
-    final_top_k=4,
-)
-
+if "messages" not in st.session_state:
+    st.session_state.messages = []
 
-# ===========================
-# Inicializar Web Search
-# ===========================
-web_tool = WebSearch(api_key=st.secrets["TAVILY_API_KEY"])
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = "thread-1"
 
 
-# ===========================
-# Inicializar Langfuse
-# ===========================
-langfuse = Langfuse(
-    public_key=st.secrets["LANGFUSE_PUBLIC_KEY"],
-    secret_key=st.secrets["LANGFUSE_SECRET_KEY"]
-)
+def sanitize_history():
+    """
+    Converte mensagens soltas (dicts) em HumanMessage/AIMessage. Só as
+    acrescentadas desde a última chamada são processadas (ver components/chat_history.py).
+    """
+    sanitizar_novas(st.session_state)
 
 
-# ===========================
-# Construir Grafo
-# ===========================
-app_graph = build_graph(llm=llm, retriever=rag_pipeline, web_tool=web_tool)
+sanitize_history()
 
 
 # ===========================
-# Exibir histórico
+# Exibir histórico (últimas mensagens; anteriores sob demanda)
 # ===========================
-for msg in st.session_state.messages:
-    role = "assistant" if isinstance(msg, AIMessage) else "user"
-    with st.chat_message(role):
-        st.write(msg.content)
+renderizar_historico(janela=int(st.secrets.get("HISTORICO_JANELA", JANELA_PADRAO)))
 
 
 # ===========================
@@ -156,42 +284,54 @@ user_input = st.chat_input("Digite sua pergunta tributária...")
 if user_input:
     # 1) registrar mensagem
     human_msg = HumanMessage(content=user_input)
-    st.session_state.messages.append(human_msg)
+    adicionar_mensagem(st.session_state, human_msg)
     st.chat_message("user").write(user_input)
 
-    sanitize_history()
-
     # 2) state inicial para LangGraph
     state = {
         "messages": list(st.session_state.messages),  # imutável
         "perfil_cliente": perfil_cliente,
+        "perfil_artefatos": perfil_artefatos,
         "ultima_pergunta": user_input,
+        "deadline": criar_deadline(ORCAMENTO_CONSULTA_S),
     }
+    rastro = Rastro()
 
-    # 3) Execução segura do grafo
+    # 3) Execução segura do grafo (compartilhada com consultas idênticas em voo)
     try:
-        result = app_graph.invoke(
-            state,
-            config={"configurable": {"thread_id": st.session_state.thread_id}},
-        )
-
-        msgs = result.get("messages", [])
-        if not msgs:
-            st.error("Nenhuma resposta foi gerada pelo grafo.")
-            logger.error("Grafo retornou messages vazio!")
-            st.stop()
-
-        ai_msg = msgs[-1]
-
-        st.chat_message("assistant").write(ai_msg.content)
-        st.session_state.messages.append(ai_msg)
-
-        # 4) Log no Langfuse
+        forcar_perfil = st.query_params.get("perfilar") == "1"
+        with ativar(rastro), perfilador.perfilar(rastro.trace_id, forcar=forcar_perfil):
+            voo, lider = consultas.iniciar(
+                state,
+                config={"configurable": {"thread_id": st.session_state.thread_id}},
+            )
+
+            with st.chat_message("assistant"):
+                transmitido = st.write_stream(voo.acompanhar(timeout=ORCAMENTO_CONSULTA_S))
+                result = consultas.aguardar(voo, lider, state, timeout=ORCAMENTO_CONSULTA_S)
+
+                msgs = result.get("messages", [])
+                if not msgs:
+                    st.error("Nenhuma resposta foi gerada pelo grafo.")
+                    logger.error("Grafo retornou messages vazio!")
+                    st.stop()
+
+                ai_msg = msgs[-1]
+                if not transmitido:
+                    st.write(ai_msg.content)
+
+        adicionar_mensagem(st.session_state, ai_msg)
+
+        # 4) Log no Langfuse (tokens e custo estimado por etapa, do razão de custos)
+        custos = livro_custos.consulta(rastro.trace_id)
+        geracao = next((l for l in custos["lancamentos"] if l["etapa"] == "generate_final"), None)
         langfuse.generation(
             name="resposta_final",
-            model="gpt-4o-mini",
+            model=llm.model_name,
             input=user_input,
             output=ai_msg.content,
+            usage={"input": geracao["tokens_entrada"], "output": geracao["tokens_saida"]} if geracao else None,
+            metadata={**rastro.resumo(), "execucao_compartilhada": not lider, "custos": custos},
         )
 
     except Exception as e:
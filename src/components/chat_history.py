@@ -0,0 +1,73 @@
+import time
+
+import streamlit as st
+from langchain_core.messages import AIMessage
+
+from utils.messages import sanitize_messages
+from utils.metrics import metricas
+
+
+# Mensagens exibidas por padrão e carregadas a cada clique em "anteriores"
+JANELA_PADRAO = 20
+
+# Quantas mensagens do início do histórico já estão sanitizadas
+CHAVE_SANITIZADAS = "mensagens_sanitizadas"
+CHAVE_VISIVEIS = "historico_visiveis"
+
+
+def sanitizar_novas(estado) -> int:
+    """
+    Sanitiza (dict → HumanMessage/AIMessage) só as mensagens acrescentadas
+    desde a última passada; o custo por rerun não cresce com o histórico.
+    Retorna quantas mensagens foram processadas.
+    """
+    msgs = estado["messages"]
+    inicio = estado[CHAVE_SANITIZADAS] if CHAVE_SANITIZADAS in estado else 0
+    if inicio > len(msgs):  # histórico substituído ou encurtado
+        inicio = 0
+    novas = len(msgs) - inicio
+    if novas:
+        msgs[inicio:] = sanitize_messages(msgs[inicio:])
+    estado[CHAVE_SANITIZADAS] = len(msgs)
+    return novas
+
+
+def adicionar_mensagem(estado, msg):
+    """Acrescenta `msg` ao histórico já sanitizada (uma vez, no momento da inclusão)."""
+    sanitizar_novas(estado)
+    estado["messages"].extend(sanitize_messages([msg]))
+    estado[CHAVE_SANITIZADAS] = len(estado["messages"])
+
+
+def _carregar_anteriores(janela: int):
+    st.session_state[CHAVE_VISIVEIS] = st.session_state.get(CHAVE_VISIVEIS, janela) + janela
+
+
+def renderizar_historico(janela: int = JANELA_PADRAO) -> float:
+    """
+    Exibe as últimas `janela` mensagens; as anteriores só com o botão
+    "Carregar anteriores" (mais `janela` por clique). Registra o tempo de
+    renderização e o tamanho do histórico (`app.historico.render_s`,
+    `app.historico.mensagens`) e o retorna em segundos.
+    """
+    inicio = time.perf_counter()
+    msgs = st.session_state["messages"]
+    visiveis = st.session_state.get(CHAVE_VISIVEIS, janela)
+    ocultas = max(0, len(msgs) - visiveis)
+
+    if ocultas:
+        st.button(
+            f"⬆️ Carregar {min(janela, ocultas)} mensagens anteriores ({ocultas} ocultas)",
+            key="historico_anteriores",
+            on_click=_carregar_anteriores,
+            args=(janela,),
+        )
+
+    for msg in msgs[ocultas:]:
+        with st.chat_message("assistant" if isinstance(msg, AIMessage) else "user"):
+            st.write(msg.content)
+
+    duracao = time.perf_counter() - inicio
+    metricas.observar("app.historico.render_s", duracao)
+    metricas.definir("app.historico.mensagens", len(msgs))
+    return duracao
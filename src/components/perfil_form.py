@@ -4,7 +4,8 @@ from services.formatters import formatar_cnae, formatar_moeda
 from services.cnae_api import buscar_cnae
 
 
-def editar_perfil_form():
+def editar_perfil_form(store=None, usuario: str = "padrao"):
+    """Com `store` (PerfilStore), o perfil também é persistido com seus artefatos."""
 
     with st.form("form_perfil"):
         nome = st.text_input("Nome da empresa")
@@ -41,5 +42,7 @@ def editar_perfil_form():
 
             st.session_state.perfis[nome_perfil] = perfil
             st.session_state.perfil_ativo = nome_perfil
+            if store is not None:
+                store.salvar(usuario, nome_perfil, perfil)
 
             st.success("Perfil salvo!")
\ No newline at end of file
@@ -0,0 +1,28 @@
+import streamlit as st
+
+from services.cnae_api import tabela_cnae
+from services.perfil_import import importar_perfis
+
+
+def importar_perfis_lote(store, usuario: str = "padrao"):
+    """Importa vários perfis de um CSV/JSONL, com relatório de erros por linha."""
+
+    arquivo = st.file_uploader("Enviar CSV ou JSONL", type=["csv", "jsonl"], key="upload_lote")
+
+    if arquivo and st.button("Importar perfis"):
+        formato = arquivo.name.rsplit(".", 1)[-1]
+        try:
+            conteudo = arquivo.read().decode("utf-8-sig")
+            relatorio = importar_perfis(store, usuario, conteudo, formato, tabela_cnae() or None)
+        except Exception as e:
+            st.error(f"Erro ao importar o arquivo: {e}")
+            return
+
+        st.session_state.perfis.update(store.listar(usuario))
+        st.success(f"{relatorio['importados']} de {relatorio['total']} perfis importados.")
+
+        if relatorio["validacao_cnae"] != "tabela":
+            st.warning("Tabela CNAE indisponível: apenas o formato do CNAE foi validado.")
+        if relatorio["erros"]:
+            st.error(f"{relatorio['linhas_com_erro']} linhas com erro (não importadas):")
+            st.dataframe(relatorio["erros"], use_container_width=True)
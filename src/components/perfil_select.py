@@ -1,7 +1,7 @@
 import streamlit as st
 
 
-def selecionar_perfil():
+def selecionar_perfil(store=None, usuario: str = "padrao"):
     st.subheader("Selecionar Perfil")
 
     perfis = st.session_state.perfis
@@ -17,6 +17,8 @@ def selecionar_perfil():
 
         if st.button("🗑 Remover perfil selecionado"):
             del st.session_state.perfis[perfil_escolhido]
+            if store is not None:
+                store.remover(usuario, perfil_escolhido)
             st.session_state.perfil_ativo = None
             st.rerun()
 
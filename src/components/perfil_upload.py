@@ -2,17 +2,22 @@ import json
 import streamlit as st
 
 
-def upload_perfil_json():
+def upload_perfil_json(store=None, usuario: str = "padrao"):
 
     arquivo = st.file_uploader("Enviar arquivo JSON", type="json")
 
-    if arquivo:
+    # O arquivo continua no uploader a cada rerun: grava só uma vez por envio
+    # (embedding + SQLite) e não volta a trocar o perfil ativo
+    if arquivo and st.session_state.get("perfil_upload_id") != arquivo.file_id:
+        st.session_state.perfil_upload_id = arquivo.file_id
         try:
             dados = json.loads(arquivo.read().decode("utf-8"))
             nome = dados.get("nome_empresa", f"Perfil {len(st.session_state.perfis)+1}")
 
             st.session_state.perfis[nome] = dados
             st.session_state.perfil_ativo = nome
+            if store is not None:
+                store.salvar(usuario, nome, dados)
 
             st.success(f"Perfil '{nome}' carregado com sucesso!")
 
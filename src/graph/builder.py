@@ -7,27 +7,55 @@ from functools import partial
 from graph.router import node_router
 from graph.nodes import node_rag_qdrant, node_web_search, node_generate_final
 from utils.logs import logger
+from utils.profiler import em_thread_perfilada
 
 
 class GraphState(TypedDict, total=False):
     messages: list
     ultima_pergunta: str
     perfil_cliente: Any
+    perfil_artefatos: dict
     contexto_juridico_bruto: str
     sources_data: list
     rag_ok: bool
+    deadline: float
     __route__: str
 
 
-def build_graph(llm, retriever, web_tool):
+def _perfilado(no):
+    """
+    O LangGraph roda os nós em threads próprias (sempre, em `stream`): cada
+    nó entra no perfil de CPU da consulta ativa (utils/profiler.py).
+    """
+    def executar(state):
+        with em_thread_perfilada():
+            return no(state)
+
+    return executar
+
+
+def build_graph(llm, retriever, web_tool, politica_orcamento=None, auditoria=None, cache_respostas=None):
+    """
+    `politica_orcamento` (PoliticaOrcamento) define quando etapas opcionais
+    são puladas se o state trouxer `deadline`.
+    `auditoria` (AuditoriaConsultas) recebe cada consulta gerada.
+    `cache_respostas` (CachePersistente) guarda e reaproveita respostas finais.
+    """
     logger.info("⛓️ Construindo LangGraph...")
 
     workflow = StateGraph(GraphState)
 
-    workflow.add_node("router", node_router)
-    workflow.add_node("rag_qdrant", partial(node_rag_qdrant, retriever=retriever))
-    workflow.add_node("web_search", partial(node_web_search, web_tool=web_tool))
-    workflow.add_node("generate_final", partial(node_generate_final, llm=llm))
+    workflow.add_node("router", _perfilado(node_router))
+    workflow.add_node("rag_qdrant", _perfilado(partial(node_rag_qdrant, retriever=retriever)))
+    workflow.add_node(
+        "web_search", _perfilado(partial(node_web_search, web_tool=web_tool, politica=politica_orcamento))
+    )
+    workflow.add_node(
+        "generate_final",
+        _perfilado(partial(
+            node_generate_final, llm=llm, politica=politica_orcamento, auditoria=auditoria, cache=cache_respostas,
+        )),
+    )
 
     workflow.set_entry_point("router")
 
@@ -0,0 +1,124 @@
+# graph/consulta.py
+
+import hashlib
+import json
+
+from langchain_core.messages import AIMessageChunk
+
+from mcp_converters import convert_sources
+from protocol import ConsultaContext
+from rag.web import normalizar_consulta
+from utils.custos import livro_custos
+from utils.deadline import restante
+from utils.metrics import metricas
+from utils.singleflight import SingleFlight
+from utils.tracing import etapa, rastro_atual, registrar_decisao
+
+
+def hash_perfil(perfil) -> str:
+    """Hash estável do perfil (dict ou texto), independente da ordem das chaves."""
+    bruto = json.dumps(perfil, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest()[:16]
+
+
+def chave_consulta(pergunta: str, perfil) -> str:
+    return f"{normalizar_consulta(pergunta)}|{hash_perfil(perfil)}"
+
+
+def executar_com_streaming(graph, state: dict, config: dict | None = None, emitir=None, node="generate_final") -> dict:
+    """
+    Executa o grafo via `stream` e repassa a `emitir` os tokens gerados pelo
+    LLM dentro de `node` (a resposta final). Retorna o state final.
+    Só chunks contam: a mensagem completa devolvida pelo node não é reemitida.
+    """
+    final = None
+    for modo, dados in graph.stream(state, config=config, stream_mode=["messages", "values"]):
+        if modo == "values":
+            final = dados
+        elif emitir is not None:
+            chunk, meta = dados
+            if isinstance(chunk, AIMessageChunk) and meta.get("langgraph_node") == node and chunk.content:
+                emitir(chunk.content)
+    return final or {}
+
+
+class ConsultasCompartilhadas:
+    """
+    Single-flight de consultas: execuções simultâneas com a mesma pergunta
+    normalizada e o mesmo perfil compartilham uma única execução do grafo,
+    inclusive os tokens em streaming.
+
+    O histórico não entra na chave — o prompt final usa apenas pergunta,
+    perfil e contexto; cada sessão anexa a resposta ao próprio histórico.
+
+    Cada seguidora continua sendo uma consulta: espera até o próprio
+    deadline e ganha etapa no rastro, lançamento no razão de custos e
+    registro em `auditoria`, todos ligados ao trace_id do líder.
+    """
+
+    def __init__(self, graph, nome: str = "consulta", auditoria=None):
+        self.graph = graph
+        self.auditoria = auditoria
+        self.singleflight = SingleFlight(nome=nome)
+
+    def iniciar(self, state: dict, config: dict | None = None) -> tuple:
+        """Retorna (voo, lider). Tokens em `voo.acompanhar()`, state final em `aguardar()`."""
+        chave = chave_consulta(state.get("ultima_pergunta", ""), state.get("perfil_cliente", ""))
+        rastro = rastro_atual()
+        voo, lider = self.singleflight.iniciar(
+            chave, lambda emitir: executar_com_streaming(self.graph, state, config, emitir),
+            dados={"trace_id": rastro.trace_id if rastro is not None else None},
+        )
+        if not lider:
+            registrar_decisao(
+                "consulta", "compartilhada", participantes=voo.participantes, lider=voo.dados.get("trace_id"),
+            )
+        return voo, lider
+
+    def aguardar(self, voo, lider: bool, state: dict, timeout: float | None = None) -> dict:
+        """
+        State final do voo. A seguidora espera no máximo até o próprio
+        `state["deadline"]` e, concluído o voo, é lançada no razão e na
+        auditoria com `compartilhada_de` = trace do líder (cujo registro
+        traz o prompt mestre).
+        """
+        if lider:
+            return voo.aguardar(timeout)
+
+        prazo = restante(state.get("deadline"))
+        if prazo is not None:
+            timeout = max(0.0, prazo if timeout is None else min(timeout, prazo))
+        with etapa("consulta.compartilhada"):
+            resultado = voo.aguardar(timeout)
+
+        trace_lider = voo.dados.get("trace_id")
+        livro_custos.vincular(trace_lider)
+        if self.auditoria is not None:
+            self._auditar(state, resultado, trace_lider)
+        return resultado
+
+    def _auditar(self, state: dict, resultado: dict, trace_lider: str | None):
+        rastro = rastro_atual()
+        mcp = ConsultaContext(
+            trace_id=rastro.trace_id if rastro is not None else None,
+            perfil_cliente=state.get("perfil_cliente", ""),
+            pergunta_cliente=state.get("ultima_pergunta", ""),
+            contexto_juridico_bruto=resultado.get("contexto_juridico_bruto", ""),
+            fontes_detalhadas=convert_sources(resultado.get("sources_data", [])),
+            prompt_mestre="",
+        )
+        mensagens = resultado.get("messages", [])
+        resposta = mensagens[-1].content if mensagens else ""
+        self.auditoria.registrar(mcp, resposta, compartilhada_de=trace_lider)
+
+    def invoke(self, state: dict, config: dict | None = None, timeout: float | None = None) -> dict:
+        voo, lider = self.iniciar(state, config)
+        return self.aguardar(voo, lider, state, timeout)
+
+    def resumo(self) -> dict:
+        nome = self.singleflight.nome
+        return {
+            "execucoes": metricas.valor(f"{nome}.execucoes"),
+            "colapsadas": metricas.valor(f"{nome}.colapsadas"),
+            "em_voo": self.singleflight.em_voo(),
+        }
@@ -1,14 +1,20 @@
 # graph/nodes.py
 
+import hashlib
+
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from utils.cache import chave_cache
 from utils.logs import logger
+from utils.tracing import etapa, rastro_atual, registrar_decisao
+from utils.deadline import POLITICA_PADRAO, restante
 
 from protocol import ConsultaContext
 from mcp_converters import convert_sources
 from prompts.hierarchy import montar_prompt_mestre
 
-from rag.pipeline import HybridRAGPipeline
-from rag.web import WebSearch
+from rag.pipeline import HybridRAGPipeline, escopo_cache
+from rag.web import WebSearch, normalizar_consulta
+from services.perfil_store import CAMPOS_FILTRO_PADRAO
 
 
 def node_rag_qdrant(state, retriever: HybridRAGPipeline):
@@ -18,9 +24,14 @@ def node_rag_qdrant(state, retriever: HybridRAGPipeline):
     """
     pergunta = state.get("ultima_pergunta", "")
     perfil = state.get("perfil_cliente", "")
+    deadline = state.get("deadline")
+    kwargs = {"deadline": deadline} if deadline is not None else {}
+    if state.get("perfil_artefatos"):
+        kwargs["artefatos_perfil"] = state["perfil_artefatos"]
 
     try:
-        fontes, contexto = retriever.run(pergunta, perfil)
+        with etapa("rag"):
+            fontes, contexto = retriever.run(pergunta, perfil, **kwargs)
         return {
             "contexto_juridico_bruto": contexto or "",
             "sources_data": fontes or [],
@@ -35,14 +46,27 @@ def node_rag_qdrant(state, retriever: HybridRAGPipeline):
         }
 
 
-def node_web_search(state, web_tool: WebSearch):
+def node_web_search(state, web_tool: WebSearch, politica=None):
     """
     WebSearch como fallback (casos que o Router indica WEB ou quando o RAG falha).
+    Com `deadline` no state, é pulado sem orçamento e o prazo da chamada é limitado.
     """
     if state.get("rag_ok"):
         return {}
 
-    result = web_tool.execute(state.get("ultima_pergunta", ""))
+    politica = politica or POLITICA_PADRAO
+    deadline = state.get("deadline")
+    kwargs = {}
+
+    if deadline is not None:
+        falta = restante(deadline)
+        if not politica.permite(deadline, politica.min_web):
+            registrar_decisao("web_search", "pulada", restante_s=round(falta, 3), minimo_s=politica.min_web)
+            return {"contexto_juridico_bruto": "", "sources_data": [], "rag_ok": False}
+        kwargs["timeout"] = max(0.5, falta - politica.reserva_geracao)
+
+    with etapa("web_search"):
+        result = web_tool.execute(state.get("ultima_pergunta", ""), **kwargs)
 
     return {
         "contexto_juridico_bruto": result.get("answer", ""),
@@ -51,21 +75,69 @@ def node_web_search(state, web_tool: WebSearch):
     }
 
 
-def node_generate_final(state, llm):
+def _comprimir_contexto(contexto: str, max_chars: int) -> str:
+    """Mantém blocos inteiros (na ordem de relevância) até `max_chars`."""
+    blocos, total = [], 0
+    for bloco in contexto.split("\n\n"):
+        if total + len(bloco) > max_chars:
+            break
+        blocos.append(bloco)
+        total += len(bloco) + 2
+    return "\n\n".join(blocos) if blocos else contexto[:max_chars]
+
+
+def _resposta_compartilhavel(perfil, artefatos) -> bool:
+    """
+    Com escopo por regime, só perfis sem outros dados (ex.:
+    {"regime_tributario": ...} do aquecedor) leem e gravam respostas no
+    cache: o bloco do perfil personaliza a resposta, que não pode chegar a
+    outras empresas nem ser trocada pela genérica do regime.
+    """
+    if "filtros" not in escopo_cache(perfil, artefatos):
+        return True  # escopo é o próprio perfil
+    return isinstance(perfil, dict) and all(
+        chave in CAMPOS_FILTRO_PADRAO for chave, valor in perfil.items() if valor not in (None, "", [], {})
+    )
+
+
+def node_generate_final(state, llm, politica=None, auditoria=None, cache=None):
     """
     Monta o MCP, aplica o Prompt Hierárquico SOP e gera a resposta final.
+    Com pouco orçamento restante, o contexto é comprimido antes da geração.
+    Com `auditoria` (AuditoriaConsultas), o MCP e a resposta são enfileirados
+    para a trilha de auditoria.
+    Com `cache` (CachePersistente), a resposta é reaproveitada pela pergunta,
+    pelo escopo do perfil (regime, ver `escopo_cache`) e pelo contexto; só é
+    lida e gravada quando o perfil não traz dados além do escopo — um perfil
+    personalizado nunca recebe a resposta genérica do regime.
     """
     pergunta = state.get("ultima_pergunta", "")
     perfil = state.get("perfil_cliente", "")
+    artefatos = state.get("perfil_artefatos") or {}
     contexto = state.get("contexto_juridico_bruto", "")
     fontes_raw = state.get("sources_data", [])
     historico = list(state.get("messages", []))
 
+    politica = politica or POLITICA_PADRAO
+    deadline = state.get("deadline")
+    if (
+        not politica.permite(deadline, politica.min_contexto_completo)
+        and len(contexto) > politica.max_chars_reduzido
+    ):
+        reduzido = _comprimir_contexto(contexto, politica.max_chars_reduzido)
+        registrar_decisao(
+            "generate_final", "contexto_reduzido",
+            restante_s=round(restante(deadline), 3), chars_antes=len(contexto), chars_depois=len(reduzido),
+        )
+        contexto = reduzido
+
     fontes = convert_sources(fontes_raw)
-    prompt_mestre = montar_prompt_mestre(pergunta, perfil, contexto, fontes)
+    # Bloco do perfil pré‑calculado no PerfilStore, quando disponível
+    prompt_mestre = montar_prompt_mestre(pergunta, artefatos.get("bloco_prompt") or perfil, contexto, fontes)
 
+    rastro = rastro_atual()
     mcp = ConsultaContext(
-        trace_id=None,
+        trace_id=rastro.trace_id if rastro is not None else None,
         perfil_cliente=perfil,
         pergunta_cliente=pergunta,
         contexto_juridico_bruto=contexto,
@@ -73,11 +145,30 @@ def node_generate_final(state, llm):
         prompt_mestre=prompt_mestre,
     )
 
-    resposta = llm.invoke([
-        SystemMessage(content=mcp.prompt_mestre),
-        HumanMessage(content="Gere a resposta final seguindo estritamente as instruções.")
-    ])
-
-    historico.append(AIMessage(content=resposta.content))
+    chave, conteudo = None, None
+    if cache is not None and _resposta_compartilhavel(perfil, artefatos):
+        chave = chave_cache(
+            normalizar_consulta(pergunta),
+            escopo_cache(perfil, artefatos),
+            hashlib.sha1(contexto.encode("utf-8")).hexdigest(),
+        )
+        conteudo = cache.obter("generate_final", chave)
+
+    with etapa("generate_final"):
+        if conteudo is not None:
+            registrar_decisao("generate_final", "em_cache")
+        else:
+            resposta = llm.invoke([
+                SystemMessage(content=mcp.prompt_mestre),
+                HumanMessage(content="Gere a resposta final seguindo estritamente as instruções.")
+            ])
+            conteudo = resposta.content
+            if chave is not None and conteudo.strip():
+                cache.gravar("generate_final", chave, conteudo)
+
+    if auditoria is not None:
+        auditoria.registrar(mcp, conteudo)
+
+    historico.append(AIMessage(content=conteudo))
 
     return {"messages": historico}
\ No newline at end of file
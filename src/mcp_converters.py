@@ -16,6 +16,7 @@ def convert_sources(sources_raw: List[Dict]) -> List[FonteDocumento]:
                 chunk_index=src.get("chunk_index"),
                 page_number=src.get("page"),
                 url=src.get("url"),
+                collection=src.get("collection"),
             )
         )
 
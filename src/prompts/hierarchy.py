@@ -7,7 +7,7 @@ def montar_prompt_mestre(pergunta: str, perfil: str, contexto: str, fontes: list
     """
 
     fontes_texto = "\n".join(
-        f"- {f.document_source} ({f.document_type})"
+        f"- {f.document_source} ({f.document_type}{f', {f.collection}' if f.collection else ''})"
         for f in fontes
     )
 
@@ -11,6 +11,7 @@ class FonteDocumento(BaseModel):
     chunk_index: Optional[int] = None
     page_number: Optional[int] = None
     url: Optional[str] = None
+    collection: Optional[str] = Field(None, description="Coleção de origem no Qdrant (busca federada).")
 
 
 class ConsultaContext(BaseModel):
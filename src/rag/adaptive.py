@@ -0,0 +1,89 @@
+# rag/adaptive.py
+
+from utils.metrics import metricas
+
+
+def _maior_gap(scores: list, inicio: int) -> tuple:
+    """(posição de corte, tamanho) da maior queda entre scores[i] e scores[i+1], i >= inicio."""
+    corte, gap = len(scores), 0.0
+    for i in range(max(0, inicio), len(scores) - 1):
+        queda = scores[i] - scores[i + 1]
+        if queda > gap:
+            corte, gap = i + 1, queda
+    return corte, gap
+
+
+class PoliticaProfundidade:
+    """
+    Profundidade adaptativa do RAG a partir da distribuição de scores.
+
+    Qdrant (cosseno):
+    - busca `limite_inicial` candidatos;
+    - se há uma queda >= `gap_qdrant` depois de `limite_min` posições, corta ali
+      (menos pares para o CrossEncoder);
+    - se os scores estão "achatados" (topo - último < `spread_expandir`) e a
+      busca veio cheia, refaz a busca com `limite_max`.
+
+    CrossEncoder (logits):
+    - dispensa o LLM‑as‑Judge quando o k‑ésimo selecionado supera o próximo
+      por pelo menos `gap_juiz` e tem score >= `score_min_juiz`, ou quando
+      não há candidatos além de k (o juiz só reordenaria os mesmos docs).
+    """
+
+    def __init__(
+        self,
+        limite_inicial: int = 12,
+        limite_min: int = 6,
+        limite_max: int = 24,
+        gap_qdrant: float = 0.05,
+        spread_expandir: float = 0.03,
+        gap_juiz: float = 3.0,
+        score_min_juiz: float = 0.0,
+    ):
+        self.limite_inicial = limite_inicial
+        self.limite_min = limite_min
+        self.limite_max = limite_max
+        self.gap_qdrant = gap_qdrant
+        self.spread_expandir = spread_expandir
+        self.gap_juiz = gap_juiz
+        self.score_min_juiz = score_min_juiz
+
+    def deve_expandir(self, docs: list, limite_usado: int) -> bool:
+        scores = [d.get("score") for d in docs]
+        if None in scores or len(docs) < limite_usado or limite_usado >= self.limite_max:
+            return False
+        return scores[0] - scores[-1] < self.spread_expandir
+
+    def cortar_candidatos(self, docs: list) -> list:
+        scores = [d.get("score") for d in docs]
+        if None in scores or len(docs) <= self.limite_min:
+            return docs
+        if scores != sorted(scores, reverse=True):
+            return docs  # reordenados (ex.: MMR): o gap perde o sentido
+        corte, gap = _maior_gap(scores, self.limite_min - 1)
+        return docs[:corte] if gap >= self.gap_qdrant else docs
+
+    def juiz_dispensavel(self, docs: list, top_k: int) -> bool:
+        if len(docs) <= top_k:
+            return True
+        scores = [d.get("score_vetorial") for d in docs]
+        if None in scores[:top_k + 1]:
+            return False
+        return (
+            scores[top_k - 1] - scores[top_k] >= self.gap_juiz
+            and scores[top_k - 1] >= self.score_min_juiz
+        )
+
+
+def resumo_profundidade() -> dict:
+    """Fração de consultas sem LLM‑as‑Judge e latência estimada economizada."""
+    pulados = metricas.valor("rag.juiz_pulado")
+    executados = metricas.valor("rag.juiz_executado")
+    total = pulados + executados
+    return {
+        "consultas": total,
+        "fracao_juiz_pulado": round(pulados / total, 4) if total else 0.0,
+        "economia_estimada_s": round(metricas.valor("rag.juiz_economia_s"), 3),
+        "candidatos_cortados": metricas.valor("rag.candidatos_cortados"),
+        "buscas_expandidas": metricas.valor("rag.busca_expandida"),
+    }
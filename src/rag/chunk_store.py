@@ -0,0 +1,203 @@
+# rag/chunk_store.py
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+from utils.logs import logger
+
+
+# Arquivos do armazém: índice de posições + blob de textos/metadados da
+# geração apontada pelo índice (cada ingestão grava um blob novo)
+ARQUIVO_INDICE = "indice.bin"
+_BLOB = re.compile(r"^chunks-(\d+)\.bin$")
+
+_MAGICO = b"CHK2"
+_CABECALHO = struct.Struct("<4sIQ")  # mágico, nº de entradas, geração do blob
+_ENTRADA = struct.Struct("<QII")     # offset no blob, bytes do texto, bytes dos metadados
+_VAZIA = (0, 0, 0)
+
+
+def _arquivo_blob(geracao: int) -> str:
+    return f"chunks-{geracao}.bin"
+
+
+def _posicao(id) -> int:
+    """Posição do id no índice: só ids inteiros (não UUIDs) do Qdrant são endereçáveis."""
+    if isinstance(id, bool) or not isinstance(id, int):
+        raise ValueError(
+            f"Armazém de chunks exige ids inteiros dos pontos do Qdrant (recebido {id!r}); "
+            "reingira a coleção com tools.ingerir ou desligue o armazém (CHUNKS_DIR)"
+        )
+    return id
+
+
+class EscritorChunks:
+    """
+    Grava o armazém de chunks na ingestão (ver rag/ingest.py). Para cada id
+    (inteiro, o mesmo do ponto no Qdrant): texto UTF‑8 seguido dos metadados
+    em JSON no blob; o índice guarda (offset, bytes do texto, bytes dos
+    metadados) na posição `id`. Ids ausentes ficam com entrada vazia.
+
+    O blob vai para um arquivo novo (`chunks-<geração>.bin`) e o índice é
+    trocado atomicamente no fim: leitores abertos nunca veem arquivos sendo
+    regravados e passam à geração nova em `ArmazemChunks.recarregar`.
+    """
+
+    def __init__(self, diretorio: str):
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self.geracao = time.time_ns()
+        self._blob = open(os.path.join(diretorio, _arquivo_blob(self.geracao)), "wb")
+        self._entradas = {}
+        self._offset = 0
+
+    def adicionar(self, id: int, payload: dict):
+        meta = {k: v for k, v in payload.items() if k != "page_content"}
+        texto = (payload.get("page_content") or "").encode("utf-8")
+        dados = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._blob.write(texto)
+        self._blob.write(dados)
+        self._entradas[_posicao(id)] = (self._offset, len(texto), len(dados))
+        self._offset += len(texto) + len(dados)
+
+    def fechar(self):
+        """Grava o índice; o armazém só é legível depois disto."""
+        self._blob.close()
+        total = max(self._entradas) + 1 if self._entradas else 0
+        caminho = os.path.join(self.diretorio, ARQUIVO_INDICE)
+        with open(caminho + ".tmp", "wb") as f:
+            f.write(_CABECALHO.pack(_MAGICO, total, self.geracao))
+            for i in range(total):
+                f.write(_ENTRADA.pack(*self._entradas.get(i, _VAZIA)))
+        os.replace(caminho + ".tmp", caminho)  # leitores nunca veem índice pela metade
+
+        # Blobs de gerações anteriores: mapas já abertos continuam válidos após a remoção
+        for nome in os.listdir(self.diretorio):
+            if _BLOB.match(nome) and nome != _arquivo_blob(self.geracao):
+                try:
+                    os.remove(os.path.join(self.diretorio, nome))
+                except OSError:
+                    pass
+        logger.info(f"📦 Armazém de chunks: {len(self._entradas)} chunks, {self._offset / 1e6:.1f} MB em {self.diretorio}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+class ArmazemChunks:
+    """
+    Leitura do armazém por id, com índice e blob mapeados em memória (mmap):
+    nada é carregado no início e o texto de um chunk é uma fatia do mapa
+    (`texto_bruto`, sem cópia) até ser decodificado. `payload` decodifica de
+    propósito: o texto de cada candidato segue como str para CrossEncoder,
+    juiz e prompt — a economia está em ler só os ids retornados, sem
+    payloads na resposta do Qdrant nem corpus em memória.
+
+    Ids são as posições no índice: coleções com ids UUID não são suportadas
+    (ValueError; ver `QdrantRetriever.usar_armazem`).
+
+    Uma nova ingestão no mesmo diretório é adotada por `recarregar` (checada
+    a cada `intervalo_s` por `atualizar`); os mapas antigos não são fechados
+    na troca, só liberados quando nenhuma leitura os usa mais.
+    """
+
+    def __init__(self, diretorio: str, intervalo_s: float = 5.0):
+        self.diretorio = diretorio
+        self.intervalo_s = intervalo_s
+        self._lock = threading.Lock()
+        self._estado = self._abrir()
+        self._verificado_em = time.monotonic()
+
+    @staticmethod
+    def _mapear(caminho: str):
+        with open(caminho, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _assinatura(self):
+        st = os.stat(os.path.join(self.diretorio, ARQUIVO_INDICE))
+        return st.st_ino, st.st_mtime_ns
+
+    def _abrir(self) -> tuple:
+        """(assinatura do índice, índice, blob, nº de entradas) da geração publicada."""
+        for tentativa in range(3):
+            assinatura = self._assinatura()
+            indice = self._mapear(os.path.join(self.diretorio, ARQUIVO_INDICE))
+            if len(indice) < _CABECALHO.size:
+                raise ValueError(f"Índice de chunks inválido em {self.diretorio}")
+            magico, total, geracao = _CABECALHO.unpack_from(indice, 0)
+            if magico != _MAGICO:
+                raise ValueError(f"Índice de chunks inválido em {self.diretorio}")
+            try:
+                blob = self._mapear(os.path.join(self.diretorio, _arquivo_blob(geracao)))
+            except FileNotFoundError:
+                # Índice trocado (e blob antigo removido) entre as duas aberturas
+                if tentativa == 2:
+                    raise
+                continue
+            return assinatura, indice, blob, total
+
+    def recarregar(self) -> bool:
+        """Adota o índice publicado por outra ingestão, se mudou. Retorna True na troca."""
+        try:
+            if self._assinatura() == self._estado[0]:
+                return False
+        except FileNotFoundError:
+            return False
+        self._estado = self._abrir()
+        logger.info(f"📦 Armazém de chunks recarregado: {self._estado[3]} ids em {self.diretorio}")
+        return True
+
+    def atualizar(self) -> bool:
+        """`recarregar`, no máximo uma vez a cada `intervalo_s`."""
+        with self._lock:
+            agora = time.monotonic()
+            if agora - self._verificado_em < self.intervalo_s:
+                return False
+            self._verificado_em = agora
+            return self.recarregar()
+
+    def __len__(self):
+        return self._estado[3]
+
+    def _entrada(self, id: int):
+        _, indice, blob, total = self._estado
+        if not 0 <= id < total:
+            return None
+        entrada = _ENTRADA.unpack_from(indice, _CABECALHO.size + id * _ENTRADA.size)
+        return None if entrada == _VAZIA else (entrada, blob)
+
+    def __contains__(self, id) -> bool:
+        return self._entrada(_posicao(id)) is not None
+
+    def texto_bruto(self, id: int):
+        """memoryview com os bytes UTF‑8 do texto (sem cópia); None se o id não existe."""
+        achado = self._entrada(_posicao(id))
+        if achado is None:
+            return None
+        (offset, n_texto, _), blob = achado
+        return memoryview(blob)[offset:offset + n_texto]
+
+    def payload(self, id: int) -> dict | None:
+        """{"page_content", **metadados}, como o payload gravado no Qdrant (texto decodificado)."""
+        achado = self._entrada(_posicao(id))
+        if achado is None:
+            return None
+        (offset, n_texto, n_meta), blob = achado
+        meta = json.loads(blob[offset + n_texto:offset + n_texto + n_meta])
+        return {"page_content": blob[offset:offset + n_texto].decode("utf-8"), **meta}
+
+    def fechar(self):
+        _, indice, blob, _ = self._estado
+        for mapa in (indice, blob):
+            if isinstance(mapa, mmap.mmap):
+                mapa.close()
@@ -0,0 +1,54 @@
+# rag/coalescer.py
+
+import threading
+
+from utils.batching import PRAZO_PADRAO_S, MicroBatcher
+from utils.metrics import metricas
+
+
+class EmbeddingCoalescer:
+    """
+    Junta chamadas `embed_query` simultâneas em uma única requisição
+    `embed_documents` (MicroBatcher) e deduplica textos idênticos em voo
+    (single-flight): quem pede um texto que já está sendo calculado
+    apenas aguarda o mesmo Future.
+
+    Expõe a mesma interface de OpenAIEmbeddings (`embed_query`/`embed_documents`).
+    """
+
+    def __init__(self, embeddings, janela_ms: float = 5.0, max_lote: int = 64):
+        self.embeddings = embeddings
+        self._batcher = MicroBatcher(self._embed_lote, max_lote=max_lote, max_espera_ms=janela_ms, nome="embedding")
+        self._em_voo = {}
+        # RLock: o callback pode rodar na própria thread se o Future já terminou
+        self._lock = threading.RLock()
+
+    def _embed_lote(self, textos: list) -> list:
+        unicos = list(dict.fromkeys(textos))
+        metricas.incrementar("embedding.requisicoes")
+        vetores = self.embeddings.embed_documents(unicos)
+        mapa = dict(zip(unicos, vetores))
+        return [mapa[t] for t in textos]
+
+    def _concluir(self, texto: str, futuro):
+        with self._lock:
+            if self._em_voo.get(texto) is futuro:
+                del self._em_voo[texto]
+
+    def embed_query(self, text: str):
+        metricas.incrementar("embedding.chamadas")
+        with self._lock:
+            futuro = self._em_voo.get(text)
+            if futuro is None:
+                futuro = self._batcher.submeter([text])[0]
+                self._em_voo[text] = futuro
+                futuro.add_done_callback(lambda f, t=text: self._concluir(t, f))
+            else:
+                metricas.incrementar("embedding.deduplicadas")
+        return futuro.result(timeout=PRAZO_PADRAO_S)
+
+    def embed_documents(self, texts: list):
+        return self.embeddings.embed_documents(texts)
+
+    def fechar(self):
+        self._batcher.fechar()
@@ -0,0 +1,151 @@
+# rag/dedup.py
+
+import hashlib
+import math
+import re
+import unicodedata
+
+from utils.logs import logger
+
+
+def _normalizar(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", texto.lower()))
+
+
+def _hash64(texto: str) -> int:
+    return int.from_bytes(hashlib.blake2b(texto.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(texto: str, n: int = 3) -> int:
+    """SimHash de 64 bits sobre shingles de `n` palavras do texto normalizado."""
+    palavras = _normalizar(texto).split()
+    shingles = [" ".join(palavras[i:i + n]) for i in range(max(1, len(palavras) - n + 1))]
+
+    pesos = [0] * 64
+    for sh in shingles:
+        h = _hash64(sh)
+        for bit in range(64):
+            pesos[bit] += 1 if (h >> bit) & 1 else -1
+
+    return sum(1 << bit for bit in range(64) if pesos[bit] > 0)
+
+
+def distancia_hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def cosseno(a: list, b: list) -> float:
+    num = sum(x * y for x, y in zip(a, b))
+    den = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return num / den if den else 0.0
+
+
+class Deduplicador:
+    """
+    Colapsa quase-duplicatas entre os candidatos do Qdrant antes do reranking.
+
+    Sempre remove duplicatas exatas (hash do payload em `campo_hash`, se
+    existir, ou do texto normalizado). Para quase-duplicatas:
+    - metodo="simhash": distância de Hamming <= `limiar_hamming` (64 bits);
+    - metodo="cosseno": similaridade dos vetores armazenados >= `limiar_cosseno`
+      (exige a busca com `with_vectors=True`).
+
+    Os docs devem chegar ordenados por relevância; fica o primeiro de cada grupo,
+    com `duplicatas` = quantos foram absorvidos.
+
+    mmr_lambda (opcional): após colapsar, reordena por MMR
+    (λ·relevância − (1−λ)·similaridade máxima com os já escolhidos).
+    """
+
+    def __init__(
+        self,
+        metodo: str = "simhash",
+        limiar_hamming: int = 3,
+        limiar_cosseno: float = 0.97,
+        campo_hash: str = "content_hash",
+        mmr_lambda: float | None = None,
+    ):
+        if metodo not in ("simhash", "cosseno"):
+            raise ValueError(f"Método de deduplicação inválido: {metodo}")
+        self.metodo = metodo
+        self.limiar_hamming = limiar_hamming
+        self.limiar_cosseno = limiar_cosseno
+        self.campo_hash = campo_hash
+        self.mmr_lambda = mmr_lambda
+
+    @property
+    def precisa_vetores(self) -> bool:
+        return self.metodo == "cosseno"
+
+    def _chave_exata(self, doc: dict):
+        meta = doc.get("metadata") or {}
+        if self.campo_hash and meta.get(self.campo_hash):
+            return meta[self.campo_hash]
+        return hashlib.sha1(_normalizar(doc.get("page_content", "")).encode("utf-8")).hexdigest()
+
+    def _similar(self, a: dict, b: dict) -> bool:
+        if self.metodo == "cosseno":
+            if a.get("vector") is None or b.get("vector") is None:
+                return False
+            return cosseno(a["vector"], b["vector"]) >= self.limiar_cosseno
+        return distancia_hamming(a["_simhash"], b["_simhash"]) <= self.limiar_hamming
+
+    def _similaridade(self, a: dict, b: dict) -> float:
+        if a.get("vector") is not None and b.get("vector") is not None:
+            return cosseno(a["vector"], b["vector"])
+        return 1.0 - distancia_hamming(a["_simhash"], b["_simhash"]) / 64
+
+    def _mmr(self, docs: list) -> list:
+        relevancias = [d.get("score") for d in docs]
+        if None in relevancias:
+            # Sem score, usa a posição como relevância decrescente
+            relevancias = [1.0 - i / len(docs) for i in range(len(docs))]
+
+        restantes = list(range(len(docs)))
+        escolhidos = []
+        while restantes:
+            def valor(i):
+                sim = max((self._similaridade(docs[i], docs[j]) for j in escolhidos), default=0.0)
+                return self.mmr_lambda * relevancias[i] - (1 - self.mmr_lambda) * sim
+
+            melhor = max(restantes, key=valor)
+            escolhidos.append(melhor)
+            restantes.remove(melhor)
+        return [docs[i] for i in escolhidos]
+
+    def deduplicar(self, docs: list) -> list:
+        vistos = set()
+        unicos = []
+
+        for doc in docs:
+            chave = self._chave_exata(doc)
+            if chave in vistos:
+                unicos_dup = next(u for u in unicos if u["_chave"] == chave)
+                unicos_dup["duplicatas"] += 1
+                continue
+
+            candidato = {**doc, "_chave": chave, "duplicatas": 0}
+            if self.metodo == "simhash" or self.mmr_lambda is not None:
+                candidato["_simhash"] = simhash(doc.get("page_content", ""))
+
+            grupo = next((u for u in unicos if self._similar(u, candidato)), None)
+            if grupo is not None:
+                grupo["duplicatas"] += 1
+                continue
+
+            vistos.add(chave)
+            unicos.append(candidato)
+
+        if self.mmr_lambda is not None and len(unicos) > 1:
+            unicos = self._mmr(unicos)
+
+        removidos = len(docs) - len(unicos)
+        if removidos:
+            logger.info(f"🧹 Deduplicação removeu {removidos} de {len(docs)} candidatos.")
+
+        for doc in unicos:
+            doc.pop("_chave", None)
+            doc.pop("_simhash", None)
+        return unicos
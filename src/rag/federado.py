@@ -0,0 +1,113 @@
+# rag/federado.py
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logs import logger
+from utils.metrics import metricas
+from utils.profiler import em_thread_perfilada
+from utils.tracing import etapa
+
+
+# Buscas por coleção de todas as consultas federadas
+_executor_federado = ThreadPoolExecutor(max_workers=32, thread_name_prefix="federado")
+
+FUSOES = ("rrf", "pesos")
+
+
+def ler_colecoes(texto: str) -> dict:
+    """"leis_fiscais_v1:1,solucoes_consulta:0.8,faq_interno" → {nome: peso} (peso padrão 1)."""
+    colecoes = {}
+    for item in (texto or "").split(","):
+        nome, _, peso = item.strip().partition(":")
+        if nome:
+            colecoes[nome] = float(peso) if peso else 1.0
+    return colecoes
+
+
+def fundir_rrf(resultados: dict, pesos: dict, k: int = 60) -> list:
+    """
+    Reciprocal rank fusion ponderada: Σ peso / (k + posição). Não depende da
+    escala dos scores de cada coleção.
+    """
+    fundidos = []
+    for colecao, docs in resultados.items():
+        for posicao, doc in enumerate(docs, start=1):
+            fundidos.append((pesos.get(colecao, 1.0) / (k + posicao), doc))
+    return _ordenar(fundidos)
+
+
+def fundir_pesos(resultados: dict, pesos: dict) -> list:
+    """Score do Qdrant (cosseno, mesma escala em todas as coleções) × peso da coleção."""
+    fundidos = [
+        (pesos.get(colecao, 1.0) * (doc.get("score") or 0.0), doc)
+        for colecao, docs in resultados.items()
+        for doc in docs
+    ]
+    return _ordenar(fundidos)
+
+
+def _ordenar(fundidos: list) -> list:
+    fundidos.sort(key=lambda x: x[0], reverse=True)
+    return [{**doc, "score_fusao": round(score, 6)} for score, doc in fundidos]
+
+
+class BuscaFederada:
+    """
+    Leva o vetor da consulta a várias coleções (leis, soluções de consulta,
+    FAQs...) ao mesmo tempo e funde os rankings por RRF ou por score
+    ponderado. A latência é a da coleção mais lenta, não a soma.
+
+    Cada doc leva a coleção de origem em `metadata["collection"]` (vai para
+    FonteDocumento.collection) e o score fundido em "score_fusao"; "score"
+    continua o do Qdrant, usado pela política de profundidade.
+    Falha em uma coleção só a remove do resultado (métrica
+    `rag.federado.falhas`); se todas falharem, o erro sobe.
+    """
+
+    def __init__(self, colecoes: dict, fusao: str = "rrf", k_rrf: int = 60):
+        if fusao not in FUSOES:
+            raise ValueError(f"Fusão desconhecida: {fusao} (use {', '.join(FUSOES)})")
+        self.colecoes = dict(colecoes)
+        self.fusao = fusao
+        self.k_rrf = k_rrf
+
+    def _buscar_colecao(self, retriever, colecao, vector, limit, kwargs):
+        with em_thread_perfilada(), etapa(f"rag.qdrant.{colecao}"):
+            docs = retriever.buscar(vector, limit, colecao=colecao, **kwargs)
+        for doc in docs:
+            doc["metadata"] = {**doc["metadata"], "collection": colecao}
+        return docs
+
+    def buscar(self, retriever, vector, limit=12, **kwargs) -> list:
+        futuros = {
+            colecao: _executor_federado.submit(
+                contextvars.copy_context().run,
+                self._buscar_colecao, retriever, colecao, vector, limit, kwargs,
+            )
+            for colecao in self.colecoes
+        }
+
+        resultados, erro = {}, None
+        for colecao, futuro in futuros.items():
+            try:
+                resultados[colecao] = futuro.result()
+            except Exception as e:
+                erro = e
+                metricas.incrementar("rag.federado.falhas")
+                logger.error(f"[RAG] Coleção {colecao} indisponível na busca federada: {e}")
+        if not resultados and erro is not None:
+            raise erro
+
+        if self.fusao == "rrf":
+            docs = fundir_rrf(resultados, self.colecoes, self.k_rrf)
+        else:
+            docs = fundir_pesos(resultados, self.colecoes)
+        docs = [{**doc, "index": i} for i, doc in enumerate(docs[:limit])]
+
+        logger.info(
+            f"🔎 Busca federada ({self.fusao}): "
+            + ", ".join(f"{c}={len(d)}" for c, d in resultados.items())
+            + f" → {len(docs)} documentos."
+        )
+        return docs
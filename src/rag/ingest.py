@@ -0,0 +1,92 @@
+# rag/ingest.py
+
+import math
+
+from utils.logs import logger
+
+
+VETOR_COMPLETO = "default"
+VETOR_CURTO = "curto"
+
+
+def truncar(vetor, dim: int) -> list:
+    """
+    Primeiras `dim` coordenadas, renormalizadas. Equivale ao parâmetro
+    `dimensions` dos modelos text-embedding-3 (embeddings "encurtáveis"),
+    sem nova chamada à API.
+    """
+    parte = list(vetor[:dim])
+    norma = math.sqrt(sum(v * v for v in parte)) or 1.0
+    return [v / norma for v in parte]
+
+
+def criar_colecao(client, colecao: str, dim: int, dim_curta: int | None = None, recriar: bool = False):
+    """
+    Coleção com o vetor completo ("default"). Com `dim_curta`, acrescenta o
+    vetor truncado ("curto") indexado em HNSW para o 1º estágio; o completo
+    vai para o disco, sem grafo HNSW (m=0), e só reavalia os candidatos.
+    """
+    from qdrant_client import models
+
+    if recriar and client.collection_exists(colecao):
+        client.delete_collection(colecao)
+
+    if dim_curta:
+        vetores = {
+            VETOR_COMPLETO: models.VectorParams(
+                size=dim, distance=models.Distance.COSINE, on_disk=True,
+                hnsw_config=models.HnswConfigDiff(m=0),
+            ),
+            VETOR_CURTO: models.VectorParams(size=dim_curta, distance=models.Distance.COSINE),
+        }
+    else:
+        vetores = {VETOR_COMPLETO: models.VectorParams(size=dim, distance=models.Distance.COSINE)}
+
+    client.create_collection(colecao, vectors_config=vetores)
+    logger.info(f"🗂️ Coleção {colecao} criada (dim {dim}{f', 1º estágio {dim_curta}' if dim_curta else ''}).")
+
+
+def ingerir(
+    client, colecao: str, chunks: list, embeddings, dim_curta: int | None = None, lote: int = 64,
+    id_inicial: int = 0, armazem=None, texto_no_qdrant: bool = True,
+) -> dict:
+    """
+    Embeda e grava os chunks ({"page_content", "source", "chunk_index", ...}).
+    Ids são inteiros sequenciais a partir de `id_inicial` (posição do chunk).
+    Com `dim_curta`, cada ponto leva também o vetor truncado.
+
+    Com `armazem` (EscritorChunks, ver rag/chunk_store.py), texto e
+    metadados também vão para o armazém local, lido pelo QdrantRetriever em
+    buscas só de ids; `texto_no_qdrant=False` deixa o texto fora do payload do
+    Qdrant (os metadados ficam, para os filtros).
+
+    Retorna pontos gravados e bytes (float32) de cada vetor, para comparar a
+    memória do índice de 1º estágio com a do vetor completo.
+    """
+    from qdrant_client import models
+
+    dim = 0
+    for inicio in range(0, len(chunks), lote):
+        parte = chunks[inicio:inicio + lote]
+        vetores = embeddings.embed_documents([c["page_content"] for c in parte])
+        dim = len(vetores[0]) if vetores else dim
+        pontos = []
+        for i, (chunk, vetor) in enumerate(zip(parte, vetores)):
+            nomeados = {VETOR_COMPLETO: list(vetor)}
+            if dim_curta:
+                nomeados[VETOR_CURTO] = truncar(vetor, dim_curta)
+            id = id_inicial + inicio + i
+            if armazem is not None:
+                armazem.adicionar(id, chunk)
+            payload = dict(chunk) if texto_no_qdrant else {k: v for k, v in chunk.items() if k != "page_content"}
+            pontos.append(models.PointStruct(id=id, vector=nomeados, payload=payload))
+        client.upsert(collection_name=colecao, points=pontos)
+        logger.info(f"🗂️ {colecao}: {inicio + len(parte)}/{len(chunks)} chunks gravados.")
+
+    return {
+        "pontos": len(chunks),
+        "dim": dim,
+        "dim_curta": dim_curta,
+        "bytes_vetor_completo": len(chunks) * dim * 4,
+        "bytes_vetor_curto": len(chunks) * (dim_curta or 0) * 4,
+    }
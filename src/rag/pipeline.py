@@ -1,57 +1,217 @@
 # rag/pipeline.py
 
+import hashlib
+import time
+
+from utils.cache import chave_cache
 from utils.logs import logger
+from utils.metrics import metricas
+from utils.tracing import etapa, registrar_decisao
+from utils.deadline import POLITICA_PADRAO, restante
 from rag.qdrant import QdrantRetriever
 from rag.rerank_vector import VectorReranker
 from rag.rerank_llm import LLMJudgeReranker
+from rag.web import normalizar_consulta
+
+
+def escopo_cache(perfil, artefatos_perfil: dict | None = None) -> dict:
+    """
+    Escopo das entradas de cache de uma consulta. Com filtros do perfil
+    (PerfilStore), o regime tributário: perfis do mesmo regime compartilham
+    busca e resposta em cache. Sem eles, o próprio perfil.
+    """
+    if artefatos_perfil and artefatos_perfil.get("filtros"):
+        return {"filtros": artefatos_perfil["filtros"]}
+    return {"perfil": perfil}
+
+
+def _hash_texto(texto: str) -> str:
+    return hashlib.sha1((texto or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _perfil_do_vetor(perfil, artefatos_perfil: dict | None) -> str:
+    """
+    Hash do texto do perfil que entra no vetor da busca (bloco do PerfilStore,
+    origem do embedding pré‑calculado, ou o perfil): candidatos em cache só
+    servem a perfis com o mesmo vetor, não a todo o regime.
+    """
+    texto = (artefatos_perfil or {}).get("bloco_prompt") or perfil
+    return _hash_texto(texto if isinstance(texto, str) else str(texto))
 
 
 class HybridRAGPipeline:
 
-    def __init__(self, qdrant_retriever: QdrantRetriever, llm, vector_top_k=6, final_top_k=4):
+    # Candidatos buscados no Qdrant quando não há política de profundidade
+    limite_qdrant = 12
+
+    def __init__(
+        self,
+        qdrant_retriever: QdrantRetriever,
+        llm,
+        vector_top_k=6,
+        final_top_k=4,
+        vector_reranker=None,
+        llm_reranker=None,
+        politica_orcamento=None,
+        politica_profundidade=None,
+        deduplicador=None,
+        agendador=None,
+        cache=None,
+    ):
+        """
+        deduplicador (Deduplicador, opcional): colapsa quase-duplicatas entre os
+        candidatos do Qdrant antes do reranking vetorial.
+        politica_profundidade (PoliticaProfundidade, opcional): ajusta o número de
+        candidatos e dispensa o LLM‑as‑Judge quando o ranking vetorial é conclusivo.
+        Sem ela, o comportamento é fixo (top‑12 do Qdrant, juiz sempre executado).
+        agendador (Agendador, opcional): trabalho de lote pula o LLM‑as‑Judge
+        quando a fila do recurso "openai" está funda (ver utils/agendador.py).
+        cache (CachePersistente, opcional): candidatos da busca (por pergunta e
+        `escopo_cache`) e scores do reranking vetorial (por pergunta e textos)
+        são lidos/gravados nele; aquecido por tools/aquecer_cache.py.
+        """
         self.retriever = qdrant_retriever
-        self.vector_reranker = VectorReranker()
-        self.llm_reranker = LLMJudgeReranker(llm)
+        self.vector_reranker = vector_reranker or VectorReranker()
+        self.llm_reranker = llm_reranker or LLMJudgeReranker(llm)
         self.vector_top_k = vector_top_k
         self.final_top_k = final_top_k
+        self.politica = politica_orcamento or POLITICA_PADRAO
+        self.profundidade = politica_profundidade
+        self.deduplicador = deduplicador
+        self.agendador = agendador
+        self.cache = cache
 
-    def run(self, question: str, perfil: str):
-        logger.info("⚙️ Executando pipeline híbrido de RAG...")
+    def _pular(self, nome: str, deadline, minimo: float) -> bool:
+        """True se não houver orçamento para a etapa opcional (decisão vai ao rastro)."""
+        if self.politica.permite(deadline, minimo):
+            return False
+        registrar_decisao(nome, "pulada", restante_s=round(restante(deadline), 3), minimo_s=minimo)
+        return True
 
-        # -------------------------------------------------------------
-        # 1. Recuperação inicial (Qdrant)
-        # -------------------------------------------------------------
+    def _candidatos(self, question: str, perfil: str, artefatos_perfil: dict | None) -> list:
+        """Busca no Qdrant, filtra textos vazios, deduplica e corta; [] se não houver candidatos."""
+        limite = self.profundidade.limite_inicial if self.profundidade else self.limite_qdrant
+        kwargs = {"with_vectors": True} if self.deduplicador and self.deduplicador.precisa_vetores else {}
+        if artefatos_perfil:
+            perfil = artefatos_perfil.get("bloco_prompt") or perfil
+            kwargs["perfil_embedding"] = artefatos_perfil.get("embedding")
+            kwargs["filtros"] = artefatos_perfil.get("filtros")
         try:
-            raw_docs = self.retriever.query(question, perfil, limit=12)
+            with etapa("rag.qdrant"):
+                raw_docs = self.retriever.query(question, perfil, limit=limite, **kwargs)
+                if self.profundidade and self.profundidade.deve_expandir(raw_docs, limite):
+                    limite = self.profundidade.limite_max
+                    registrar_decisao("rag.qdrant", "expandida", limite=limite)
+                    metricas.incrementar("rag.busca_expandida")
+                    raw_docs = self.retriever.query(question, perfil, limit=limite, **kwargs)
         except Exception as e:
             logger.error(f"[RAG] Falha ao consultar Qdrant: {e}")
-            return [], ""
+            return []
 
         if not raw_docs:
             logger.warning("⚠️ Qdrant não retornou documentos. RAG desativado.")
-            return [], ""
+            return []
 
         # Filtra textos vazios ou de baixa qualidade
         raw_docs = [d for d in raw_docs if d.get("page_content", "").strip()]
         if not raw_docs:
             logger.warning("⚠️ Todos os documentos retornados estavam vazios.")
-            return [], ""
+            return []
+
+        if self.deduplicador:
+            with etapa("rag.dedup"):
+                unicos = self.deduplicador.deduplicar(raw_docs)
+            removidos = len(raw_docs) - len(unicos)
+            metricas.incrementar("rag.dedup_removidos", removidos)
+            metricas.observar("rag.dedup_removidos_por_consulta", removidos)
+            if removidos:
+                registrar_decisao("rag.dedup", "colapsada", removidos=removidos, de=len(raw_docs))
+            raw_docs = unicos
+
+        if self.profundidade:
+            cortados = self.profundidade.cortar_candidatos(raw_docs)
+            if len(cortados) < len(raw_docs):
+                registrar_decisao("rag.qdrant", "cortada", candidatos=len(cortados), de=len(raw_docs))
+                metricas.incrementar("rag.candidatos_cortados", len(raw_docs) - len(cortados))
+                raw_docs = cortados
+
+        return raw_docs
+
+    def _rerank_vetorial(self, question: str, raw_docs: list) -> list:
+        """
+        Reranking vetorial; com cache, a ordem e os scores vêm (ou vão) para
+        ele pela pergunta e pelos textos dos candidatos.
+        """
+        top_k = min(self.vector_top_k, len(raw_docs))
+        if self.cache is None:
+            return self.vector_reranker.rerank(question, raw_docs, top_k=top_k)
+
+        hashes = [_hash_texto(d.get("page_content")) for d in raw_docs]
+        chave = chave_cache(normalizar_consulta(question), hashes, top_k)
+        ordem = self.cache.obter("rag.rerank_vector", chave)
+        if ordem is not None:
+            registrar_decisao("rag.rerank_vector", "em_cache")
+            return [{**raw_docs[pos], "score_vetorial": score} for pos, score in ordem]
+
+        vector_docs = self.vector_reranker.rerank(question, raw_docs, top_k=top_k)
+        posicoes = {}
+        for pos, h in enumerate(hashes):
+            posicoes.setdefault(h, pos)
+        ordem = [
+            [posicoes[_hash_texto(d.get("page_content"))], d.get("score_vetorial")]
+            for d in vector_docs
+        ]
+        self.cache.gravar("rag.rerank_vector", chave, ordem)
+        return vector_docs
+
+    def run(self, question: str, perfil: str, deadline: float | None = None, artefatos_perfil: dict | None = None):
+        """
+        `deadline` (epoch, opcional): etapas opcionais (CrossEncoder e
+        LLM‑as‑Judge) são puladas quando o tempo restante não as comporta.
+        `artefatos_perfil` (PerfilStore, opcional): bloco normalizado, filtros
+        e embedding do perfil pré‑calculados; só a pergunta é embedada.
+        """
+        logger.info("⚙️ Executando pipeline híbrido de RAG...")
+
+        # -------------------------------------------------------------
+        # 1. Recuperação inicial (Qdrant), ou candidatos em cache
+        # -------------------------------------------------------------
+        chave_busca, raw_docs = None, None
+        if self.cache is not None:
+            limite = self.profundidade.limite_inicial if self.profundidade else self.limite_qdrant
+            chave_busca = chave_cache(
+                normalizar_consulta(question), escopo_cache(perfil, artefatos_perfil),
+                _perfil_do_vetor(perfil, artefatos_perfil), limite,
+            )
+            with etapa("rag.qdrant"):
+                raw_docs = self.cache.obter("rag.qdrant", chave_busca)
+            if raw_docs is not None:
+                registrar_decisao("rag.qdrant", "em_cache", candidatos=len(raw_docs))
+
+        if raw_docs is None:
+            raw_docs = self._candidatos(question, perfil, artefatos_perfil)
+            if not raw_docs:
+                return [], ""
+            if chave_busca is not None:
+                # Vetores só servem à deduplicação, já aplicada
+                sem_vetor = [{k: v for k, v in d.items() if k != "vector"} for d in raw_docs]
+                self.cache.gravar("rag.qdrant", chave_busca, sem_vetor)
 
         logger.info(f"📄 Documentos após filtragem inicial: {len(raw_docs)}")
 
         # -------------------------------------------------------------
         # 2. Reranking Vetorial (Cross‑Encoder)
         # -------------------------------------------------------------
-        try:
-            vector_docs = self.vector_reranker.rerank(
-                question,
-                raw_docs,
-                top_k=min(self.vector_top_k, len(raw_docs))
-            )
-        except Exception as e:
-            logger.error(f"[RAG] Erro no reranking vetorial: {e}")
-            # fallback = pegar documentos crus
+        if self._pular("rag.rerank_vector", deadline, self.politica.min_rerank):
             vector_docs = raw_docs[:self.vector_top_k]
+        else:
+            try:
+                with etapa("rag.rerank_vector"):
+                    vector_docs = self._rerank_vetorial(question, raw_docs)
+            except Exception as e:
+                logger.error(f"[RAG] Erro no reranking vetorial: {e}")
+                # fallback = pegar documentos crus
+                vector_docs = raw_docs[:self.vector_top_k]
 
         if not vector_docs:
             logger.warning("⚠️ Reranking vetorial retornou zero documentos.")
@@ -62,16 +222,33 @@ class HybridRAGPipeline:
         # -------------------------------------------------------------
         # 3. Reranking LLM‑as‑Judge
         # -------------------------------------------------------------
-        try:
-            final_docs = self.llm_reranker.rerank(
-                question,
-                vector_docs,
-                top_k=min(self.final_top_k, len(vector_docs))
+        if self._pular("rag.llm_judge", deadline, self.politica.min_juiz):
+            final_docs = vector_docs[:self.final_top_k]
+        elif self.agendador is not None and self.agendador.degradar("openai"):
+            registrar_decisao("rag.llm_judge", "pulada", motivo="sobrecarga")
+            final_docs = vector_docs[:self.final_top_k]
+        elif self.profundidade and self.profundidade.juiz_dispensavel(vector_docs, self.final_top_k):
+            registrar_decisao("rag.llm_judge", "pulada", motivo="ranking_vetorial_conclusivo")
+            metricas.incrementar("rag.juiz_pulado")
+            metricas.incrementar(
+                "rag.juiz_economia_s", metricas.distribuicao("rag.juiz_latencia_s")["media"]
             )
-        except Exception as e:
-            logger.error(f"[RAG] Erro no LLM‑as‑Judge: {e}")
-            # fallback
             final_docs = vector_docs[:self.final_top_k]
+        else:
+            try:
+                inicio = time.perf_counter()
+                with etapa("rag.llm_judge"):
+                    final_docs = self.llm_reranker.rerank(
+                        question,
+                        vector_docs,
+                        top_k=min(self.final_top_k, len(vector_docs))
+                    )
+                metricas.incrementar("rag.juiz_executado")
+                metricas.observar("rag.juiz_latencia_s", time.perf_counter() - inicio)
+            except Exception as e:
+                logger.error(f"[RAG] Erro no LLM‑as‑Judge: {e}")
+                # fallback
+                final_docs = vector_docs[:self.final_top_k]
 
         if not final_docs:
             logger.warning("⚠️ LLM‑Judge retornou zero documentos.")
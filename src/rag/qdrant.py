@@ -1,58 +1,242 @@
 # rag/qdrant.py
 
-from qdrant_client import QdrantClient, models
-from langchain_openai import OpenAIEmbeddings
+import math
+
 from utils.logs import logger
+from utils.metrics import metricas
+
+
+def _normalizar(vetor) -> list:
+    norma = math.sqrt(sum(v * v for v in vetor)) or 1.0
+    return [v / norma for v in vetor]
 
 
 class QdrantRetriever:
 
-    def __init__(self, url, api_key, collection, embedding_model, openai_key):
-        self.client = QdrantClient(url=url, api_key=api_key)
+    # Peso do embedding pré‑calculado do perfil na combinação com o da pergunta
+    peso_perfil = 0.3
+    # Largura da busca HNSW (recall × latência no Qdrant)
+    hnsw_ef = 128
+    # Busca em dois estágios (ver rag/ingest.py): dimensão do vetor "curto"
+    # do 1º estágio (None = só o vetor completo) e candidatos por resultado
+    # final reavaliados com o vetor completo
+    dim_curta = None
+    fator_prefetch = 4
+    # Armazém local de chunks (ArmazemChunks): com ele, o Qdrant devolve só
+    # ids e scores, e texto/metadados são lidos do disco mapeado
+    armazem = None
+    # Busca federada em várias coleções (BuscaFederada; ver ativar_federacao)
+    federacao = None
+
+    def __init__(
+        self, url, api_key, collection, embedding_model, openai_key,
+        prefer_grpc: bool = False, timeout: int = 10, tentativas: int = 3,
+    ):
+        """
+        prefer_grpc: buscas pelo gRPC do Qdrant (porta 6334) em vez de REST.
+        timeout: prazo (s) das chamadas ao Qdrant e à OpenAI (embeddings).
+        tentativas: novas tentativas em erro transitório (ver utils/transporte.py).
+        Conexões HTTP ficam em pools keep‑alive compartilhados no processo.
+        """
+        # Imports pesados adiados até a construção (não pesam no import do módulo)
+        from qdrant_client import QdrantClient
+        from langchain_openai import OpenAIEmbeddings
+        from utils.transporte import ComRetentativas, cliente_httpx, pool_httpx
+
+        self.client = ComRetentativas(
+            QdrantClient(url=url, api_key=api_key, prefer_grpc=prefer_grpc, timeout=timeout, **pool_httpx("qdrant")),
+            "qdrant", tentativas=tentativas, metodos=("query_points", "get_collection"),
+        )
         self.collection = collection
-        self.embeddings = OpenAIEmbeddings(model=embedding_model, api_key=openai_key)
+        self.embeddings = OpenAIEmbeddings(
+            model=embedding_model,
+            api_key=openai_key,
+            http_client=cliente_httpx("openai"),
+            request_timeout=timeout,
+            max_retries=tentativas,
+        )
+
+    def ativar_coalescencia(self, janela_ms: float = 5.0, max_lote: int = 64):
+        """Agrupa embeddings de consultas simultâneas em uma requisição (ver rag/coalescer.py)."""
+        from rag.coalescer import EmbeddingCoalescer
+
+        self.embeddings = EmbeddingCoalescer(self.embeddings, janela_ms=janela_ms, max_lote=max_lote)
+        return self
+
+    def usar_armazem(self, diretorio: str):
+        """
+        Buscas só de ids, com texto e metadados do armazém local (ver
+        rag/chunk_store.py). O armazém é indexado pelo id inteiro do ponto:
+        coleção com ids UUID falha aqui, na configuração, e não a cada busca.
+        """
+        from rag.chunk_store import ArmazemChunks
+
+        pontos, _ = self.client.scroll(collection_name=self.collection, limit=1, with_payload=False, with_vectors=False)
+        if pontos and (isinstance(pontos[0].id, bool) or not isinstance(pontos[0].id, int)):
+            raise ValueError(
+                f"Coleção '{self.collection}' usa ids não inteiros (ex.: {pontos[0].id!r}); o armazém de "
+                "chunks exige os ids inteiros gravados por tools.ingerir — reingira ou desligue CHUNKS_DIR"
+            )
+        self.armazem = ArmazemChunks(diretorio)
+        logger.info(f"📦 Armazém de chunks: {len(self.armazem)} ids em {diretorio}")
+        return self
+
+    def ativar_federacao(self, colecoes: dict, fusao: str = "rrf", k_rrf: int = 60):
+        """
+        Busca o mesmo vetor em várias coleções ({nome: peso}) em paralelo e
+        funde os rankings (ver rag/federado.py). A coleção principal entra com
+        peso 1 se não estiver em `colecoes`.
+        """
+        from rag.federado import BuscaFederada
+
+        self.federacao = BuscaFederada({self.collection: 1.0, **colecoes}, fusao=fusao, k_rrf=k_rrf)
+        return self
+
+    def ativar_hedging(self, percentil: float = 95, max_extra: float = 0.05):
+        """
+        Duplica embeddings e buscas no Qdrant que passarem do percentil de
+        latência recente (ver utils/hedging.py). Com coalescência ativa, o
+        hedge fica abaixo dela (nos lotes enviados à OpenAI).
+        """
+        from rag.coalescer import EmbeddingCoalescer
+        from utils.hedging import ComHedge, PoliticaHedge
+
+        politica_embedding = PoliticaHedge("embedding", percentil=percentil, max_extra=max_extra)
+        if isinstance(self.embeddings, EmbeddingCoalescer):
+            self.embeddings.embeddings = ComHedge(self.embeddings.embeddings, politica_embedding, ("embed_documents",))
+        else:
+            self.embeddings = ComHedge(self.embeddings, politica_embedding, ("embed_query", "embed_documents"))
+
+        politica_qdrant = PoliticaHedge("qdrant", percentil=percentil, max_extra=max_extra)
+        self.client = ComHedge(self.client, politica_qdrant, ("query_points",))
+        return self
+
+    def aquecer(self):
+        """Abre as conexões HTTP com Qdrant e OpenAI antes da primeira pergunta."""
+        self.client.get_collection(self.collection)
+        self.embed_query("aquecimento")
 
     def embed_query(self, text: str):
         return self.embeddings.embed_query(text)
 
-    def query(self, text: str, perfil: str, limit=12):
-        enriched = f"{text}\n\nPerfil: {perfil}"
+    def _vetor_consulta(self, text: str, perfil, perfil_embedding=None):
+        """
+        Sem `perfil_embedding`, embeda pergunta + perfil em uma chamada.
+        Com ele (pré‑calculado no PerfilStore), embeda só a pergunta e combina
+        os dois vetores normalizados — a parte do perfil não é recalculada.
+        """
+        if perfil_embedding is None:
+            return self.embed_query(f"{text}\n\nPerfil: {perfil}")
+
+        pergunta = _normalizar(self.embed_query(text))
+        perfil_vetor = _normalizar(perfil_embedding)
+        w = self.peso_perfil
+        return _normalizar([(1 - w) * q + w * p for q, p in zip(pergunta, perfil_vetor)])
+
+    def _filtro(self, filtros):
+        """[{"campo", "valores"}] → Filter: cada campo casa um dos valores ou está ausente."""
+        if not filtros:
+            return None
+
+        from qdrant_client import models
+
+        return models.Filter(must=[
+            models.Filter(should=[
+                models.FieldCondition(key=f["campo"], match=models.MatchAny(any=f["valores"])),
+                models.IsEmptyCondition(is_empty=models.PayloadField(key=f["campo"])),
+            ])
+            for f in filtros
+        ])
+
+    def query(self, text: str, perfil: str, limit=12, with_vectors=False, perfil_embedding=None, filtros=None):
+        """
+        Busca os `limit` chunks mais próximos. Com `with_vectors=True`, cada doc
+        traz também o vetor armazenado em "vector" (usado na deduplicação).
+        `perfil_embedding` e `filtros` vêm dos artefatos do perfil (PerfilStore).
+        Com federação ativa, o mesmo vetor vai a todas as coleções em paralelo.
+        """
         logger.info("🔎 Gerando embedding para RAG...")
 
         try:
-            vector = self.embed_query(enriched)
+            vector = self._vetor_consulta(text, perfil, perfil_embedding)
         except Exception as e:
             logger.error(f"Erro ao gerar embedding: {e}")
             return []
 
+        if self.federacao is not None:
+            return self.federacao.buscar(self, vector, limit, with_vectors=with_vectors, filtros=filtros)
+        return self.buscar(vector, limit, with_vectors=with_vectors, filtros=filtros)
+
+    def buscar(self, vector, limit=12, with_vectors=False, filtros=None, colecao=None):
+        """
+        Busca por um vetor já calculado em `colecao` (padrão: a principal).
+        Dois estágios (`dim_curta`) e armazém local valem só para a coleção
+        principal; as demais são buscadas em um estágio, com payload.
+        """
+        from qdrant_client import models
+
+        colecao = colecao or self.collection
+        principal = colecao == self.collection
+        armazem = self.armazem if principal else None
+
+        filtro = self._filtro(filtros)
+        busca = models.SearchParams(hnsw_ef=self.hnsw_ef, exact=False)
+        estagios = {}
+        if self.dim_curta and principal:
+            # 1º estágio no índice HNSW do vetor truncado; o completo só reordena
+            from rag.ingest import VETOR_CURTO, truncar
+
+            estagios["prefetch"] = models.Prefetch(
+                query=truncar(vector, self.dim_curta),
+                using=VETOR_CURTO,
+                filter=filtro,
+                params=busca,
+                limit=limit * self.fator_prefetch,
+            )
+
         try:
             results = self.client.query_points(
-                collection_name=self.collection,
+                collection_name=colecao,
                 query=vector,
                 using="default",
-                query_filter=None,
-                search_params=models.SearchParams(
-                    hnsw_ef=128,
-                    exact=False
-                ),
+                query_filter=filtro,
+                search_params=busca,
                 limit=limit,
-                with_payload=True,
-                with_vectors=False
+                **estagios,
+                with_payload=armazem is None,
+                with_vectors=["default"] if with_vectors else False
             )
         except Exception as e:
             logger.error(f"[RAG] Erro ao consultar Qdrant: {e}")
             raise
 
+        if armazem is not None:
+            armazem.atualizar()  # adota uma reingestão do armazém (checagem periódica)
+
         docs = []
-        for i, point in enumerate(results.points):
-            payload = point.payload or {}
+        for point in results.points:
+            if armazem is not None:
+                payload = armazem.payload(point.id)
+                if payload is None:
+                    # Armazém desatualizado frente à coleção: o ponto é descartado
+                    metricas.incrementar("armazem.faltantes")
+                    logger.warning(f"📦 Id {point.id} ausente do armazém de chunks.")
+                    continue
+            else:
+                payload = point.payload or {}
             text = payload.get("page_content", "")
 
-            docs.append({
-                "index": i,
+            doc = {
+                "index": len(docs),
                 "page_content": text,
+                "score": point.score,
                 "metadata": payload
-            })
+            }
+            if with_vectors:
+                vector = point.vector
+                doc["vector"] = vector.get("default") if isinstance(vector, dict) else vector
+
+            docs.append(doc)
 
         logger.info(f"🔎 Qdrant retornou {len(docs)} documentos.")
         return docs
\ No newline at end of file
@@ -1,21 +1,73 @@
 # rag/rerank_vector.py
 
-from sentence_transformers import CrossEncoder
+import threading
+
+from utils.batching import MicroBatcher
 from utils.logs import logger
 
 
 class VectorReranker:
+    """
+    Reranker por CrossEncoder. O modelo (sentence_transformers/torch) só é
+    importado e carregado no primeiro uso ou em `aquecer()`, normalmente
+    chamado em background no início do processo (services/warmup.py).
+
+    Com `ativar_microlotes()`, os pares (pergunta, doc) de consultas
+    simultâneas são agrupados em lotes e avaliados por uma única thread,
+    em vez de cada thread chamar `predict` por conta própria.
+    """
 
     def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2"):
-        logger.info(f"🔁 Carregando CrossEncoder {model_name} para reranking vetorial...")
-        self.model = CrossEncoder(model_name)
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+        self._batcher = None
+
+    def ativar_microlotes(self, max_lote: int = 64, max_espera_ms: float = 5.0):
+        """Compartilha o modelo entre threads via MicroBatcher (uma instância por processo)."""
+        if self._batcher is None:
+            self._batcher = MicroBatcher(
+                lambda pares: [float(s) for s in self.model.predict(pares, batch_size=max_lote)],
+                max_lote=max_lote,
+                max_espera_ms=max_espera_ms,
+                nome="rerank",
+            )
+        return self
+
+    def _pontuar(self, pairs: list) -> list:
+        if self._batcher is not None:
+            return self._batcher.executar(pairs)
+        return self.model.predict(pairs)
+
+    @property
+    def pronto(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    logger.info(f"🔁 Carregando CrossEncoder {self.model_name} para reranking vetorial...")
+                    self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def aquecer(self):
+        """Carrega o modelo e executa uma predição curta (aloca buffers/threads do torch)."""
+        self.model.predict([["aquecimento", "aquecimento"]])
 
     def rerank(self, query: str, docs: list, top_k=6):
         if not docs:
             return []
 
         pairs = [[query, d["page_content"]] for d in docs]
-        scores = self.model.predict(pairs)
+        scores = self._pontuar(pairs)
 
         ranked = sorted(
             zip(scores, docs),
@@ -23,6 +75,6 @@ class VectorReranker:
             reverse=True
         )
 
-        top_docs = [doc for score, doc in ranked[:top_k]]
+        top_docs = [{**doc, "score_vetorial": float(score)} for score, doc in ranked[:top_k]]
         logger.info(f"🔁 Reranking vetorial selecionou {len(top_docs)} documentos.")
-        return top_docs
\ No newline at end of file
+        return top_docs
@@ -1,41 +1,142 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
 from utils.logs import logger
+from utils.cache import TTLCache
+from utils.circuit import CircuitBreaker
+from utils.metrics import metricas
+
+
+# Threads para impor prazo às chamadas ao Tavily (o cliente não aceita timeout).
+# Uma chamada que estoura o prazo continua ocupando sua thread até terminar.
+_executor_web = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tavily")
+
+_VAZIO = {"answer": "", "sources": []}
+
+
+def normalizar_consulta(query: str) -> str:
+    """Chave de cache: minúsculas, sem acentos e com espaços colapsados."""
+    texto = unicodedata.normalize("NFKD", query or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto.lower()).strip()
+
+
+class ClienteTavily:
+    """
+    Cliente HTTP mínimo da busca do Tavily (mesmos parâmetros do
+    TavilySearchAPIWrapper) sobre uma sessão com pool keep‑alive, prazo e
+    novas tentativas (utils/transporte.py). `invoke({"query": ...})`
+    devolve [{"url", "content"}], como o TavilySearchResults.
+    """
+
+    URL = "https://api.tavily.com/search"
+
+    def __init__(self, api_key: str, max_results: int = 3, timeout: float = 8.0, sessao=None):
+        from utils.transporte import sessao_http
+
+        self.api_key = api_key
+        self.max_results = max_results
+        self.timeout = timeout
+        self.sessao = sessao or sessao_http("tavily", timeout=timeout)
+
+    def invoke(self, params: dict) -> list:
+        resp = self.sessao.post(
+            self.URL,
+            json={
+                "api_key": self.api_key,
+                "query": params["query"],
+                "max_results": self.max_results,
+                "search_depth": "advanced",
+                "include_answer": False,
+                "include_raw_content": False,
+                "include_images": False,
+            },
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return [{"url": r["url"], "content": r["content"]} for r in resp.json().get("results", [])]
 
 
 class WebSearch:
 
-    def __init__(self, api_key: str, max_results: int = 3):
+    def __init__(
+        self,
+        api_key: str,
+        max_results: int = 3,
+        cache_ttl: float = 300.0,
+        timeout: float = 8.0,
+        falhas_para_abrir: int = 5,
+        tempo_aberto: float = 30.0,
+        tool=None,
+    ):
         """
         Inicializa wrapper para Tavily.
+
+        cache_ttl: validade (s) de resultados por consulta normalizada.
+        timeout: prazo padrão (s) de cada chamada.
+        falhas_para_abrir / tempo_aberto: parâmetros do circuit breaker.
+        tool: substitui o ClienteTavily por outro objeto com `invoke({"query": ...})`.
         """
-        try:
-            self.tool = TavilySearchResults(
-                api_key=api_key,
-                max_results=max_results
-            )
+        if tool is not None:
+            self.tool = tool
+        else:
+            self.tool = ClienteTavily(api_key=api_key, max_results=max_results, timeout=timeout)
             logger.info("🌐 Tavily WebSearch inicializado.")
-        except Exception as e:
-            logger.error(f"Erro ao inicializar Tavily: {e}")
-            raise
 
-    def execute(self, query: str) -> dict:
+        self.timeout = timeout
+        self.cache = TTLCache(ttl=cache_ttl, max_itens=512)
+        self.breaker = CircuitBreaker(
+            "web", falhas_para_abrir=falhas_para_abrir, tempo_aberto=tempo_aberto
+        )
+
+    def _invocar(self, query: str, timeout: float):
+        # Formato correto para tools LangChain: dict(query=foo)
+        futuro = _executor_web.submit(self.tool.invoke, {"query": query})
+        return futuro.result(timeout=timeout) or []
+
+    def execute(self, query: str, timeout: float | None = None) -> dict:
         """
         Executa busca e retorna:
         {
           "answer": "texto concatenado",
           "sources": [ { ... }, ... ]
         }
+
+        Consulta primeiro o cache; com o circuito aberto retorna vazio
+        imediatamente. `timeout` sobrepõe o prazo padrão desta chamada.
         """
+        chave = normalizar_consulta(query)
+        cached = self.cache.get(chave)
+        if cached is not None:
+            metricas.incrementar("web.cache_hit")
+            return {"answer": cached["answer"], "sources": [dict(s) for s in cached["sources"]]}
+        metricas.incrementar("web.cache_miss")
+
+        if not self.breaker.permitir():
+            metricas.incrementar("web.circuito_rejeitado")
+            logger.warning("🌐 Circuito do web search aberto. Retornando vazio.")
+            return dict(_VAZIO)
+
+        prazo = self.timeout if timeout is None else timeout
         try:
-            # Formato correto para tools LangChain: dict(query=foo)
-            results = self.tool.invoke({"query": query}) or []
+            results = self._invocar(query, prazo)
+        except FuturesTimeout:
+            self.breaker.registrar_falha()
+            metricas.incrementar("web.timeout")
+            logger.error(f"Web search excedeu o prazo de {prazo:.1f}s.")
+            return dict(_VAZIO)
         except Exception as e:
+            self.breaker.registrar_falha()
+            metricas.incrementar("web.erro")
             logger.error(f"Erro executando web search: {e}")
-            return {"answer": "", "sources": []}
+            return dict(_VAZIO)
+
+        self.breaker.registrar_sucesso()
 
         if not results:
             logger.info("🌐 Web search retornou vazio.")
-            return {"answer": "", "sources": []}
+            return dict(_VAZIO)
 
         context_blocks = []
         sources = []
@@ -63,11 +164,12 @@ class WebSearch:
             })
 
         final_context = "\n\n---\n\n".join(context_blocks)
-        return {"answer": final_context, "sources": sources}
+        self.cache.set(chave, {"answer": final_context, "sources": sources})
+        return {"answer": final_context, "sources": [dict(s) for s in sources]}
 
 
 def build_web_tool(api_key: str) -> WebSearch:
     """
     Função auxiliar usada em app_web e no LangGraph.
     """
-    return WebSearch(api_key=api_key)
\ No newline at end of file
+    return WebSearch(api_key=api_key)
@@ -0,0 +1,260 @@
+# services/auditoria.py
+
+import json
+import os
+import queue
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import zlib
+from datetime import date, datetime
+
+from utils.logs import logger
+from utils.metrics import metricas
+
+
+# Cabeçalho de cada registro no segmento: tamanho comprimido + CRC32 do conteúdo
+_CABECALHO = struct.Struct(">II")
+_FIM = object()
+
+AUDITORIA_DIR_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "auditoria")
+
+
+def _data_iso(valor) -> str:
+    if isinstance(valor, (date, datetime)):
+        return valor.strftime("%Y-%m-%d")
+    return str(valor)
+
+
+class AuditoriaConsultas:
+    """
+    Trilha de auditoria append‑only das consultas: cada ConsultaContext
+    (prompt mestre, contexto jurídico, fontes) e a resposta final viram um
+    registro JSON comprimido (zlib) em arquivos de segmento rotacionados por
+    tamanho (`seg-000001.zaud`, ...).
+
+    A gravação é write‑behind: `registrar` só enfileira; uma thread própria
+    serializa, comprime e grava em lotes, sem atrasar a resposta. Um índice
+    SQLite (trace_id, data → segmento, offset, tamanho) permite ler uma
+    consulta ou um intervalo de datas descomprimindo só os registros pedidos.
+
+    Registros nunca são reescritos; o mesmo trace_id gravado de novo passa a
+    apontar para o registro mais recente. Consulta sem trace_id recebe um
+    gerado na hora (não colide com as demais no índice).
+    """
+
+    def __init__(
+        self,
+        diretorio: str = AUDITORIA_DIR_PADRAO,
+        max_segmento_mb: float = 64,
+        max_fila: int = 10000,
+        nivel_compressao: int = 6,
+    ):
+        self.diretorio = diretorio
+        self.max_segmento = int(max_segmento_mb * 2**20)
+        self.nivel_compressao = nivel_compressao
+        os.makedirs(diretorio, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(diretorio, "indice.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS consultas (
+                trace_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                segmento TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                tamanho INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS consultas_data ON consultas (data, criado_em)")
+        self._conn.commit()
+
+        self._segmento = self._ultimo_segmento()
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._thread = threading.Thread(target=self._loop, name="auditoria", daemon=True)
+        self._thread.start()
+
+    # ---------------------------------------------------------
+    # Segmentos
+    # ---------------------------------------------------------
+    def _segmentos(self) -> list:
+        return sorted(n for n in os.listdir(self.diretorio) if n.startswith("seg-") and n.endswith(".zaud"))
+
+    def _ultimo_segmento(self) -> str:
+        segmentos = self._segmentos()
+        return segmentos[-1] if segmentos else "seg-000001.zaud"
+
+    def _rotacionar(self):
+        numero = int(self._segmento[4:10]) + 1
+        self._segmento = f"seg-{numero:06d}.zaud"
+        logger.info(f"🗄️ Auditoria: novo segmento {self._segmento}")
+
+    # ---------------------------------------------------------
+    # Escrita (thread própria)
+    # ---------------------------------------------------------
+    def registrar(self, mcp, resposta: str, trace_id: str | None = None, **extras) -> bool:
+        """
+        Enfileira a consulta para gravação. Não bloqueia: com a fila cheia o
+        registro é descartado (métrica `auditoria.descartadas`) e retorna False.
+        """
+        trace_id = trace_id or getattr(mcp, "trace_id", None)
+        if not trace_id:
+            trace_id = uuid.uuid4().hex
+            metricas.incrementar("auditoria.sem_trace_id")
+            logger.warning(f"🗄️ Auditoria: consulta sem trace_id, gravada como {trace_id}")
+        item = (trace_id, time.time(), mcp, resposta, extras)
+        try:
+            self._fila.put_nowait(item)
+            return True
+        except queue.Full:
+            metricas.incrementar("auditoria.descartadas")
+            logger.error(f"🗄️ Auditoria: fila cheia, consulta {item[0]} descartada")
+            return False
+
+    def _registro(self, item) -> tuple:
+        trace_id, criado_em, mcp, resposta, extras = item
+        dados = mcp.model_dump(mode="json") if hasattr(mcp, "model_dump") else dict(mcp)
+        registro = {
+            "trace_id": trace_id,
+            "criado_em": criado_em,
+            "data": datetime.fromtimestamp(criado_em).strftime("%Y-%m-%d"),
+            "consulta": dados,
+            "resposta": resposta,
+            **extras,
+        }
+        bruto = json.dumps(registro, ensure_ascii=False).encode("utf-8")
+        return registro, zlib.compress(bruto, self.nivel_compressao), zlib.crc32(bruto)
+
+    def _gravar_lote(self, itens: list):
+        """Grava o lote num fsync e num commit; item que não serializa fica de fora sozinho."""
+        serializados = []
+        for item in itens:
+            try:
+                serializados.append(self._registro(item))
+            except Exception as e:
+                metricas.incrementar("auditoria.erros")
+                logger.error(f"🗄️ Auditoria: consulta {item[0]} não serializável, descartada: {e}")
+        if not serializados:
+            return
+
+        indices = []
+        with open(os.path.join(self.diretorio, self._segmento), "ab") as f:
+            for registro, comprimido, crc in serializados:
+                offset = f.tell()
+                f.write(_CABECALHO.pack(len(comprimido), crc) + comprimido)
+                indices.append((
+                    registro["trace_id"], registro["data"], registro["criado_em"],
+                    self._segmento, offset, len(comprimido),
+                ))
+            f.flush()
+            os.fsync(f.fileno())
+            tamanho = f.tell()
+
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO consultas VALUES (?, ?, ?, ?, ?, ?)", indices)
+            self._conn.commit()
+
+        metricas.incrementar("auditoria.gravadas", len(indices))
+        if tamanho >= self.max_segmento:
+            self._rotacionar()
+
+    def _loop(self):
+        while True:
+            itens = [self._fila.get()]
+            # Drena o que já estiver na fila: um fsync e um commit por lote
+            while len(itens) < 256:
+                try:
+                    itens.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+
+            fim = any(item is _FIM for item in itens)
+            itens_validos = [item for item in itens if item is not _FIM]
+            try:
+                if itens_validos:
+                    self._gravar_lote(itens_validos)
+            except Exception as e:
+                metricas.incrementar("auditoria.erros", len(itens_validos))
+                logger.error(f"🗄️ Auditoria: falha ao gravar {len(itens_validos)} consultas: {e}")
+            finally:
+                for _ in itens:
+                    self._fila.task_done()
+            metricas.definir("auditoria.fila", self._fila.qsize())
+            if fim:
+                return
+
+    def descarregar(self):
+        """Bloqueia até tudo o que foi enfileirado estar gravado."""
+        self._fila.join()
+
+    def fechar(self):
+        if self._thread.is_alive():
+            self._fila.put(_FIM)
+            self._thread.join()
+        with self._lock:
+            self._conn.close()
+
+    # ---------------------------------------------------------
+    # Leitura
+    # ---------------------------------------------------------
+    def _ler(self, segmento: str, offset: int, tamanho: int) -> dict:
+        with open(os.path.join(self.diretorio, segmento), "rb") as f:
+            f.seek(offset)
+            tamanho_gravado, crc = _CABECALHO.unpack(f.read(_CABECALHO.size))
+            comprimido = f.read(tamanho_gravado)
+        bruto = zlib.decompress(comprimido)
+        if tamanho_gravado != tamanho or zlib.crc32(bruto) != crc:
+            raise ValueError(f"Registro corrompido em {segmento}@{offset}")
+        return json.loads(bruto)
+
+    def buscar(self, trace_id: str) -> dict | None:
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT segmento, offset, tamanho FROM consultas WHERE trace_id = ?", (trace_id,)
+            ).fetchone()
+        return self._ler(*linha) if linha else None
+
+    def periodo(self, inicio, fim=None):
+        """Itera as consultas com data entre `inicio` e `fim` (inclusive, YYYY-MM-DD ou date)."""
+        fim = fim or inicio
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT segmento, offset, tamanho FROM consultas WHERE data BETWEEN ? AND ? "
+                "ORDER BY criado_em",
+                (_data_iso(inicio), _data_iso(fim)),
+            ).fetchall()
+        for linha in linhas:
+            yield self._ler(*linha)
+
+    def reindexar(self) -> int:
+        """Reconstrói o índice percorrendo os segmentos (ex.: índice perdido)."""
+        self.descarregar()
+        indices = []
+        for segmento in self._segmentos():
+            with open(os.path.join(self.diretorio, segmento), "rb") as f:
+                while True:
+                    offset = f.tell()
+                    cabecalho = f.read(_CABECALHO.size)
+                    if len(cabecalho) < _CABECALHO.size:
+                        break
+                    tamanho, _ = _CABECALHO.unpack(cabecalho)
+                    comprimido = f.read(tamanho)
+                    if len(comprimido) < tamanho:
+                        break  # registro truncado por interrupção
+                    registro = json.loads(zlib.decompress(comprimido))
+                    indices.append((
+                        registro["trace_id"], registro["data"], registro["criado_em"],
+                        segmento, offset, tamanho,
+                    ))
+        with self._lock:
+            self._conn.execute("DELETE FROM consultas")
+            self._conn.executemany("INSERT OR REPLACE INTO consultas VALUES (?, ?, ?, ?, ?, ?)", indices)
+            self._conn.commit()
+        logger.info(f"🗄️ Auditoria: índice reconstruído com {len(indices)} consultas")
+        return len(indices)
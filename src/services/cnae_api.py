@@ -1,4 +1,77 @@
-import requests
+import csv
+import os
+import re
+import threading
+import time
+
+from utils.logs import logger
+from utils.transporte import sessao_http
+
+
+URL_CNAE = "https://servicodados.ibge.gov.br/api/v2/cnae/subclasses"
+TABELA_CNAE_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cnae_subclasses.csv")
+
+# Espera após falha no download antes de nova tentativa (s): dobra a cada falha
+BACKOFF_INICIAL_S = 30.0
+BACKOFF_MAX_S = 600.0
+
+_tabela = None
+_falhas = 0
+_proxima_tentativa = 0.0
+_lock = threading.Lock()
+
+
+def baixar_tabela_cnae(caminho: str = TABELA_CNAE_PADRAO, timeout: float = 30) -> dict:
+    """Baixa as subclasses CNAE do IBGE e grava em CSV (codigo,titulo)."""
+    resp = sessao_http("ibge").get(URL_CNAE, timeout=timeout)
+    resp.raise_for_status()
+    # A API do IBGE devolve a descrição em "descricao"
+    tabela = {
+        re.sub(r"\D", "", str(item["id"])): item.get("descricao") or item.get("title", "")
+        for item in resp.json()
+    }
+
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["codigo", "titulo"])
+        for codigo in sorted(tabela):
+            escritor.writerow([codigo, tabela[codigo]])
+    logger.info(f"📚 Tabela CNAE gravada em {caminho} ({len(tabela)} subclasses).")
+    return tabela
+
+
+def carregar_tabela_cnae(caminho: str = TABELA_CNAE_PADRAO) -> dict | None:
+    """{codigo de 7 dígitos: titulo} a partir do CSV local, ou None se não existir."""
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding="utf-8", newline="") as f:
+        return {re.sub(r"\D", "", linha["codigo"]): linha["titulo"] for linha in csv.DictReader(f)}
+
+
+def tabela_cnae() -> dict:
+    """
+    Tabela CNAE do processo: CSV local; na ausência, baixa do IBGE e grava
+    o CSV. Falha de rede resulta em tabela vazia, sem guardá‑la: uma nova
+    tentativa é feita após um backoff (BACKOFF_INICIAL_S, dobrando a cada
+    falha até BACKOFF_MAX_S); até lá, a tabela vazia é retornada sem rede.
+    """
+    global _tabela, _falhas, _proxima_tentativa
+    with _lock:
+        if _tabela is not None:
+            return _tabela
+        _tabela = carregar_tabela_cnae()
+        if _tabela is not None or time.monotonic() < _proxima_tentativa:
+            return _tabela or {}
+        try:
+            _tabela = baixar_tabela_cnae()
+            _falhas = 0
+            return _tabela
+        except Exception as e:
+            _falhas += 1
+            espera = min(BACKOFF_MAX_S, BACKOFF_INICIAL_S * 2 ** (_falhas - 1))
+            _proxima_tentativa = time.monotonic() + espera
+            logger.warning(f"📚 Tabela CNAE indisponível (nova tentativa em {espera:.0f}s): {e}")
+            return {}
 
 
 def buscar_cnae(query: str):
@@ -7,19 +80,14 @@ def buscar_cnae(query: str):
     if len(digitos) < 2:
         return []
 
-    try:
-        url = "https://servicodados.ibge.gov.br/api/v2/cnae/subclasses"
-        resp = requests.get(url).json()
-
-        resultados = []
-        for item in resp:
-            if query.replace("-", "").replace("/", "") in item["id"]:
-                resultados.append({
-                    "code": item["id"],
-                    "title": item["title"]
-                })
-
-        return resultados[:5]
+    resultados = []
+    for codigo, titulo in tabela_cnae().items():
+        if digitos in codigo:
+            resultados.append({
+                "code": codigo,
+                "title": titulo
+            })
+            if len(resultados) == 5:
+                break
 
-    except Exception:
-        return []
\ No newline at end of file
+    return resultados
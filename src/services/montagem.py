@@ -0,0 +1,89 @@
+# services/montagem.py
+
+"""
+Embrulhos aplicados sobre backends já montados — razão de custos, hedge,
+agendador e cache —, compartilhados pelo app e pelas ferramentas de tools/.
+A ordem de aplicação está na docstring de cada um.
+"""
+
+from rag.coalescer import EmbeddingCoalescer
+from rag.web import normalizar_consulta
+from utils.agendador import Agendado
+from utils.cache import ComCache
+from utils.custos import MODELOS_PADRAO, Contabilizado
+from utils.hedging import ComHedge, PoliticaHedge
+
+
+def contabilizar(llm, rag_pipeline, modelos=None):
+    """
+    Lança no razão de custos (utils/custos.py) as chamadas do LLM‑as‑Judge,
+    da geração final e dos embeddings. Aplicar logo após montar os backends:
+    por fora da cassete (chamadas reproduzidas também são lançadas) e antes
+    de hedge, limites e agendador — o razão fica dentro do hedge e lança cada
+    tentativa faturada, inclusive a duplicata.
+    Com coalescência, os embeddings são lançados por lote enviado (abaixo do
+    coalescedor, como em `aplicar_limites` de tools/batch_runner.py), sem
+    trace de uma consulta.
+    Retorna o `llm` da geração final embrulhado.
+    """
+    modelos = modelos or MODELOS_PADRAO
+    rag_pipeline.llm_reranker.llm = Contabilizado(rag_pipeline.llm_reranker.llm, "rag.llm_judge", modelos["rag.llm_judge"])
+    retriever = rag_pipeline.retriever
+    if isinstance(retriever.embeddings, EmbeddingCoalescer):
+        retriever.embeddings.embeddings = Contabilizado(retriever.embeddings.embeddings, "embedding", modelos["embedding"])
+    else:
+        retriever.embeddings = Contabilizado(retriever.embeddings, "embedding", modelos["embedding"])
+    return Contabilizado(llm, "generate_final", modelos["generate_final"])
+
+
+def aplicar_hedging(rag_pipeline, percentil: float = 95, max_extra: float = 0.05):
+    """
+    Hedge (utils/hedging.py) em embeddings, Qdrant e LLM‑as‑Judge. Aplicar
+    depois do razão de custos (`contabilizar`) e antes de limites e agendador:
+    o hedge fica abaixo da coalescência e por fora do razão, que lança cada
+    tentativa — a primária e a duplicata são ambas faturadas.
+    """
+    rag_pipeline.retriever.ativar_hedging(percentil=percentil, max_extra=max_extra)
+    politica = PoliticaHedge("rag.llm_judge", percentil=percentil, max_extra=max_extra)
+    rag_pipeline.llm_reranker.llm = ComHedge(rag_pipeline.llm_reranker.llm, politica)
+
+
+def aplicar_agendador(llm, rag_pipeline, agendador):
+    """
+    Passa geração final, LLM‑as‑Judge e embeddings pelo recurso "openai" e o
+    CrossEncoder pelo recurso "rerank" do agendador (utils/agendador.py), e
+    liga a degradação do juiz para lote. Registre os recursos antes; aplicar
+    depois do razão de custos, do hedge e dos limites.
+    Retorna o `llm` da geração final embrulhado.
+
+    Embeddings são agendados por chamada, por fora da coalescência: o lote
+    coalescido roda em outra thread, sem a classe de prioridade de quem pediu.
+    """
+    rag_pipeline.llm_reranker.llm = Agendado(rag_pipeline.llm_reranker.llm, agendador, "openai")
+    retriever = rag_pipeline.retriever
+    retriever.embeddings = Agendado(retriever.embeddings, agendador, "openai", ("embed_query", "embed_documents"))
+    rag_pipeline.vector_reranker = Agendado(rag_pipeline.vector_reranker, agendador, "rerank", ("rerank",))
+    rag_pipeline.agendador = agendador
+    return Agendado(llm, agendador, "openai")
+
+
+def _chave_juiz(args, kwargs) -> str:
+    """O prompt do juiz traz a pergunta como digitada; normalizado, variações de caixa e acentos coincidem."""
+    mensagens = args[0]
+    return normalizar_consulta(mensagens[-1]["content"])
+
+
+def aplicar_cache(rag_pipeline, cache, modelos=None):
+    """
+    Liga o CachePersistente (utils/cache.py) ao pipeline: candidatos da busca
+    e scores do reranking vetorial no próprio pipeline; embeddings de
+    consultas e respostas do LLM‑as‑Judge por proxy, pelo modelo de cada um.
+    Aplicar por último (por fora do razão de custos): acertos não são lançados.
+    """
+    modelos = modelos or MODELOS_PADRAO
+    rag_pipeline.cache = cache
+    retriever = rag_pipeline.retriever
+    retriever.embeddings = ComCache(retriever.embeddings, cache, "embedding", ("embed_query",), modelos["embedding"])
+    rag_pipeline.llm_reranker.llm = ComCache(
+        rag_pipeline.llm_reranker.llm, cache, "rag.llm_judge", variante=modelos["rag.llm_judge"], chave=_chave_juiz,
+    )
@@ -0,0 +1,184 @@
+# services/perfil_import.py
+
+import csv
+import io
+import json
+import re
+import unicodedata
+
+from services.formatters import formatar_cnae, formatar_moeda
+from utils.logs import logger
+
+
+REGIMES = ["Simples Nacional", "Lucro Presumido", "Lucro Real"]
+
+_APELIDOS_REGIME = {
+    "simples nacional": "Simples Nacional",
+    "simples": "Simples Nacional",
+    "sn": "Simples Nacional",
+    "lucro presumido": "Lucro Presumido",
+    "presumido": "Lucro Presumido",
+    "lp": "Lucro Presumido",
+    "lucro real": "Lucro Real",
+    "real": "Lucro Real",
+    "lr": "Lucro Real",
+}
+
+
+def _sem_acentos(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def ler_perfis(conteudo: str, formato: str) -> list:
+    """
+    Registros de um CSV (cabeçalho = campos do perfil) ou JSONL, como dicts.
+    Cada registro leva "__linha__" (número da linha no arquivo).
+    """
+    formato = formato.lower().lstrip(".")
+    if formato == "csv":
+        amostra = conteudo[:2048]
+        delimitador = ";" if amostra.count(";") > amostra.count(",") else ","
+        leitor = csv.DictReader(io.StringIO(conteudo), delimiter=delimitador)
+        return [{**linha, "__linha__": leitor.line_num} for linha in leitor]
+    if formato in ("jsonl", "ndjson"):
+        linhas = []
+        for n, linha in enumerate(conteudo.splitlines(), start=1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError as e:
+                registro = {"__erro__": f"JSON inválido: {e.msg}"}
+            if not isinstance(registro, dict):
+                registro = {"__erro__": "Registro deve ser um objeto JSON"}
+            linhas.append({**registro, "__linha__": n})
+        return linhas
+    raise ValueError(f"Formato não suportado: {formato!r} (use csv ou jsonl)")
+
+
+# ---------------------------------------------------------
+# Normalização por coluna (uma passada por campo sobre o lote)
+# ---------------------------------------------------------
+def normalizar_cnaes(valores: list, tabela: dict | None) -> list:
+    """[(cnae_formatado, erro)]: 7 dígitos e, com tabela, subclasse existente."""
+    resultado = []
+    for valor in valores:
+        digitos = re.sub(r"\D", "", str(valor or ""))
+        if not digitos:
+            resultado.append(("", "CNAE ausente"))
+        elif len(digitos) != 7:
+            resultado.append((str(valor), f"CNAE deve ter 7 dígitos (recebido {len(digitos)})"))
+        elif tabela is not None and digitos not in tabela:
+            resultado.append((formatar_cnae(digitos), "CNAE não encontrado na tabela de subclasses"))
+        else:
+            resultado.append((formatar_cnae(digitos), None))
+    return resultado
+
+
+def normalizar_regimes(valores: list) -> list:
+    resultado = []
+    for valor in valores:
+        chave = re.sub(r"\s+", " ", _sem_acentos(str(valor or "")).lower()).strip()
+        regime = _APELIDOS_REGIME.get(chave)
+        resultado.append((regime, None) if regime else (str(valor or ""), f"Regime inválido (use {', '.join(REGIMES)})"))
+    return resultado
+
+
+def normalizar_faturamentos(valores: list) -> list:
+    """
+    formatar_moeda lê os dois últimos dígitos como centavos; valores sem
+    centavos explícitos ("1200000", "1.234") recebem ",00" antes. Um último
+    "." ou "," seguido de 1–2 dígitos é a vírgula decimal ("1234.5" →
+    R$ 1.234,50); com 3 dígitos, separador de milhar.
+    """
+    resultado = []
+    for valor in valores:
+        texto = str(valor or "").strip()
+        if not texto:
+            resultado.append(("", None))  # opcional
+            continue
+        if not re.search(r"\d", texto) or re.search(r"[^\d\s.,R$]", texto):
+            resultado.append((texto, "Faturamento inválido"))
+            continue
+        decimal = re.search(r"[.,](\d{1,2})$", texto)
+        if decimal is None:
+            texto += ",00"
+        elif len(decimal.group(1)) == 1:
+            texto += "0"
+        resultado.append((formatar_moeda(texto), None))
+    return resultado
+
+
+def validar_perfis(linhas: list, tabela_cnae: dict | None = None) -> tuple:
+    """
+    Valida e normaliza o lote inteiro. Retorna (perfis, erros):
+    perfis = {nome_empresa: perfil} das linhas válidas;
+    erros = [{"linha", "campo", "erro"}].
+    """
+    cnaes = normalizar_cnaes([l.get("cnae_principal") for l in linhas], tabela_cnae)
+    regimes = normalizar_regimes([l.get("regime_tributario") for l in linhas])
+    faturamentos = normalizar_faturamentos([l.get("faturamento_anual") for l in linhas])
+
+    perfis, erros, vistos = {}, [], set()
+    for i, linha in enumerate(linhas):
+        n = linha.get("__linha__", i + 1)
+        if "__erro__" in linha:
+            erros.append({"linha": n, "campo": None, "erro": linha["__erro__"]})
+            continue
+
+        erros_linha = []
+        nome = str(linha.get("nome_empresa") or "").strip()
+        if not nome:
+            erros_linha.append(("nome_empresa", "Nome da empresa ausente"))
+        elif nome in vistos:
+            erros_linha.append(("nome_empresa", "Nome repetido no arquivo"))
+
+        for campo, (_, erro) in (
+            ("cnae_principal", cnaes[i]),
+            ("regime_tributario", regimes[i]),
+            ("faturamento_anual", faturamentos[i]),
+        ):
+            if erro:
+                erros_linha.append((campo, erro))
+
+        if erros_linha:
+            erros.extend({"linha": n, "campo": campo, "erro": erro} for campo, erro in erros_linha)
+            continue
+
+        vistos.add(nome)
+        # Colunas extras seguem no perfil (entram no bloco de prompt)
+        extras = {
+            k: v for k, v in linha.items()
+            if k and not k.startswith("__") and v not in (None, "")
+        }
+        perfis[nome] = {
+            **extras,
+            "nome_empresa": nome,
+            "cnae_principal": cnaes[i][0],
+            "regime_tributario": regimes[i][0],
+            "faturamento_anual": faturamentos[i][0],
+        }
+
+    return perfis, erros
+
+
+def importar_perfis(store, usuario: str, conteudo: str, formato: str, tabela_cnae: dict | None = None) -> dict:
+    """
+    Lê, valida e grava (em uma transação) os perfis válidos no PerfilStore.
+    Linhas com erro não são gravadas e aparecem no relatório.
+    """
+    linhas = ler_perfis(conteudo, formato)
+    perfis, erros = validar_perfis(linhas, tabela_cnae)
+    importados = store.salvar_lote(usuario, perfis) if perfis else 0
+
+    linhas_com_erro = len({e["linha"] for e in erros})
+    logger.info(f"📥 Importação: {importados} perfis gravados, {linhas_com_erro} linhas com erro.")
+    return {
+        "total": len(linhas),
+        "importados": importados,
+        "linhas_com_erro": linhas_com_erro,
+        "validacao_cnae": "tabela" if tabela_cnae is not None else "formato",
+        "erros": erros,
+        "perfis": list(perfis),
+    }
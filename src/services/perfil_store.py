@@ -0,0 +1,255 @@
+# services/perfil_store.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.logs import logger
+
+
+PERFIS_DB_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "perfis.db")
+
+# Rótulos do bloco de prompt, na ordem de exibição; demais chaves vêm depois
+ROTULOS_PERFIL = {
+    "nome_empresa": "Empresa",
+    "cnae_principal": "CNAE principal",
+    "regime_tributario": "Regime tributário",
+    "faturamento_anual": "Faturamento anual",
+}
+
+# Campo do perfil → campo do payload no Qdrant usado como filtro
+CAMPOS_FILTRO_PADRAO = {
+    "regime_tributario": "regime_tributario",
+}
+
+
+def montar_bloco_prompt(perfil) -> str:
+    """Bloco normalizado do perfil para o prompt (uma linha por campo preenchido)."""
+    if not isinstance(perfil, dict):
+        return str(perfil or "").strip()
+
+    chaves = [k for k in ROTULOS_PERFIL if k in perfil] + sorted(k for k in perfil if k not in ROTULOS_PERFIL)
+    linhas = []
+    for chave in chaves:
+        valor = perfil[chave]
+        if valor in (None, "", [], {}):
+            continue
+        if isinstance(valor, (dict, list)):
+            valor = json.dumps(valor, ensure_ascii=False, sort_keys=True)
+        rotulo = ROTULOS_PERFIL.get(chave, chave.replace("_", " ").capitalize())
+        linhas.append(f"- {rotulo}: {str(valor).strip()}")
+    return "\n".join(linhas)
+
+
+def derivar_filtros(perfil, campos: dict | None = None) -> list:
+    """
+    Condições de payload derivadas do perfil: [{"campo", "valores"}].
+    Na busca, cada condição aceita o valor do perfil ou payload sem o campo
+    (documentos gerais não são excluídos).
+    """
+    if not isinstance(perfil, dict):
+        return []
+    campos = CAMPOS_FILTRO_PADRAO if campos is None else campos
+    filtros = []
+    for chave, campo in campos.items():
+        valor = perfil.get(chave)
+        if valor in (None, "", []):
+            continue
+        valores = valor if isinstance(valor, list) else [valor]
+        filtros.append({"campo": campo, "valores": [str(v) for v in valores]})
+    return filtros
+
+
+class PerfilStore:
+    """
+    Perfis persistidos em SQLite, por usuário, com artefatos pré‑calculados
+    no salvamento: bloco normalizado para o prompt, filtros do Qdrant e o
+    embedding do perfil (a cada pergunta, só a pergunta é embedada).
+
+    Leituras passam por um cache em memória; uma instância por processo é
+    compartilhada entre as sessões do mesmo usuário.
+
+    embedder: callable(texto) -> vetor (ex.: QdrantRetriever.embed_query).
+    embedder_lote: callable(textos) -> vetores, usado em `salvar_lote`.
+    modelo: identificador do modelo de embedding; embeddings gravados com
+    outro modelo são recalculados na leitura.
+    """
+
+    def __init__(
+        self,
+        caminho: str = PERFIS_DB_PADRAO,
+        embedder=None,
+        modelo: str = "",
+        campos_filtro: dict | None = None,
+        embedder_lote=None,
+    ):
+        self.caminho = caminho
+        self.embedder = embedder
+        self.embedder_lote = embedder_lote
+        self.modelo = modelo
+        self.campos_filtro = campos_filtro
+        self._cache = {}
+        self._lock = threading.RLock()
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS perfis (
+                usuario TEXT NOT NULL,
+                nome TEXT NOT NULL,
+                dados TEXT NOT NULL,
+                bloco_prompt TEXT NOT NULL,
+                filtros TEXT NOT NULL,
+                embedding TEXT,
+                modelo TEXT,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (usuario, nome)
+            )
+            """
+        )
+        self._conn.commit()
+
+    # ---------------------------------------------------------
+    # Artefatos
+    # ---------------------------------------------------------
+    def _embedding(self, bloco: str):
+        if self.embedder is None or not bloco:
+            return None
+        try:
+            return list(self.embedder(f"Perfil: {bloco}"))
+        except Exception as e:
+            # Sem embedding do perfil a busca volta a embedar pergunta + perfil
+            logger.warning(f"👤 Falha ao gerar embedding do perfil: {e}")
+            return None
+
+    def preparar(self, perfil) -> dict:
+        bloco = montar_bloco_prompt(perfil)
+        return {
+            "bloco_prompt": bloco,
+            "filtros": derivar_filtros(perfil, self.campos_filtro),
+            "embedding": self._embedding(bloco),
+            "modelo": self.modelo,
+        }
+
+    # ---------------------------------------------------------
+    # Operações
+    # ---------------------------------------------------------
+    _UPSERT = """
+        INSERT INTO perfis (usuario, nome, dados, bloco_prompt, filtros, embedding, modelo, atualizado_em)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (usuario, nome) DO UPDATE SET
+            dados = excluded.dados,
+            bloco_prompt = excluded.bloco_prompt,
+            filtros = excluded.filtros,
+            embedding = excluded.embedding,
+            modelo = excluded.modelo,
+            atualizado_em = excluded.atualizado_em
+    """
+
+    def _linha(self, usuario: str, registro: dict) -> tuple:
+        return (
+            usuario, registro["nome"],
+            json.dumps(registro["dados"], ensure_ascii=False),
+            registro["bloco_prompt"],
+            json.dumps(registro["filtros"], ensure_ascii=False),
+            json.dumps(registro["embedding"]) if registro["embedding"] is not None else None,
+            self.modelo,
+            time.time(),
+        )
+
+    def salvar(self, usuario: str, nome: str, perfil) -> dict:
+        """Grava o perfil e seus artefatos. Retorna o registro carregado."""
+        registro = {"nome": nome, "dados": perfil, **self.preparar(perfil)}
+        with self._lock:
+            self._conn.execute(self._UPSERT, self._linha(usuario, registro))
+            self._conn.commit()
+            self._cache[(usuario, nome)] = registro
+        logger.info(f"👤 Perfil '{nome}' salvo para '{usuario}'.")
+        return registro
+
+    def salvar_lote(self, usuario: str, perfis: dict) -> int:
+        """
+        Grava {nome: perfil} em uma única transação (tudo ou nada).
+        Com `embedder_lote`, os embeddings dos perfis saem de uma só chamada.
+        """
+        registros = []
+        for nome, perfil in perfis.items():
+            bloco = montar_bloco_prompt(perfil)
+            registros.append({
+                "nome": nome,
+                "dados": perfil,
+                "bloco_prompt": bloco,
+                "filtros": derivar_filtros(perfil, self.campos_filtro),
+                "embedding": None if self.embedder_lote else self._embedding(bloco),
+                "modelo": self.modelo,
+            })
+
+        if self.embedder_lote and registros:
+            try:
+                vetores = self.embedder_lote([f"Perfil: {r['bloco_prompt']}" for r in registros])
+                for registro, vetor in zip(registros, vetores):
+                    registro["embedding"] = list(vetor)
+            except Exception as e:
+                # Embeddings ficam para a primeira leitura de cada perfil
+                logger.warning(f"👤 Falha ao gerar embeddings do lote: {e}")
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(self._UPSERT, [self._linha(usuario, r) for r in registros])
+            for registro in registros:
+                self._cache[(usuario, registro["nome"])] = registro
+        logger.info(f"👤 {len(registros)} perfis salvos em lote para '{usuario}'.")
+        return len(registros)
+
+    def carregar(self, usuario: str, nome: str) -> dict | None:
+        """Registro {nome, dados, bloco_prompt, filtros, embedding} ou None."""
+        chave = (usuario, nome)
+        with self._lock:
+            registro = self._cache.get(chave)
+            if registro is not None:
+                return registro
+
+            linha = self._conn.execute(
+                "SELECT dados, bloco_prompt, filtros, embedding, modelo FROM perfis WHERE usuario = ? AND nome = ?",
+                chave,
+            ).fetchone()
+            if linha is None:
+                return None
+
+            dados, bloco, filtros, embedding, modelo = linha
+            registro = {
+                "nome": nome,
+                "dados": json.loads(dados),
+                "bloco_prompt": bloco,
+                "filtros": json.loads(filtros),
+                "embedding": json.loads(embedding) if embedding else None,
+                "modelo": modelo,
+            }
+            if self.embedder is not None and (registro["embedding"] is None or modelo != self.modelo):
+                # Modelo de embedding mudou desde o salvamento: recalcula e regrava
+                return self.salvar(usuario, nome, registro["dados"])
+
+            self._cache[chave] = registro
+            return registro
+
+    def listar(self, usuario: str) -> dict:
+        """{nome: dados} dos perfis do usuário, em ordem de nome."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT nome, dados FROM perfis WHERE usuario = ? ORDER BY nome", (usuario,)
+            ).fetchall()
+        return {nome: json.loads(dados) for nome, dados in linhas}
+
+    def remover(self, usuario: str, nome: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM perfis WHERE usuario = ? AND nome = ?", (usuario, nome))
+            self._conn.commit()
+            self._cache.pop((usuario, nome), None)
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,59 @@
+# services/warmup.py
+
+import threading
+import time
+
+from utils.logs import logger
+
+
+class Aquecimento:
+    """
+    Executa tarefas de aquecimento (carregar CrossEncoder, abrir conexões)
+    em uma thread daemon, sem bloquear a interface.
+
+    tarefas: {nome: callable sem argumentos}
+    """
+
+    PENDENTE = "pendente"
+    OK = "ok"
+    ERRO = "erro"
+
+    def __init__(self, tarefas: dict):
+        self.tarefas = dict(tarefas)
+        self._status = {nome: self.PENDENTE for nome in self.tarefas}
+        self._tempos = {}
+        self._concluido = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name="aquecimento", daemon=True)
+            self._thread.start()
+        return self
+
+    def _executar(self):
+        for nome, tarefa in self.tarefas.items():
+            inicio = time.perf_counter()
+            try:
+                tarefa()
+                self._status[nome] = self.OK
+            except Exception as e:
+                # Falha no aquecimento não é fatal: a etapa carrega sob demanda
+                logger.warning(f"🔥 Aquecimento '{nome}' falhou: {e}")
+                self._status[nome] = self.ERRO
+            self._tempos[nome] = round(time.perf_counter() - inicio, 3)
+            logger.info(f"🔥 Aquecimento '{nome}': {self._status[nome]} em {self._tempos[nome]}s")
+        self._concluido.set()
+
+    @property
+    def pronto(self) -> bool:
+        return self._concluido.is_set()
+
+    def aguardar(self, timeout: float | None = None) -> bool:
+        return self._concluido.wait(timeout)
+
+    def status(self) -> dict:
+        return {
+            nome: {"status": self._status[nome], "tempo_s": self._tempos.get(nome)}
+            for nome in self.tarefas
+        }
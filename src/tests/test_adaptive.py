@@ -0,0 +1,63 @@
+from rag.adaptive import PoliticaProfundidade, resumo_profundidade
+from rag.pipeline import HybridRAGPipeline
+from utils.metrics import metricas
+
+
+def _docs(scores, campo="score"):
+    return [{"index": i, "page_content": f"doc{i}", campo: s, "metadata": {}} for i, s in enumerate(scores)]
+
+
+def test_corta_candidatos_no_maior_gap():
+    politica = PoliticaProfundidade(limite_min=2, gap_qdrant=0.1)
+    docs = _docs([0.9, 0.88, 0.86, 0.5, 0.49, 0.48])
+    assert len(politica.cortar_candidatos(docs)) == 3
+
+
+def test_nao_corta_sem_gap_relevante():
+    politica = PoliticaProfundidade(limite_min=2, gap_qdrant=0.1)
+    docs = _docs([0.9, 0.88, 0.86, 0.84, 0.82])
+    assert len(politica.cortar_candidatos(docs)) == 5
+
+
+def test_expande_quando_scores_achatados():
+    politica = PoliticaProfundidade(limite_inicial=4, limite_max=8, spread_expandir=0.05)
+    assert politica.deve_expandir(_docs([0.80, 0.79, 0.79, 0.78]), 4)
+    assert not politica.deve_expandir(_docs([0.90, 0.70, 0.60, 0.50]), 4)
+
+
+def test_juiz_dispensavel_com_ranking_conclusivo():
+    politica = PoliticaProfundidade(gap_juiz=3.0, score_min_juiz=0.0)
+    assert politica.juiz_dispensavel(_docs([8.0, 7.5, 6.0, -2.0], "score_vetorial"), 3)
+    assert not politica.juiz_dispensavel(_docs([8.0, 7.5, 6.0, 5.0], "score_vetorial"), 3)
+
+
+class RetrieverComScores:
+    def query(self, q, p, limit=12):
+        return _docs([0.9, 0.8, 0.7])
+
+
+class VectorComScores:
+    def rerank(self, q, docs, top_k):
+        return [{**d, "score_vetorial": 10.0 - i * 5} for i, d in enumerate(docs)][:top_k]
+
+
+class JuizNaoChamado:
+    def rerank(self, q, docs, top_k):
+        raise AssertionError("juiz não deveria rodar")
+
+
+def test_pipeline_pula_juiz_e_contabiliza():
+    metricas.resetar()
+    pipe = HybridRAGPipeline(
+        qdrant_retriever=RetrieverComScores(),
+        llm=None,
+        final_top_k=1,
+        vector_reranker=VectorComScores(),
+        llm_reranker=JuizNaoChamado(),
+        politica_profundidade=PoliticaProfundidade(gap_juiz=3.0),
+    )
+
+    _, ctx = pipe.run("pergunta", "perfil")
+
+    assert ctx == "doc0"
+    assert resumo_profundidade()["fracao_juiz_pulado"] == 1.0
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from tools.backends import backends_falsos
+from utils.agendador import INTERATIVO, LOTE, Agendado, Agendador, SobrecargaAgendador, prioridade
+from utils.metrics import metricas
+from utils.tracing import Rastro, ativar
+
+
+class MockCliente:
+    def __init__(self):
+        self.liberar = threading.Event()
+        self.ordem = []
+
+    def invoke(self, rotulo):
+        if rotulo == "bloqueio":
+            self.liberar.wait(2)
+        self.ordem.append(rotulo)
+        return rotulo
+
+
+def _em_thread(funcao, classe, *args):
+    def alvo():
+        with prioridade(classe):
+            try:
+                funcao(*args)
+            except SobrecargaAgendador:
+                pass
+
+    t = threading.Thread(target=alvo)
+    t.start()
+    return t
+
+
+def _esperar_fila(recurso, n):
+    limite = time.monotonic() + 2
+    while recurso.na_fila() < n and time.monotonic() < limite:
+        time.sleep(0.005)
+
+
+def test_interativo_passa_a_frente_e_lote_e_recusado_com_fila_cheia():
+    metricas.resetar()
+    agendador = Agendador()
+    recurso = agendador.registrar("openai", concorrencia=1, fila_max_lote=1, fila_degradar_lote=1)
+    cliente = MockCliente()
+    agendado = Agendado(cliente, agendador, "openai")
+
+    threads = [_em_thread(agendado.invoke, INTERATIVO, "bloqueio")]
+    time.sleep(0.05)
+    threads.append(_em_thread(agendado.invoke, LOTE, "lote"))
+    _esperar_fila(recurso, 1)
+    threads.append(_em_thread(agendado.invoke, INTERATIVO, "interativo"))
+    _esperar_fila(recurso, 2)
+
+    # Fila de lote cheia: novo lote é recusado; lote degrada, interativo não
+    with prioridade(LOTE):
+        with pytest.raises(SobrecargaAgendador):
+            agendado.invoke("recusado")
+        assert agendador.degradar("openai")
+    assert not agendador.degradar("openai")
+
+    cliente.liberar.set()
+    for t in threads:
+        t.join(2)
+
+    assert cliente.ordem == ["bloqueio", "interativo", "lote"]
+    resumo = agendador.resumo()["openai"]
+    assert resumo[LOTE] == {**resumo[LOTE], "chamadas": 1, "descartadas": 1, "degradadas": 1}
+    assert resumo[INTERATIVO]["chamadas"] == 2
+
+
+def test_lote_nao_ocupa_vaga_reservada():
+    agendador = Agendador()
+    recurso = agendador.registrar("rerank", concorrencia=2, reserva_interativa=1)
+    cliente = MockCliente()
+    agendado = Agendado(cliente, agendador, "rerank")
+
+    threads = [_em_thread(agendado.invoke, LOTE, "bloqueio"), _em_thread(agendado.invoke, LOTE, "lote")]
+    _esperar_fila(recurso, 1)
+    interativo = _em_thread(agendado.invoke, INTERATIVO, "interativo")
+    interativo.join(2)
+    assert cliente.ordem == ["interativo"]  # a vaga reservada atende o interativo na hora
+
+    cliente.liberar.set()
+    for t in threads:
+        t.join(2)
+    assert cliente.ordem == ["interativo", "bloqueio", "lote"]
+
+
+def test_pipeline_pula_juiz_em_lote_sob_sobrecarga():
+    class AgendadorSobrecarregado:
+        def degradar(self, recurso):
+            return recurso == "openai"
+
+    _, pipeline, _ = backends_falsos()
+    pipeline.profundidade = None
+    pipeline.agendador = AgendadorSobrecarregado()
+
+    rastro = Rastro()
+    with ativar(rastro):
+        fontes, contexto = pipeline.run("alíquota do IBS", "perfil")
+
+    assert fontes and contexto
+    assert {"etapa": "rag.llm_judge", "decisao": "pulada", "motivo": "sobrecarga"} in rastro.eventos
+    assert "rag.llm_judge" not in rastro.timings
@@ -0,0 +1,144 @@
+import json
+
+from langchain_core.messages import AIMessage
+
+from graph.builder import build_graph
+from services.montagem import aplicar_cache
+from tools.aquecer_cache import aquecer, carregar_perguntas, preparar_regimes
+from tools.backends import backends_falsos
+from tools.fakes import FakeLLM
+from utils.cache import CachePersistente
+from utils.tracing import Rastro, ativar
+
+
+class MockJuiz(FakeLLM):
+    def __init__(self):
+        super().__init__()
+        self.chamadas = []
+
+    def invoke(self, messages, **kwargs):
+        self.chamadas.append((messages, kwargs))
+        return super().invoke(messages, **kwargs)
+
+
+def test_versao_do_corpus_so_vale_apos_publicar(tmp_path):
+    caminho = str(tmp_path / "novo" / "cache.db")  # diretório criado sob demanda
+    app = CachePersistente(caminho, recarregar_s=0)
+    aquecedor = CachePersistente(caminho, versao="v1")
+
+    aquecedor.gravar("rag.qdrant", "k", [{"page_content": "IBS"}])
+    aquecedor.gravar("embedding", "k", [0.1, 0.2])
+    assert app.obter("rag.qdrant", "k") is None
+    assert app.obter("embedding", "k") == [0.1, 0.2]  # independe do corpus
+
+    aquecedor.publicar()
+    assert app.obter("rag.qdrant", "k") == [{"page_content": "IBS"}]
+
+    # Reindexação: a versão nova substitui a busca, embeddings continuam
+    assert CachePersistente(caminho, versao="v2").publicar() == 1
+    assert app.obter("rag.qdrant", "k") is None
+    assert app.contagem() == {"embedding": 1}
+
+
+def test_aquecimento_serve_perfis_do_mesmo_regime(tmp_path):
+    entrada = tmp_path / "perguntas.json"
+    entrada.write_text(
+        '{"Simples Nacional": ["Qual o limite do Simples Nacional?", "Qual o limite do Simples Nacional?"],'
+        ' "Lucro Real": ["A CBS substitui PIS e COFINS?"]}',
+        encoding="utf-8",
+    )
+    itens = carregar_perguntas(str(entrada))
+    assert len(itens) == 2
+
+    caminho = str(tmp_path / "cache.db")
+    cache = CachePersistente(caminho, versao="v1")
+    llm, pipeline, web_tool = backends_falsos()
+    juiz = pipeline.llm_reranker.llm = MockJuiz()
+    aplicar_cache(pipeline, cache)
+    graph = build_graph(llm=llm, retriever=pipeline, web_tool=web_tool, cache_respostas=cache)
+    preparados = preparar_regimes(["Simples Nacional", "Lucro Real"], pipeline.retriever.embed_query)
+
+    relatorio = aquecer(itens, preparados, pipeline, graph, concorrencia=2)
+    assert relatorio["cobertura"] == 1.0 and not relatorio["falhas"]
+    assert relatorio["etapas"]["generate_final"]["quente"] == 2
+    # O juiz recebe a requisição original; a chave normalizada só indexa o cache
+    assert juiz.chamadas and all(
+        len(mensagens) == 2 and kwargs.get("response_format") for mensagens, kwargs in juiz.chamadas
+    )
+    respostas_juiz = cache._conn.execute("SELECT valor FROM entradas WHERE estagio = 'rag.llm_judge'").fetchall()
+    assert respostas_juiz
+    for (valor,) in respostas_juiz:
+        assert json.loads(json.loads(valor)["dados"]["content"])["scores"]
+    cache.publicar()
+
+    # Outro processo, perfil só com o regime: nada é recalculado
+    llm, pipeline, web_tool = backends_falsos()
+    aplicar_cache(pipeline, CachePersistente(caminho))
+    graph = build_graph(llm=llm, retriever=pipeline, web_tool=web_tool, cache_respostas=pipeline.cache)
+
+    def em_cache(perfil, artefatos):
+        rastro = Rastro()
+        with ativar(rastro):
+            graph.invoke({
+                "messages": [], "perfil_cliente": perfil, "perfil_artefatos": artefatos,
+                "ultima_pergunta": "Qual o limite do  simples nacional?",
+            })
+        return {e["etapa"] for e in rastro.eventos if e.get("decisao") == "em_cache"}
+
+    perfil, artefatos = preparados["Simples Nacional"]
+    assert em_cache(dict(perfil), dict(artefatos)) == {
+        "rag.qdrant", "rag.rerank_vector", "rag.llm_judge", "generate_final",
+    }
+
+    # Perfil personalizado do mesmo regime: o vetor da busca leva o perfil
+    # e a resposta é dele — nem candidatos nem resposta do regime servem
+    personalizado = {"nome_empresa": "Padaria", "cnae_principal": "1091-1/02", "regime_tributario": "Simples Nacional"}
+    artefatos = {"bloco_prompt": "- Empresa: Padaria\n- CNAE: 1091-1/02", "filtros": artefatos["filtros"]}
+    assert not {"rag.qdrant", "generate_final"} & em_cache(personalizado, artefatos)
+
+
+
+def test_estagios_de_texto_expiram_e_tem_limite(tmp_path):
+    cache = CachePersistente(str(tmp_path / "cache.db"), versao="v1", max_linhas=3, limpar_a_cada=5)
+    for i in range(5):
+        cache.gravar("embedding", f"k{i}", [float(i)])
+    cache.gravar("rag.qdrant", "busca", [])  # estágio do corpus: fora do limite
+    assert cache.contagem() == {"embedding": 3, "rag.qdrant": 1}
+    assert cache.obter("embedding", "k0") is None and cache.obter("embedding", "k4") == [4.0]
+
+    outro = CachePersistente(str(tmp_path / "cache.db"), versao="v1", ttl_texto_s=0)
+    assert outro.obter("embedding", "k4") is None  # vencida, mesmo antes da limpeza
+    assert outro.limpar() == 3
+    assert outro.contagem() == {"rag.qdrant": 1}
+
+
+class MockLLMEco(FakeLLM):
+    """Resposta personalizada: repete a linha da empresa do prompt."""
+
+    def invoke(self, messages, **kwargs):
+        if kwargs.get("response_format"):
+            return super().invoke(messages, **kwargs)
+        empresa = next((l for l in messages[0].content.splitlines() if "Empresa:" in l), "")
+        return AIMessage(content=f"Resposta para {empresa.strip()}")
+
+
+def test_resposta_personalizada_nao_vaza_entre_empresas(tmp_path):
+    llm, pipeline, web_tool = backends_falsos()
+    llm = MockLLMEco()
+    cache = CachePersistente(str(tmp_path / "cache.db"))
+    aplicar_cache(pipeline, cache)
+    graph = build_graph(llm=llm, retriever=pipeline, web_tool=web_tool, cache_respostas=cache)
+    filtros = [{"campo": "regime_tributario", "valores": ["Simples Nacional"]}]
+
+    respostas = []
+    for empresa in ("Padaria Alfa LTDA", "Construtora Beta SA"):
+        perfil = {"nome_empresa": empresa, "regime_tributario": "Simples Nacional"}
+        resultado = graph.invoke({
+            "messages": [], "perfil_cliente": perfil,
+            "perfil_artefatos": {"bloco_prompt": f"- Empresa: {empresa}", "filtros": filtros},
+            "ultima_pergunta": "Qual o limite do Simples Nacional?",
+        })
+        respostas.append(resultado["messages"][-1].content)
+
+    assert "Construtora Beta SA" in respostas[1]
+    assert cache.contagem().get("generate_final", 0) == 0
@@ -0,0 +1,80 @@
+import os
+import time
+
+from protocol import ConsultaContext, FonteDocumento
+from services.auditoria import AuditoriaConsultas
+
+
+def _mcp(trace_id):
+    return ConsultaContext(
+        trace_id=trace_id,
+        perfil_cliente={"regime_tributario": "Simples Nacional"},
+        pergunta_cliente="Qual a alíquota?",
+        contexto_juridico_bruto="LC 214/2024, art. 1º " * 50,
+        fontes_detalhadas=[FonteDocumento(document_source="LC 214/2024", document_type="LEI")],
+        prompt_mestre="prompt",
+    )
+
+
+def test_grava_e_busca_por_trace_id(tmp_path):
+    auditoria = AuditoriaConsultas(diretorio=str(tmp_path))
+    assert auditoria.registrar(_mcp("t1"), "resposta 1")
+    assert auditoria.registrar(_mcp("t2"), "resposta 2", usuario="ana")
+    auditoria.descarregar()
+
+    registro = auditoria.buscar("t2")
+    assert registro["resposta"] == "resposta 2"
+    assert registro["usuario"] == "ana"
+    assert registro["consulta"]["fontes_detalhadas"][0]["document_source"] == "LC 214/2024"
+    assert auditoria.buscar("inexistente") is None
+
+    hoje = registro["data"]
+    assert [r["trace_id"] for r in auditoria.periodo(hoje)] == ["t1", "t2"]
+    assert list(auditoria.periodo("2000-01-01", "2000-12-31")) == []
+    auditoria.fechar()
+
+
+def test_rotaciona_segmentos_e_reindexa(tmp_path):
+    auditoria = AuditoriaConsultas(diretorio=str(tmp_path), max_segmento_mb=0.0001)
+    for i in range(3):
+        auditoria.registrar(_mcp(f"t{i}"), f"resposta {i}")
+        auditoria.descarregar()
+    auditoria.fechar()
+
+    segmentos = [n for n in os.listdir(tmp_path) if n.endswith(".zaud")]
+    assert len(segmentos) == 3
+
+    os.remove(tmp_path / "indice.db")
+    reaberta = AuditoriaConsultas(diretorio=str(tmp_path))
+    assert reaberta.buscar("t1") is None
+    assert reaberta.reindexar() == 3
+    assert reaberta.buscar("t1")["resposta"] == "resposta 1"
+    reaberta.fechar()
+
+
+class MockMcpQuebrado:
+    trace_id = "quebrado"
+
+    def model_dump(self, mode=None):
+        raise TypeError("objeto não serializável")
+
+
+def test_item_ruim_nao_derruba_o_lote_e_trace_id_vazio_nao_colide(tmp_path):
+    auditoria = AuditoriaConsultas(diretorio=str(tmp_path))
+    auditoria._gravar_lote([
+        ("t1", time.time(), _mcp("t1"), "resposta 1", {}),
+        ("quebrado", time.time(), MockMcpQuebrado(), "resposta quebrada", {}),
+        ("t2", time.time(), _mcp("t2"), "resposta 2", {}),
+    ])
+    assert auditoria.buscar("t1")["resposta"] == "resposta 1"
+    assert auditoria.buscar("t2")["resposta"] == "resposta 2"
+    assert auditoria.buscar("quebrado") is None
+
+    auditoria.registrar(_mcp(None), "sem id 1")
+    auditoria.registrar(_mcp(None), "sem id 2")
+    auditoria.descarregar()
+    hoje = auditoria.buscar("t1")["data"]
+    sem_id = [r for r in auditoria.periodo(hoje) if r["resposta"].startswith("sem id")]
+    assert [r["resposta"] for r in sem_id] == ["sem id 1", "sem id 2"]
+    assert all(r["trace_id"] for r in sem_id)
+    auditoria.fechar()
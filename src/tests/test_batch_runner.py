@@ -0,0 +1,76 @@
+import json
+
+from graph.builder import build_graph
+from tools.backends import backends_falsos
+from tools.batch_runner import carregar_entradas, executar_lote, parse_limites, aplicar_limites
+from utils.ratelimit import LimitadoPorTaxa
+
+
+def _escrever_entrada(path, perguntas):
+    with open(path, "w", encoding="utf-8") as f:
+        for p in perguntas:
+            f.write(json.dumps({"perfil": {"regime": "Simples"}, "pergunta": p}) + "\n")
+
+
+def _grafo_falso():
+    llm, pipe, web = backends_falsos()
+    return build_graph(llm=llm, retriever=pipe, web_tool=web)
+
+
+def test_batch_runner_grava_resultados_com_timings(tmp_path):
+    entrada, saida = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _escrever_entrada(entrada, ["Qual a alíquota do IBS?", "pesquise notícia ICMS"])
+
+    stats = executar_lote(_grafo_falso(), carregar_entradas(entrada), str(saida), concorrencia=2)
+
+    assert stats["sucesso"] == 2
+    registros = [json.loads(l) for l in open(saida, encoding="utf-8")]
+    rag = next(r for r in registros if r["rota"] == "RAG")
+    assert rag["resposta"]
+    assert rag["fontes"]
+    assert "rag.qdrant" in rag["timings"]
+    assert "generate_final" in rag["timings"]
+
+
+def test_batch_runner_retoma_do_checkpoint(tmp_path):
+    entrada, saida = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _escrever_entrada(entrada, ["IBS?", "CBS?", "ICMS?"])
+    entradas = carregar_entradas(entrada)
+
+    executar_lote(_grafo_falso(), entradas[:2], str(saida))
+    stats = executar_lote(_grafo_falso(), entradas, str(saida))
+
+    assert stats["puladas"] == 2
+    assert stats["executadas"] == 1
+
+
+def test_batch_runner_retentativas(tmp_path):
+    class GrafoInstavel:
+        def __init__(self):
+            self.chamadas = 0
+
+        def invoke(self, state):
+            self.chamadas += 1
+            if self.chamadas == 1:
+                raise RuntimeError("timeout")
+            return _grafo_falso().invoke(state)
+
+    entrada, saida = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _escrever_entrada(entrada, ["IBS?"])
+
+    stats = executar_lote(GrafoInstavel(), carregar_entradas(entrada), str(saida), backoff=0)
+
+    registro = json.loads(open(saida, encoding="utf-8").readline())
+    assert stats["falhas"] == 0
+    assert registro["tentativas"] == 2
+
+
+def test_aplicar_limites_embrulha_provedores():
+    llm, pipe, web = backends_falsos()
+    llm = aplicar_limites(llm, pipe, web, parse_limites(["openai=100", "qdrant=100", "tavily=100"]))
+
+    # Juiz e geração final ficam com objetos próprios (modelo por etapa), sob o mesmo bucket
+    assert isinstance(pipe.llm_reranker.llm, LimitadoPorTaxa)
+    assert pipe.llm_reranker.llm._bucket is llm._bucket
+    assert pipe.retriever.embeddings.embed_query("ibs")
+    assert web.execute("x")["sources"]
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from rag.rerank_vector import VectorReranker
+from utils.batching import MicroBatcher
+
+
+def test_microbatcher_agrupa_chamadas_concorrentes():
+    lotes = []
+
+    def dobrar(itens):
+        lotes.append(len(itens))
+        return [i * 2 for i in itens]
+
+    batcher = MicroBatcher(dobrar, max_lote=100, max_espera_ms=50)
+    resultados = {}
+
+    def cliente(c):
+        resultados[c] = batcher.executar([c, c + 100])
+
+    threads = [threading.Thread(target=cliente, args=(c,)) for c in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.fechar()
+
+    assert resultados[3] == [6, 206]
+    assert sum(lotes) == 16
+    assert len(lotes) < 8
+
+
+def test_microbatcher_propaga_erro():
+    def falhar(itens):
+        raise ValueError("modelo indisponível")
+
+    batcher = MicroBatcher(falhar, max_espera_ms=1)
+    with pytest.raises(ValueError):
+        batcher.executar([1])
+    batcher.fechar()
+
+
+def test_microbatcher_fechar_falha_itens_pendentes():
+    liberar = threading.Event()
+
+    def lento(itens):
+        liberar.wait(5)
+        return itens
+
+    batcher = MicroBatcher(lento, max_lote=1, max_espera_ms=1)
+    (em_lote,) = batcher.submeter(["a"])
+    time.sleep(0.05)  # "a" já está no lote travado
+    (na_fila,) = batcher.submeter(["b"])
+
+    batcher.fechar(timeout=0.05)
+    with pytest.raises(RuntimeError):
+        na_fila.result(timeout=1)
+    with pytest.raises(RuntimeError):
+        batcher.submeter(["c"])
+
+    liberar.set()
+    assert em_lote.result(timeout=1) == "a"
+
+
+def test_vector_reranker_com_microlotes():
+    class Modelo:
+        def predict(self, pairs, batch_size=None):
+            return [float(len(d)) for _, d in pairs]
+
+    reranker = VectorReranker()
+    reranker.model = Modelo()
+    reranker.ativar_microlotes(max_espera_ms=1)
+
+    docs = [{"page_content": "curto"}, {"page_content": "bem mais longo"}]
+    ranked = reranker.rerank("q", docs, top_k=1)
+
+    assert ranked[0]["page_content"] == "bem mais longo"
+    assert ranked[0]["score_vetorial"] == 14.0
@@ -0,0 +1,86 @@
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from graph.builder import build_graph
+from tools.backends import aplicar_cassete, backends_falsos
+from utils.cassette import AUTO, GRAVAR, REPRODUZIR, Cassete, CasseteAusente, ErroGravado, Gravado
+from utils.metrics import metricas
+
+
+class ServicoLento:
+    def __init__(self):
+        self.chamadas = 0
+
+    def invoke(self, mensagens, **kwargs):
+        self.chamadas += 1
+        time.sleep(0.05)
+        if mensagens == "falha":
+            raise TimeoutError("sem resposta")
+        return AIMessage(content=f"resposta {self.chamadas}", response_metadata={"kwargs": kwargs})
+
+
+def test_grava_e_reproduz_com_latencia(tmp_path):
+    caminho = str(tmp_path / "cassete.jsonl")
+    servico = ServicoLento()
+    gravado = Gravado(servico, Cassete(caminho, modo=GRAVAR), "openai_chat")
+    original = gravado.invoke([HumanMessage(content="IBS?")], response_format={"type": "json_object"})
+    try:
+        gravado.invoke("falha")
+    except TimeoutError:
+        pass
+
+    # Reprodução: nenhuma chamada ao serviço, mesmo tipo e conteúdo
+    offline = Gravado(ServicoLento(), Cassete(caminho, modo=REPRODUZIR), "openai_chat")
+    copia = offline.invoke([HumanMessage(content="IBS?")], response_format={"type": "json_object"})
+    assert isinstance(copia, AIMessage)
+    assert copia.content == original.content
+    assert offline._alvo.chamadas == 0
+
+    try:
+        offline.invoke("falha")
+        assert False, "esperava ErroGravado"
+    except ErroGravado as e:
+        assert "TimeoutError" in str(e)
+
+    try:
+        offline.invoke([HumanMessage(content="outra pergunta")])
+        assert False, "esperava CasseteAusente"
+    except CasseteAusente:
+        pass
+
+    lento = Gravado(ServicoLento(), Cassete(caminho, reproduzir_latencia=True), "openai_chat")
+    inicio = time.perf_counter()
+    lento.invoke([HumanMessage(content="IBS?")], response_format={"type": "json_object"})
+    assert time.perf_counter() - inicio >= 0.045
+
+
+def test_modo_auto_grava_apenas_o_que_falta(tmp_path):
+    caminho = str(tmp_path / "cassete.jsonl")
+    servico = ServicoLento()
+    cassete = Cassete(caminho, modo=AUTO)
+    gravado = Gravado(servico, cassete, "openai_chat")
+    gravado.invoke("a")
+    gravado.invoke("a")
+    assert servico.chamadas == 1
+    assert len(Cassete(caminho)) == 1
+
+
+def test_grafo_reproduz_offline(tmp_path):
+    caminho = str(tmp_path / "cassete.jsonl")
+    pergunta = "Qual a alíquota do IBS para serviços?"
+    state = {"messages": [HumanMessage(content=pergunta)], "perfil_cliente": {"uf": "SP"}, "ultima_pergunta": pergunta}
+
+    llm, pipeline, web = backends_falsos()
+    llm = aplicar_cassete(llm, pipeline, web, Cassete(caminho, modo=GRAVAR))
+    gravado = build_graph(llm=llm, retriever=pipeline, web_tool=web).invoke(dict(state))
+
+    metricas.resetar()
+    llm, pipeline, web = backends_falsos()
+    llm = aplicar_cassete(llm, pipeline, web, Cassete(caminho, modo=REPRODUZIR))
+    reproduzido = build_graph(llm=llm, retriever=pipeline, web_tool=web).invoke(dict(state))
+
+    assert reproduzido["messages"][-1].content == gravado["messages"][-1].content
+    assert [f["source"] for f in reproduzido["sources_data"]] == [f["source"] for f in gravado["sources_data"]]
+    assert metricas.valor("cassete.reproduzidas") >= 3
+    assert metricas.valor("cassete.ausentes") == 0
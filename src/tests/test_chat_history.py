@@ -0,0 +1,39 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from components.chat_history import adicionar_mensagem, sanitizar_novas
+from tools.bench_historico import SCRIPTS, historico
+
+
+def test_sanitiza_so_mensagens_novas():
+    estado = {"messages": [{"role": "user", "content": "Oi"}, {"role": "assistant", "content": "Olá"}]}
+    assert sanitizar_novas(estado) == 2
+    assert isinstance(estado["messages"][0], HumanMessage) and isinstance(estado["messages"][1], AIMessage)
+    assert sanitizar_novas(estado) == 0  # rerun sem mensagens novas
+
+    adicionar_mensagem(estado, {"role": "user", "content": "E o IBS?"})
+    adicionar_mensagem(estado, AIMessage(content="Depende."))
+    assert [type(m) for m in estado["messages"][2:]] == [HumanMessage, AIMessage]
+    assert sanitizar_novas(estado) == 0
+
+    estado["messages"] = [{"role": "assistant", "content": "novo histórico"}]
+    assert sanitizar_novas(estado) == 1
+    assert isinstance(estado["messages"][0], AIMessage)
+
+
+def test_historico_em_janela_com_carga_sob_demanda():
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_function(SCRIPTS["janela"])
+    app.session_state["messages"] = historico(45)
+    app.session_state["janela"] = 20
+
+    app.run()
+    assert len(app.chat_message) == 20
+    assert app.chat_message[0].markdown[0].value.startswith("25:")
+
+    app.button(key="historico_anteriores").click().run()
+    assert len(app.chat_message) == 40
+
+    app.button(key="historico_anteriores").click().run()
+    assert len(app.chat_message) == 45
+    assert len(app.button) == 0
@@ -0,0 +1,77 @@
+import pytest
+
+from rag.chunk_store import ArmazemChunks, EscritorChunks
+from tools.fakes import FakeQdrantRetriever
+from utils.metrics import metricas
+
+
+def test_armazem_le_por_id(tmp_path):
+    with EscritorChunks(str(tmp_path)) as escritor:
+        escritor.adicionar(0, {"page_content": "Alíquota do IBS", "source": "LC 214/2024", "chunk_index": 0})
+        escritor.adicionar(2, {"page_content": "", "source": "CF/88"})
+
+    armazem = ArmazemChunks(str(tmp_path))
+    assert len(armazem) == 3
+    assert armazem.payload(0) == {"page_content": "Alíquota do IBS", "source": "LC 214/2024", "chunk_index": 0}
+    assert bytes(armazem.texto_bruto(0)).decode("utf-8") == "Alíquota do IBS"
+    assert armazem.payload(2) == {"page_content": "", "source": "CF/88"}
+    assert 1 not in armazem and armazem.payload(1) is None and armazem.payload(99) is None
+    armazem.fechar()
+
+    (tmp_path / "indice.bin").write_bytes(b"XXXX\x00\x00\x00\x00")
+    with pytest.raises(ValueError):
+        ArmazemChunks(str(tmp_path))
+
+
+def test_busca_so_de_ids(tmp_path):
+    retriever = FakeQdrantRetriever()
+    com_payload = retriever.query("ICMS sobre energia elétrica", "perfil", limit=5)
+
+    with EscritorChunks(str(tmp_path)) as escritor:
+        for pid, _, payload in retriever.client.pontos[1:]:  # id 0 fica fora (armazém desatualizado)
+            escritor.adicionar(pid, payload)
+
+    chamadas = []
+    query_points = retriever.client.query_points
+    retriever.client.query_points = lambda **kw: chamadas.append(kw) or query_points(**kw)
+    metricas.resetar()
+    retriever.usar_armazem(str(tmp_path))
+    so_ids = retriever.query("ICMS sobre energia elétrica", "perfil", limit=5)
+
+    assert chamadas[0]["with_payload"] is False
+    esperados = [d for d in com_payload if d["metadata"]["chunk_index"] != 0]
+    assert [d["page_content"] for d in so_ids] == [d["page_content"] for d in esperados]
+    assert [d["metadata"] for d in so_ids] == [d["metadata"] for d in esperados]
+    assert [d["index"] for d in so_ids] == list(range(len(so_ids)))
+    assert metricas.valor("armazem.faltantes") == len(com_payload) - len(esperados)
+
+
+def test_reingestao_nao_afeta_leitor_aberto(tmp_path):
+    with EscritorChunks(str(tmp_path)) as escritor:
+        escritor.adicionar(0, {"page_content": "texto antigo", "source": "v1"})
+    armazem = ArmazemChunks(str(tmp_path), intervalo_s=0)
+
+    escritor = EscritorChunks(str(tmp_path))
+    escritor.adicionar(0, {"page_content": "texto novo e mais longo", "source": "v2"})
+    assert armazem.payload(0) == {"page_content": "texto antigo", "source": "v1"}  # blob antigo intacto
+    escritor.fechar()
+
+    # Até recarregar, o leitor segue na geração antiga (índice e blob coerentes)
+    assert armazem.payload(0)["source"] == "v1"
+    assert armazem.atualizar()
+    assert armazem.payload(0) == {"page_content": "texto novo e mais longo", "source": "v2"}
+    assert len(list(tmp_path.glob("chunks-*.bin"))) == 1
+    assert not armazem.atualizar()
+
+
+def test_colecao_com_uuid_falha_ao_ligar_armazem(tmp_path):
+    with EscritorChunks(str(tmp_path)) as escritor:
+        escritor.adicionar(0, {"page_content": "x", "source": "y"})
+        with pytest.raises(ValueError, match="ids inteiros"):
+            escritor.adicionar("6f1c2d3e-0000-4000-8000-000000000000", {"page_content": "z"})
+
+    retriever = FakeQdrantRetriever()
+    retriever.client.pontos = [("6f1c2d3e-0000-4000-8000-000000000000", v, p) for _, v, p in retriever.client.pontos[:1]]
+    with pytest.raises(ValueError, match="reingira"):
+        retriever.usar_armazem(str(tmp_path))
+    assert retriever.armazem is None
@@ -0,0 +1,30 @@
+import pytest
+
+from services import cnae_api
+
+
+@pytest.fixture
+def sem_csv(monkeypatch):
+    monkeypatch.setattr(cnae_api, "_tabela", None)
+    monkeypatch.setattr(cnae_api, "_falhas", 0)
+    monkeypatch.setattr(cnae_api, "_proxima_tentativa", 0.0)
+    monkeypatch.setattr(cnae_api, "carregar_tabela_cnae", lambda: None)
+
+
+def test_falha_no_download_nao_fica_em_cache(sem_csv, monkeypatch):
+    chamadas = []
+
+    def baixar_falhando():
+        chamadas.append(1)
+        raise ConnectionError("IBGE fora do ar")
+
+    monkeypatch.setattr(cnae_api, "baixar_tabela_cnae", baixar_falhando)
+    assert cnae_api.tabela_cnae() == {}
+    assert cnae_api.tabela_cnae() == {}
+    assert len(chamadas) == 1  # dentro do backoff: sem nova ida à rede
+
+    # Passado o backoff, a próxima chamada baixa de novo e guarda a tabela
+    monkeypatch.setattr(cnae_api, "_proxima_tentativa", 0.0)
+    monkeypatch.setattr(cnae_api, "baixar_tabela_cnae", lambda: {"1091102": "Padaria e confeitaria"})
+    assert cnae_api.buscar_cnae("1091") == [{"code": "1091102", "title": "Padaria e confeitaria"}]
+    assert cnae_api._falhas == 0
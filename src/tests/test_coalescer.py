@@ -0,0 +1,46 @@
+import threading
+import time
+
+from rag.coalescer import EmbeddingCoalescer
+
+
+class EmbeddingsLentos:
+    def __init__(self):
+        self.lotes = []
+
+    def embed_documents(self, texts):
+        self.lotes.append(list(texts))
+        time.sleep(0.02)
+        return [[float(len(t))] for t in texts]
+
+
+def test_coalescer_agrupa_e_deduplica():
+    inner = EmbeddingsLentos()
+    coalescer = EmbeddingCoalescer(inner, janela_ms=30)
+    textos = ["ibs", "cbs", "ibs", "icms st", "ibs", "cbs"]
+    resultados = [None] * len(textos)
+
+    def chamar(i):
+        resultados[i] = coalescer.embed_query(textos[i])
+
+    threads = [threading.Thread(target=chamar, args=(i,)) for i in range(len(textos))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    coalescer.fechar()
+
+    assert resultados == [[3.0], [3.0], [3.0], [7.0], [3.0], [3.0]]
+    assert len(inner.lotes) == 1
+    assert sorted(inner.lotes[0]) == ["cbs", "ibs", "icms st"]
+
+
+def test_coalescer_nova_chamada_apos_conclusao():
+    inner = EmbeddingsLentos()
+    coalescer = EmbeddingCoalescer(inner, janela_ms=1)
+
+    coalescer.embed_query("ibs")
+    coalescer.embed_query("ibs")
+    coalescer.fechar()
+
+    assert len(inner.lotes) == 2
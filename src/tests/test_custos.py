@@ -0,0 +1,51 @@
+from langchain_core.messages import AIMessage
+
+from utils.custos import Contabilizado, LivroCustos, custo_usd
+from utils.tracing import Rastro, ativar
+
+
+class MockLLM:
+    model_name = "mock"
+
+    def invoke(self, mensagens, **kwargs):
+        return AIMessage(
+            content="resposta",
+            usage_metadata={
+                "input_tokens": 1000, "output_tokens": 100, "total_tokens": 1100,
+                "input_token_details": {"cache_read": 400},
+            },
+        )
+
+
+class MockEmbeddings:
+    def embed_query(self, text):
+        return [0.0]
+
+
+def test_custo_com_tokens_em_cache():
+    # 600 × 2,50 + 400 × 1,25 + 100 × 10,00 (USD por 1M)
+    assert abs(custo_usd("gpt-4o", 1000, 100, cache=400) - 0.003) < 1e-9
+    assert custo_usd("modelo-desconhecido", 1000, 100) == 0.0
+
+
+def test_lancamentos_por_consulta_e_agregados():
+    livro = LivroCustos()
+    llm = Contabilizado(MockLLM(), "generate_final", "gpt-4o", livro)
+    embeddings = Contabilizado(MockEmbeddings(), "embedding", "text-embedding-3-small", livro)
+
+    rastro = Rastro()
+    with ativar(rastro):
+        llm.invoke([{"role": "user", "content": "pergunta"}])
+        embeddings.embed_query("a" * 400)
+    llm.invoke("fora de consulta")
+
+    consulta = livro.consulta(rastro.trace_id)
+    assert [l["etapa"] for l in consulta["lancamentos"]] == ["generate_final", "embedding"]
+    assert consulta["lancamentos"][0]["tokens_cache"] == 400
+    assert consulta["lancamentos"][1]["estimado"] is True
+    assert llm.model_name == "mock"
+
+    agregados = livro.agregados()
+    assert agregados[0]["etapa"] == "generate_final"
+    assert agregados[0]["chamadas"] == 2
+    assert sum(a["participacao_custo"] for a in agregados) == 1.0
@@ -0,0 +1,80 @@
+from rag.dedup import Deduplicador, simhash, distancia_hamming
+from rag.pipeline import HybridRAGPipeline
+from utils.tracing import Rastro, ativar
+
+ART = (
+    "Art. 12. A base de cálculo do IBS e da CBS é o valor da operação, "
+    "incluídos tributos, juros, multas, acréscimos e encargos cobrados do adquirente."
+)
+
+
+def _doc(i, texto, score, **meta):
+    return {"index": i, "page_content": texto, "score": score, "metadata": meta}
+
+
+def test_simhash_proximo_para_textos_quase_iguais():
+    variante = ART.replace("Art. 12.", "Art. 12 -")
+    outro = "O Simples Nacional possui limite de receita bruta anual de R$ 4,8 milhões."
+    assert distancia_hamming(simhash(ART), simhash(variante)) <= 3
+    assert distancia_hamming(simhash(ART), simhash(outro)) > 3
+
+
+def test_deduplicador_colapsa_exatas_e_quase_duplicatas():
+    docs = [
+        _doc(0, ART, 0.9),
+        _doc(1, ART.upper(), 0.89),                      # mesmo texto normalizado
+        _doc(2, ART.replace("Art. 12.", "Art. 12 -"), 0.88),
+        _doc(3, "Limite do Simples Nacional: R$ 4,8 milhões.", 0.7),
+    ]
+
+    unicos = Deduplicador().deduplicar(docs)
+
+    assert [d["index"] for d in unicos] == [0, 3]
+    assert unicos[0]["duplicatas"] == 2
+
+
+def test_deduplicador_por_hash_do_payload_e_cosseno():
+    docs = [
+        {**_doc(0, "texto A", 0.9, content_hash="h1"), "vector": [1.0, 0.0]},
+        {**_doc(1, "texto B", 0.8, content_hash="h1"), "vector": [0.0, 1.0]},
+        {**_doc(2, "texto C", 0.7), "vector": [0.999, 0.01]},
+    ]
+
+    unicos = Deduplicador(metodo="cosseno", limiar_cosseno=0.99).deduplicar(docs)
+    assert [d["index"] for d in unicos] == [0]
+
+
+def test_mmr_diversifica():
+    docs = [
+        {**_doc(0, "a", 0.9), "vector": [1.0, 0.0]},
+        {**_doc(1, "b", 0.85), "vector": [0.95, 0.3]},
+        {**_doc(2, "c", 0.8), "vector": [0.0, 1.0]},
+    ]
+
+    ordem = Deduplicador(metodo="cosseno", limiar_cosseno=0.999, mmr_lambda=0.5).deduplicar(docs)
+    assert [d["index"] for d in ordem] == [0, 2, 1]
+
+
+def test_pipeline_registra_removidos():
+    class RetrieverComDuplicatas:
+        def query(self, q, p, limit=12):
+            return [_doc(0, ART, 0.9), _doc(1, ART, 0.9), _doc(2, "Outro texto qualquer.", 0.5)]
+
+    class Identidade:
+        def rerank(self, q, docs, top_k):
+            return docs[:top_k]
+
+    pipe = HybridRAGPipeline(
+        qdrant_retriever=RetrieverComDuplicatas(),
+        llm=None,
+        vector_reranker=Identidade(),
+        llm_reranker=Identidade(),
+        deduplicador=Deduplicador(),
+    )
+
+    rastro = Rastro()
+    with ativar(rastro):
+        pipe.run("pergunta", "perfil")
+
+    evento = next(e for e in rastro.eventos if e["etapa"] == "rag.dedup")
+    assert evento["removidos"] == 1
@@ -0,0 +1,55 @@
+import math
+
+from services.montagem import contabilizar
+from tools.backends import backends_falsos
+from tools.eval_retrieval import (
+    avaliar_configuracao,
+    carregar_golden,
+    GOLDEN_PADRAO,
+    marcar_pareto,
+    mrr,
+    ndcg,
+    recall,
+    relevancias,
+)
+
+
+def test_metricas_de_ranking():
+    fontes = [
+        {"source": "LC 87/1996", "chunk_index": 7},
+        {"source": "LC 214/2024", "chunk_index": 0},
+        {"source": "LC 214/2024", "chunk_index": 9},
+    ]
+    rels = relevancias(fontes, ["LC 214/2024#0", "CF/88"])
+    assert rels == [0, 1, 0]
+    assert recall(rels, 2) == 0.5
+    assert mrr(rels) == 0.5
+    assert math.isclose(ndcg(rels, 2), (1 / math.log2(3)) / (1 + 1 / math.log2(3)))
+
+    # Fonte no nível da lei cobre um único documento
+    assert relevancias(fontes, ["LC 214/2024"]) == [0, 1, 0]
+
+
+def test_pareto():
+    resultados = marcar_pareto([
+        {"ndcg": 0.9, "latencia_p50_s": 0.2},
+        {"ndcg": 0.8, "latencia_p50_s": 0.1},
+        {"ndcg": 0.7, "latencia_p50_s": 0.3},
+    ])
+    assert [(r["ndcg"], r["pareto"]) for r in resultados] == [(0.8, True), (0.9, True), (0.7, False)]
+
+
+def test_avaliacao_offline_no_golden():
+    llm, pipeline, _ = backends_falsos()
+    pipeline.profundidade = None
+    contabilizar(llm, pipeline, {"rag.llm_judge": "gpt-4o-mini", "generate_final": "gpt-4o", "embedding": "text-embedding-3-small"})
+
+    golden = carregar_golden(GOLDEN_PADRAO)
+    r = avaliar_configuracao(pipeline, golden, {"vector_top_k": 6, "final_top_k": 4, "limite": 12, "hnsw_ef": 64})
+
+    assert pipeline.retriever.hnsw_ef == 64
+    assert r["recall"] > 0.5
+    assert 0 < r["ndcg"] <= 1
+    assert r["tokens_por_consulta"] > 0
+    assert r["custo_usd_por_consulta"] > 0
+    assert "rag.qdrant" in r["etapas_p50_s"]
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from mcp_converters import convert_sources
+from rag.federado import fundir_pesos, fundir_rrf, ler_colecoes
+from tools.fakes import FakeQdrantClient, FakeQdrantRetriever
+from utils.metrics import metricas
+
+
+class MockClientColecoes:
+    """Um FakeQdrantClient por coleção; `falhar` lista coleções indisponíveis."""
+
+    def __init__(self, corpora: dict, latencia: float = 0.0, falhar=()):
+        self.clientes = {nome: FakeQdrantClient(corpus, latencia=latencia) for nome, corpus in corpora.items()}
+        self.falhar = set(falhar)
+
+    def query_points(self, collection_name, **kwargs):
+        if collection_name in self.falhar:
+            raise ConnectionError(collection_name)
+        return self.clientes[collection_name].query_points(collection_name, **kwargs)
+
+
+CORPORA = {
+    "fake": [("LC 214/2024", "A CBS substitui PIS e COFINS."), ("LC 123/2006", "Limite do Simples Nacional.")],
+    "solucoes_consulta": [("SC Cosit 99/2024", "Crédito de PIS e COFINS sobre insumos na CBS.")],
+    "faq_interno": [("FAQ 12", "Como emitir nota fiscal de serviço.")],
+}
+
+
+def _retriever(**kwargs):
+    retriever = FakeQdrantRetriever()
+    retriever.client = MockClientColecoes(CORPORA, **kwargs)
+    return retriever.ativar_federacao({"solucoes_consulta": 0.8, "faq_interno": 0.5})
+
+
+def test_fusao_rrf_e_por_pesos():
+    resultados = {"a": [{"score": 0.9, "id": "a1"}, {"score": 0.5, "id": "a2"}], "b": [{"score": 0.8, "id": "b1"}]}
+    assert [d["id"] for d in fundir_rrf(resultados, {"a": 1.0, "b": 2.0})] == ["b1", "a1", "a2"]
+    assert [d["id"] for d in fundir_pesos(resultados, {"a": 1.0, "b": 0.5})] == ["a1", "a2", "b1"]
+    assert ler_colecoes("leis:1, sc:0.8,faq") == {"leis": 1.0, "sc": 0.8, "faq": 1.0}
+
+
+def test_busca_federada_paralela_com_procedencia():
+    retriever = _retriever(latencia=0.1)
+    retriever.query("aquecimento", "perfil", limit=3)  # imports do qdrant_client fora da medição
+    inicio = time.perf_counter()
+    docs = retriever.query("crédito de PIS e COFINS na CBS", "perfil", limit=3)
+    assert time.perf_counter() - inicio < 0.25  # três coleções de 0.1 s em paralelo
+
+    assert len(docs) == 3 and [d["index"] for d in docs] == [0, 1, 2]
+    colecoes = {d["metadata"]["collection"] for d in docs}
+    assert "solucoes_consulta" in colecoes
+    assert all("score_fusao" in d for d in docs)
+
+    fontes = convert_sources([d["metadata"] for d in docs])
+    assert {f.collection for f in fontes} == colecoes
+
+
+def test_colecao_indisponivel_nao_derruba_a_busca():
+    metricas.resetar()
+    docs = _retriever(falhar={"faq_interno"}).query("Simples Nacional", "perfil", limit=4)
+    assert docs and "faq_interno" not in {d["metadata"]["collection"] for d in docs}
+    assert metricas.valor("rag.federado.falhas") == 1
+
+    with pytest.raises(ConnectionError):
+        _retriever(falhar=set(CORPORA)).query("Simples Nacional", "perfil", limit=4)
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from services.montagem import aplicar_hedging, contabilizar
+from tools.backends import backends_falsos
+from tools.fakes import FakeLLM
+from utils.custos import livro_custos
+from utils.hedging import ComHedge, PoliticaHedge
+from utils.metrics import metricas
+
+
+class ServicoLento:
+    """Responde em 10 ms, exceto a chamada `lenta` (1 s)."""
+
+    def __init__(self, lenta: int):
+        self.lenta = lenta
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def query_points(self, x):
+        with self._lock:
+            self.chamadas += 1
+            n = self.chamadas
+        time.sleep(1.0 if n == self.lenta else 0.01)
+        return x
+
+
+def test_hedge_vence_chamada_lenta():
+    metricas.resetar()
+    servico = ServicoLento(lenta=6)
+    politica = PoliticaHedge("teste", percentil=90, max_extra=0.5, min_amostras=5)
+    cliente = ComHedge(servico, politica, ("query_points",))
+
+    for i in range(5):
+        assert cliente.query_points(i) == i
+
+    inicio = time.perf_counter()
+    assert cliente.query_points("x") == "x"
+    assert time.perf_counter() - inicio < 0.5
+    assert metricas.valor("teste.hedge.emitidos") == 1
+    assert metricas.valor("teste.hedge.vencidos") == 1
+
+
+def test_hedge_limitado_pela_carga_extra():
+    metricas.resetar()
+    politica = PoliticaHedge("teste", max_extra=0.1, min_amostras=1)
+    for _ in range(5):
+        politica.creditar()
+    assert not politica.permitir_hedge()  # 0,5 crédito
+    for _ in range(5):
+        politica.creditar()
+    assert politica.permitir_hedge()
+    assert not politica.permitir_hedge()
+
+
+class ServicoComThreads(ServicoLento):
+    """ServicoLento que anota a thread de cada chamada."""
+
+    def __init__(self, lenta: int):
+        super().__init__(lenta)
+        self.threads = []
+
+    def query_points(self, x):
+        self.threads.append(threading.get_ident())
+        return super().query_points(x)
+
+
+def test_primaria_na_thread_de_quem_chama_sem_credito():
+    metricas.resetar()
+    servico = ServicoComThreads(lenta=4)
+    politica = PoliticaHedge("teste", percentil=50, max_extra=0.0, min_amostras=2)
+    cliente = ComHedge(servico, politica, ("query_points",))
+
+    for i in range(4):
+        assert cliente.query_points(i) == i
+    assert servico.threads == [threading.get_ident()] * 4
+    assert metricas.valor("teste.hedge.negados") == 1  # a lenta passou do atraso sem crédito
+    assert metricas.valor("teste.hedge.emitidos") == 0
+
+
+def test_tentativas_paralelas_limitadas_por_politica():
+    metricas.resetar()
+    servico = ServicoComThreads(lenta=3)
+    politica = PoliticaHedge("teste", percentil=50, max_extra=1.0, min_amostras=2, max_paralelas=1)
+    cliente = ComHedge(servico, politica, ("query_points",))
+
+    for i in range(3):
+        assert cliente.query_points(i) == i
+    # A primária lenta ocupa a única vaga: sem duplicata
+    assert servico.chamadas == 3
+    assert servico.threads[-1] != threading.get_ident()
+    assert metricas.valor("teste.hedge.negados") == 1
+    assert metricas.valor("teste.hedge.emitidos") == 0
+
+
+class JuizLento(FakeLLM):
+    """FakeLLM em 10 ms, exceto a chamada `lenta` (1 s)."""
+
+    def __init__(self, lenta: int):
+        super().__init__()
+        self.servico = ServicoLento(lenta)
+
+    def invoke(self, messages, **kwargs):
+        self.servico.query_points(None)
+        return super().invoke(messages, **kwargs)
+
+
+def test_razao_lanca_as_duas_tentativas_do_hedge():
+    metricas.resetar()
+    livro_custos.resetar()
+    llm, pipeline, _ = backends_falsos()
+    pipeline.llm_reranker.llm = JuizLento(lenta=21)
+    contabilizar(llm, pipeline)
+    aplicar_hedging(pipeline, percentil=90, max_extra=0.5)
+
+    for _ in range(21):
+        pipeline.llm_reranker.llm.invoke([{"role": "user", "content": "pergunta"}])
+    assert metricas.valor("rag.llm_judge.hedge.emitidos") == 1
+
+    limite = time.perf_counter() + 3
+    while time.perf_counter() < limite:
+        chamadas = sum(a["chamadas"] for a in livro_custos.agregados() if a["etapa"] == "rag.llm_judge")
+        if chamadas == 22:  # a tentativa perdedora também é faturada
+            break
+        time.sleep(0.05)
+    assert chamadas == 22
@@ -0,0 +1,50 @@
+import math
+
+from rag.ingest import VETOR_COMPLETO, VETOR_CURTO, criar_colecao, ingerir, truncar
+from tools.fakes import FakeEmbeddings, FakeQdrantRetriever
+
+
+class MockClient:
+    def __init__(self):
+        self.colecoes = {}
+        self.pontos = []
+
+    def collection_exists(self, nome):
+        return nome in self.colecoes
+
+    def create_collection(self, nome, vectors_config):
+        self.colecoes[nome] = vectors_config
+
+    def upsert(self, collection_name, points):
+        self.pontos.extend(points)
+
+
+def test_ingestao_grava_vetor_curto_normalizado():
+    client = MockClient()
+    criar_colecao(client, "leis", dim=64, dim_curta=16)
+    config = client.colecoes["leis"]
+    assert config[VETOR_CURTO].size == 16
+    assert config[VETOR_COMPLETO].hnsw_config.m == 0  # completo só reavalia
+
+    chunks = [{"page_content": f"ICMS IBS CBS chunk {i}", "source": "LC 214/2024", "chunk_index": i} for i in range(5)]
+    stats = ingerir(client, "leis", chunks, FakeEmbeddings(), dim_curta=16, lote=2, id_inicial=10)
+
+    assert [p.id for p in client.pontos] == [10, 11, 12, 13, 14]
+    curto = client.pontos[0].vector[VETOR_CURTO]
+    assert len(curto) == 16 and math.isclose(sum(v * v for v in curto), 1.0)
+    assert client.pontos[0].payload["chunk_index"] == 0
+    assert stats["bytes_vetor_curto"] * 4 == stats["bytes_vetor_completo"]
+    assert truncar([3.0, 4.0, 9.0], 2) == [0.6, 0.8]
+
+
+def test_busca_em_dois_estagios():
+    retriever = FakeQdrantRetriever()
+    um_estagio = retriever.query("alíquota do Simples Nacional", "perfil", limit=4)
+
+    retriever.dim_curta, retriever.fator_prefetch = 32, 3
+    dois_estagios = retriever.query("alíquota do Simples Nacional", "perfil", limit=4)
+
+    # Reordenado pelo vetor completo: mesmos scores de cosseno do 1º colocado
+    assert dois_estagios[0]["page_content"] == um_estagio[0]["page_content"]
+    assert math.isclose(dois_estagios[0]["score"], um_estagio[0]["score"])
+    assert len(dois_estagios) == 4
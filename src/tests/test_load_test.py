@@ -0,0 +1,17 @@
+from graph.builder import build_graph
+from tools.backends import backends_falsos
+from tools.load_test import MIX_PADRAO, executar_carga
+
+
+def test_executar_carga_fake():
+    llm, pipeline, web = backends_falsos(latencia=0.01)
+    graph = build_graph(llm=llm, retriever=pipeline, web_tool=web)
+
+    relatorio = executar_carga(graph, MIX_PADRAO, taxa=40, duracao=0.5, usuarios=4, intervalo_amostra=0.1, semente=7)
+
+    assert relatorio["enviadas"] > 0
+    assert relatorio["concluidas"] == relatorio["enviadas"]
+    assert relatorio["falhas"] == 0
+    assert relatorio["latencia_s"]["p50"] > 0
+    assert "rag.qdrant" in relatorio["etapas_s"]
+    assert relatorio["serie"] and {"cpu_pct", "rss_mb", "em_andamento", "na_fila"} <= set(relatorio["serie"][0])
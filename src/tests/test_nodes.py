@@ -41,4 +41,64 @@ def test_node_generate_final():
     }
 
     res = node_generate_final(state, MockLLM())
-    assert isinstance(res["messages"][-1], AIMessage)
\ No newline at end of file
+    assert isinstance(res["messages"][-1], AIMessage)
+
+def test_node_web_pulado_sem_orcamento():
+    import time
+
+    class WebNaoChamado:
+        def execute(self, q, timeout=None):
+            raise AssertionError("web não deveria ser chamado")
+
+    state = {"rag_ok": False, "ultima_pergunta": "x", "deadline": time.time() + 1}
+    res = node_web_search(state, WebNaoChamado())
+    assert res["rag_ok"] is False
+
+
+def test_node_generate_final_comprime_contexto_sem_orcamento():
+    import time
+    from utils.deadline import PoliticaOrcamento
+
+    class CapturingLLM:
+        def invoke(self, m):
+            self.prompt = m[0].content
+            return AIMessage(content="ok")
+
+    llm = CapturingLLM()
+    state = {
+        "ultima_pergunta": "Qual a alíquota?",
+        "contexto_juridico_bruto": "\n\n".join(["A" * 100, "B" * 100, "C" * 100]),
+        "deadline": time.time() + 1,
+    }
+
+    node_generate_final(state, llm, politica=PoliticaOrcamento(max_chars_reduzido=150))
+    assert "A" * 100 in llm.prompt
+    assert "C" * 100 not in llm.prompt
+
+
+def test_node_usa_artefatos_do_perfil():
+    class CapturingRAG:
+        def run(self, q, p, artefatos_perfil=None):
+            self.artefatos = artefatos_perfil
+            return [], "ctx"
+
+    class CapturingLLM:
+        def invoke(self, m):
+            self.prompt = m[0].content
+            return AIMessage(content="ok")
+
+    artefatos = {"bloco_prompt": "- Regime tributário: Lucro Real", "filtros": [], "embedding": [1.0]}
+    state = {
+        "ultima_pergunta": "x",
+        "perfil_cliente": {"regime_tributario": "Lucro Real"},
+        "perfil_artefatos": artefatos,
+    }
+
+    rag = CapturingRAG()
+    node_rag_qdrant(state, rag)
+    assert rag.artefatos is artefatos
+
+    llm = CapturingLLM()
+    node_generate_final(state, llm)
+    assert "- Regime tributário: Lucro Real" in llm.prompt
+    assert "{'regime_tributario'" not in llm.prompt
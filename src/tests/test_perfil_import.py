@@ -0,0 +1,84 @@
+from services.perfil_import import (
+    importar_perfis,
+    ler_perfis,
+    normalizar_faturamentos,
+    normalizar_regimes,
+    validar_perfis,
+)
+from services.perfil_store import PerfilStore
+
+
+TABELA = {"1091102": "Padaria e confeitaria", "4120400": "Construção de edifícios"}
+
+CSV = """nome_empresa;cnae_principal;regime_tributario;faturamento_anual;uf
+Padaria Central;1091-1/02;simples;1200000;SP
+Construtora Alfa;4120400;LUCRO REAL;R$ 3.500.000,50;RJ
+Sem CNAE;;Lucro Presumido;100;MG
+CNAE Inexistente;9999999;lp;1.234;SP
+Regime Errado;4120-4/00;MEI;10;SP
+Padaria Central;1091102;sn;1;SP
+"""
+
+
+def test_normalizacoes():
+    assert normalizar_regimes(["Simples", "lucro  presumido", "LR", "MEI"])[:3] == [
+        ("Simples Nacional", None), ("Lucro Presumido", None), ("Lucro Real", None),
+    ]
+    assert normalizar_regimes(["MEI"])[0][1] is not None
+    assert [v for v, _ in normalizar_faturamentos(["1200000", "1.234", "1.234,56", "1234.56", ""])] == [
+        "R$ 1.200.000,00", "R$ 1.234,00", "R$ 1.234,56", "R$ 1.234,56", "",
+    ]
+    assert [v for v, _ in normalizar_faturamentos(["1234.5", "1.234,5", "1200000.5"])] == [
+        "R$ 1.234,50", "R$ 1.234,50", "R$ 1.200.000,50",
+    ]
+    assert normalizar_faturamentos(["abc"])[0][1] == "Faturamento inválido"
+
+
+def test_validacao_reporta_erros_por_linha():
+    perfis, erros = validar_perfis(ler_perfis(CSV, "csv"), TABELA)
+
+    assert list(perfis) == ["Padaria Central", "Construtora Alfa"]
+    assert perfis["Padaria Central"] == {
+        "nome_empresa": "Padaria Central",
+        "cnae_principal": "1091-1/02",
+        "regime_tributario": "Simples Nacional",
+        "faturamento_anual": "R$ 1.200.000,00",
+        "uf": "SP",
+    }
+    por_linha = {(e["linha"], e["campo"]) for e in erros}
+    assert por_linha == {
+        (4, "cnae_principal"),
+        (5, "cnae_principal"),
+        (6, "regime_tributario"),
+        (7, "nome_empresa"),
+    }
+
+
+def test_sem_tabela_valida_apenas_formato():
+    perfis, _ = validar_perfis(ler_perfis(CSV, "csv"), None)
+    assert "CNAE Inexistente" in perfis
+
+
+def test_jsonl_com_linha_invalida():
+    conteudo = '{"nome_empresa": "A", "cnae_principal": "4120400", "regime_tributario": "real"}\n\n{quebrado\n'
+    perfis, erros = validar_perfis(ler_perfis(conteudo, "jsonl"), TABELA)
+    assert list(perfis) == ["A"]
+    assert erros[0]["linha"] == 3
+
+
+def test_importacao_grava_em_lote(tmp_path):
+    lotes = []
+
+    def embedder_lote(textos):
+        lotes.append(list(textos))
+        return [[1.0, 0.0] for _ in textos]
+
+    store = PerfilStore(str(tmp_path / "perfis.db"), embedder_lote=embedder_lote)
+    relatorio = importar_perfis(store, "escritorio", CSV, "csv", TABELA)
+
+    assert relatorio["total"] == 6
+    assert relatorio["importados"] == 2
+    assert relatorio["linhas_com_erro"] == 4
+    assert len(lotes) == 1 and len(lotes[0]) == 2
+    assert set(store.listar("escritorio")) == {"Padaria Central", "Construtora Alfa"}
+    assert store.carregar("escritorio", "Construtora Alfa")["embedding"] == [1.0, 0.0]
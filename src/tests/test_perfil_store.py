@@ -0,0 +1,98 @@
+import os
+
+from services.perfil_store import PERFIS_DB_PADRAO, PerfilStore, derivar_filtros, montar_bloco_prompt
+from tools.fakes import FakeQdrantRetriever, embedding_falso
+
+
+PERFIL = {
+    "faturamento_anual": "R$ 1.200.000,00",
+    "nome_empresa": "Padaria Central",
+    "regime_tributario": "Simples Nacional",
+    "cnae_principal": "1091-1/02",
+}
+
+
+class EmbedderContador:
+    def __init__(self):
+        self.chamadas = []
+
+    def __call__(self, texto):
+        self.chamadas.append(texto)
+        return embedding_falso(texto)
+
+
+def test_bloco_prompt_normalizado():
+    bloco = montar_bloco_prompt({**PERFIL, "observacoes": "", "uf": "SP"})
+    assert bloco.splitlines() == [
+        "- Empresa: Padaria Central",
+        "- CNAE principal: 1091-1/02",
+        "- Regime tributário: Simples Nacional",
+        "- Faturamento anual: R$ 1.200.000,00",
+        "- Uf: SP",
+    ]
+
+
+def test_filtros_derivados():
+    assert derivar_filtros(PERFIL) == [{"campo": "regime_tributario", "valores": ["Simples Nacional"]}]
+    assert derivar_filtros({"regime_tributario": ""}) == []
+    assert derivar_filtros("texto livre") == []
+
+
+def test_store_persiste_e_precalcula(tmp_path):
+    caminho = str(tmp_path / "perfis.db")
+    embedder = EmbedderContador()
+    store = PerfilStore(caminho, embedder=embedder, modelo="m1")
+    store.salvar("ana", "Padaria", PERFIL)
+    assert len(embedder.chamadas) == 1
+
+    # Leituras repetidas não recalculam nada
+    for _ in range(3):
+        registro = store.carregar("ana", "Padaria")
+    assert len(embedder.chamadas) == 1
+    assert registro["bloco_prompt"].startswith("- Empresa: Padaria Central")
+    assert registro["embedding"] == embedding_falso(embedder.chamadas[0])
+    store.fechar()
+
+    # Sobrevive ao reinício e é isolado por usuário
+    reaberto = PerfilStore(caminho, embedder=embedder, modelo="m1")
+    assert reaberto.listar("ana") == {"Padaria": PERFIL}
+    assert reaberto.listar("bruno") == {}
+    assert reaberto.carregar("ana", "Padaria")["filtros"][0]["campo"] == "regime_tributario"
+    assert len(embedder.chamadas) == 1
+
+    reaberto.remover("ana", "Padaria")
+    assert reaberto.carregar("ana", "Padaria") is None
+
+
+def test_store_recalcula_embedding_ao_trocar_modelo(tmp_path):
+    caminho = str(tmp_path / "perfis.db")
+    embedder = EmbedderContador()
+    PerfilStore(caminho, embedder=embedder, modelo="m1").salvar("ana", "Padaria", PERFIL)
+
+    novo = PerfilStore(caminho, embedder=embedder, modelo="m2")
+    assert novo.carregar("ana", "Padaria")["modelo"] == "m2"
+    assert len(embedder.chamadas) == 2
+
+
+def test_retriever_embeda_so_a_pergunta_com_artefatos(tmp_path):
+    retriever = FakeQdrantRetriever()
+    embedder = EmbedderContador()
+    retriever.embeddings.embed_query = embedder
+    store = PerfilStore(str(tmp_path / "perfis.db"), embedder=embedder)
+    artefatos = store.salvar("ana", "Padaria", PERFIL)
+
+    docs = retriever.query(
+        "Alíquota do IBS", PERFIL, limit=3,
+        perfil_embedding=artefatos["embedding"], filtros=artefatos["filtros"],
+    )
+    assert len(docs) == 3
+    assert embedder.chamadas[-1] == "Alíquota do IBS"
+
+
+def test_cria_diretorio_do_banco(tmp_path):
+    caminho = tmp_path / "novo" / "perfis.db"
+    store = PerfilStore(str(caminho))
+    store.salvar("u", "Empresa", {"regime_tributario": "Lucro Real"})
+    store.fechar()
+    assert caminho.exists()
+    assert os.path.isabs(PERFIS_DB_PADRAO) and PERFIS_DB_PADRAO.endswith(os.path.join("src", "data", "perfis.db"))
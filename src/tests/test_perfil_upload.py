@@ -0,0 +1,62 @@
+import io
+import json
+
+from components import perfil_upload
+
+
+class MockEstado(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+class MockArquivo(io.BytesIO):
+    def __init__(self, dados: dict, file_id: str):
+        super().__init__(json.dumps(dados).encode("utf-8"))
+        self.file_id = file_id
+
+
+class MockStreamlit:
+    def __init__(self):
+        self.session_state = MockEstado(perfis={}, perfil_ativo=None)
+        self.arquivo = None
+
+    def file_uploader(self, *args, **kwargs):
+        # Cada rerun recebe um objeto novo, lido do início
+        if self.arquivo is None:
+            return None
+        dados, file_id = self.arquivo
+        return MockArquivo(dados, file_id)
+
+    def success(self, *args):
+        pass
+
+    def error(self, *args):
+        pass
+
+
+class MockStore:
+    def __init__(self):
+        self.salvos = []
+
+    def salvar(self, usuario, nome, dados):
+        self.salvos.append(nome)
+
+
+def test_upload_grava_uma_vez_por_arquivo(monkeypatch):
+    st = MockStreamlit()
+    monkeypatch.setattr(perfil_upload, "st", st)
+    store = MockStore()
+
+    st.arquivo = ({"nome_empresa": "Padaria"}, "f1")
+    perfil_upload.upload_perfil_json(store)
+    assert store.salvos == ["Padaria"] and st.session_state.perfil_ativo == "Padaria"
+
+    # Reruns com o mesmo arquivo no uploader: nada é regravado
+    st.session_state.perfil_ativo = "Outro"
+    for _ in range(3):
+        perfil_upload.upload_perfil_json(store)
+    assert store.salvos == ["Padaria"] and st.session_state.perfil_ativo == "Outro"
+
+    st.arquivo = ({"nome_empresa": "Construtora"}, "f2")
+    perfil_upload.upload_perfil_json(store)
+    assert store.salvos == ["Padaria", "Construtora"]
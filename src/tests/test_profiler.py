@@ -0,0 +1,106 @@
+import contextvars
+import os
+import threading
+import time
+
+from graph.builder import build_graph
+from graph.consulta import ConsultasCompartilhadas
+from tools.backends import backends_falsos
+from tools.fakes import FakeLLM
+from utils.batching import MicroBatcher
+from utils.profiler import Perfilador, em_thread_perfilada
+from utils.tracing import Rastro, ativar
+
+
+def _trabalho_cpu(segundos):
+    fim = time.perf_counter() + segundos
+    x = 0
+    while time.perf_counter() < fim:
+        x += 1
+    return x
+
+
+def test_perfil_gravado_com_trace_id(tmp_path):
+    perfilador = Perfilador(str(tmp_path), intervalo_ms=1)
+    rastro = Rastro(trace_id="abc123")
+
+    with ativar(rastro), perfilador.perfilar(rastro.trace_id, forcar=True) as perfil:
+        _trabalho_cpu(0.1)
+
+    assert perfil.caminho == os.path.join(str(tmp_path), "abc123.folded")
+    linhas = open(perfil.caminho, encoding="utf-8").read().splitlines()
+    assert any("_trabalho_cpu" in linha for linha in linhas)
+    pilha, n = linhas[0].rsplit(" ", 1)
+    assert int(n) > 0 and ";" in pilha
+    assert rastro.eventos[-1]["etapa"] == "perfil"
+
+
+def test_perfil_desligado_e_limite_de_arquivos(tmp_path):
+    desligado = Perfilador(str(tmp_path), taxa=0.0)
+    with desligado.perfilar("x") as perfil:
+        pass
+    assert perfil.caminho is None
+    assert os.listdir(tmp_path) == []
+
+    perfilador = Perfilador(str(tmp_path), taxa=1.0, intervalo_ms=1, max_arquivos=2)
+    for i in range(4):
+        with perfilador.perfilar(f"t{i}"):
+            _trabalho_cpu(0.01)
+        time.sleep(0.01)
+    assert sorted(os.listdir(tmp_path)) == ["t2.folded", "t3.folded"]
+
+
+def _outra_consulta(segundos):
+    return _trabalho_cpu(segundos)
+
+
+def _trabalho_da_consulta(segundos):
+    with em_thread_perfilada():
+        return _trabalho_cpu(segundos)
+
+
+def test_perfil_so_amostra_threads_da_consulta(tmp_path):
+    perfilador = Perfilador(str(tmp_path), intervalo_ms=1)
+    vizinha = threading.Thread(target=_outra_consulta, args=(0.3,))
+    vizinha.start()
+
+    with perfilador.perfilar("so-minhas", forcar=True) as perfil:
+        auxiliar = threading.Thread(target=contextvars.copy_context().run, args=(_trabalho_da_consulta, 0.1))
+        auxiliar.start()
+        auxiliar.join()
+    vizinha.join()
+
+    conteudo = open(perfil.caminho, encoding="utf-8").read()
+    assert "_trabalho_da_consulta" in conteudo
+    assert "_outra_consulta" not in conteudo
+
+
+class MockLLMCpu(FakeLLM):
+    def invoke(self, messages, **kwargs):
+        _trabalho_cpu(0.05)
+        return super().invoke(messages, **kwargs)
+
+
+def _lote_cpu(itens):
+    _trabalho_cpu(0.05)
+    return itens
+
+
+def test_perfil_pelas_consultas_compartilhadas(tmp_path):
+    llm, pipeline, web_tool = backends_falsos()
+    graph = build_graph(llm=MockLLMCpu(), retriever=pipeline, web_tool=web_tool)
+    consultas = ConsultasCompartilhadas(graph)
+    batcher = MicroBatcher(_lote_cpu, max_espera_ms=1, nome="perfil")
+    perfilador = Perfilador(str(tmp_path), intervalo_ms=1)
+
+    with perfilador.perfilar("compartilhada", forcar=True) as perfil:
+        consultas.invoke({
+            "messages": [], "perfil_cliente": {"regime_tributario": "Simples Nacional"},
+            "ultima_pergunta": "Qual o limite do Simples Nacional?",
+        }, timeout=10)
+        batcher.executar([1])
+    batcher.fechar()
+
+    conteudo = open(perfil.caminho, encoding="utf-8").read()
+    assert "node_generate_final" in conteudo  # nó rodado na thread do LangGraph
+    assert "_lote_cpu" in conteudo  # worker de micro‑lotes servindo a consulta
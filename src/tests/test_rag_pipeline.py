@@ -29,4 +29,28 @@ def test_rag_pipeline(monkeypatch):
 
     meta, ctx = pipe.run("pergunta", "perfil")
 
-    assert ctx.strip() == "A"
\ No newline at end of file
+    assert ctx.strip() == "A"
+
+class ExplodingJudge:
+    def rerank(self, q, docs, top_k):
+        raise AssertionError("LLM‑Judge não deveria rodar sem orçamento")
+
+
+def test_rag_pipeline_pula_etapas_opcionais_sem_orcamento():
+    import time
+    from utils.tracing import Rastro, ativar
+
+    pipe = HybridRAGPipeline(
+        qdrant_retriever=MockRetriever(),
+        llm=None,
+        vector_reranker=MockVector(),
+        llm_reranker=ExplodingJudge(),
+    )
+
+    rastro = Rastro()
+    with ativar(rastro):
+        meta, ctx = pipe.run("pergunta", "perfil", deadline=time.time() + 0.5)
+
+    assert ctx
+    pulados = {e["etapa"] for e in rastro.eventos if e["decisao"] == "pulada"}
+    assert pulados == {"rag.rerank_vector", "rag.llm_judge"}
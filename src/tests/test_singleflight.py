@@ -0,0 +1,152 @@
+import contextvars
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from graph.consulta import ConsultasCompartilhadas, chave_consulta
+from utils.custos import livro_custos
+from utils.deadline import criar_deadline
+from utils.metrics import metricas
+from utils.singleflight import SingleFlight
+from utils.tracing import Rastro, ativar
+
+
+def test_singleflight_colapsa_execucoes_simultaneas():
+    metricas.resetar()
+    sf = SingleFlight(nome="teste_sf")
+    chamadas = []
+    liberar = threading.Event()
+
+    def funcao(emitir):
+        chamadas.append(1)
+        emitir("a")
+        liberar.wait(2)
+        emitir("b")
+        return "ok"
+
+    voos = [sf.iniciar("k", funcao) for _ in range(3)]
+    assert [lider for _, lider in voos] == [True, False, False]
+
+    liberar.set()
+    for voo, _ in voos:
+        # Seguidores recebem o replay dos tokens já emitidos
+        assert list(voo.acompanhar(timeout=2)) == ["a", "b"]
+        assert voo.aguardar(timeout=2) == "ok"
+
+    assert len(chamadas) == 1
+    assert metricas.valor("teste_sf.execucoes") == 1
+    assert metricas.valor("teste_sf.colapsadas") == 2
+    assert sf.em_voo() == 0
+
+
+def test_singleflight_nao_e_cache_e_propaga_erro():
+    sf = SingleFlight(nome="teste_sf_erro")
+
+    def falha(emitir):
+        raise ValueError("boom")
+
+    voo, _ = sf.iniciar("k", falha)
+    try:
+        voo.aguardar(timeout=2)
+        assert False, "esperava ValueError"
+    except ValueError:
+        pass
+
+    voo2, lider = sf.iniciar("k", lambda emitir: 42)
+    assert lider is True
+    assert voo2.aguardar(timeout=2) == 42
+
+
+def test_chave_consulta_normaliza_pergunta_e_perfil():
+    a = chave_consulta("  O que é o IBS? ", {"regime": "Lucro Real", "uf": "SP"})
+    b = chave_consulta("o que e o ibs?", {"uf": "SP", "regime": "Lucro Real"})
+    c = chave_consulta("o que e o ibs?", {"uf": "RJ", "regime": "Lucro Real"})
+    assert a == b
+    assert a != c
+
+
+class GrafoLento:
+    def __init__(self):
+        self.execucoes = 0
+
+    def stream(self, state, config=None, stream_mode=None):
+        self.execucoes += 1
+        time.sleep(0.05)
+        yield "values", {"messages": ["resposta"], "ultima_pergunta": state["ultima_pergunta"]}
+
+
+def test_consultas_compartilhadas_invoke():
+    grafo = GrafoLento()
+    consultas = ConsultasCompartilhadas(grafo, nome="teste_consulta")
+    state = {"messages": [], "ultima_pergunta": "Alíquota do IBS?", "perfil_cliente": {"uf": "SP"}}
+    resultados = [None] * 4
+
+    def chamar(i):
+        resultados[i] = consultas.invoke(dict(state), timeout=2)
+
+    threads = [threading.Thread(target=chamar, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert grafo.execucoes == 1
+    assert all(r["messages"] == ["resposta"] for r in resultados)
+    assert consultas.resumo()["colapsadas"] == 3
+
+
+class MockGrafo:
+    def __init__(self):
+        self.liberar = threading.Event()
+        self.execucoes = 0
+
+    def stream(self, state, config=None, stream_mode=None):
+        self.execucoes += 1
+        self.liberar.wait(2)
+        yield "values", {**state, "messages": [AIMessage(content="Resposta")], "sources_data": []}
+
+
+class MockAuditoria:
+    def __init__(self):
+        self.registros = []
+
+    def registrar(self, mcp, resposta, **extras):
+        self.registros.append((mcp, resposta, extras))
+
+
+def test_seguidora_tem_rastro_razao_auditoria_e_prazo_proprios():
+    grafo, auditoria = MockGrafo(), MockAuditoria()
+    consultas = ConsultasCompartilhadas(grafo, nome="teste_seguidora", auditoria=auditoria)
+    state = {"messages": [], "perfil_cliente": {"regime_tributario": "Simples Nacional"}, "ultima_pergunta": "IBS?"}
+
+    lider, seguidora, apressada = Rastro("lider"), Rastro("seguidora"), Rastro("apressada")
+    with ativar(lider):
+        voo, e_lider = consultas.iniciar(state)
+    assert e_lider
+
+    # Seguidora com deadline próprio quase vencido: não espera o orçamento do líder
+    with ativar(apressada):
+        inicio = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            consultas.invoke({**state, "deadline": criar_deadline(0.05)}, timeout=5)
+        assert time.perf_counter() - inicio < 1
+
+    resultado = {}
+    with ativar(seguidora):
+        t = threading.Thread(target=contextvars.copy_context().run, args=(
+            lambda: resultado.update(consultas.invoke(state, timeout=2)),
+        ))
+        t.start()
+        time.sleep(0.05)
+        grafo.liberar.set()
+        t.join()
+    assert consultas.aguardar(voo, True, state, timeout=2)["messages"][-1].content == "Resposta"
+    assert grafo.execucoes == 1 and resultado["messages"][-1].content == "Resposta"
+
+    assert "consulta.compartilhada" in seguidora.timings
+    (lancamento,) = livro_custos.consulta("seguidora")["lancamentos"]
+    assert lancamento["compartilhada_de"] == "lider"
+    ((mcp, resposta, extras),) = auditoria.registros
+    assert (mcp.trace_id, resposta, extras) == ("seguidora", "Resposta", {"compartilhada_de": "lider"})
@@ -0,0 +1,74 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.metrics import metricas
+from utils.transporte import ComRetentativas, cliente_httpx, erro_transitorio, reuso_conexoes, sessao_http
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep‑alive
+
+    def do_GET(self):
+        corpo = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/"
+    srv.shutdown()
+
+
+def test_pools_reutilizam_conexoes(servidor):
+    metricas.resetar()
+    sessao = sessao_http("teste_requests")
+    cliente = cliente_httpx("teste_httpx", timeout=5)
+    assert sessao_http("teste_requests") is sessao
+
+    for _ in range(5):
+        assert sessao.get(servidor).json() == {"ok": True}
+        assert cliente.get(servidor).json() == {"ok": True}
+
+    reuso = reuso_conexoes()
+    for nome in ("teste_requests", "teste_httpx"):
+        assert reuso[nome]["requisicoes"] == 5
+        assert reuso[nome]["conexoes_novas"] == 1
+        assert reuso[nome]["taxa_reuso"] == 0.8
+
+
+class _Erro503(Exception):
+    status_code = 503
+
+
+def test_retentativas_so_em_erro_transitorio():
+    chamadas = []
+
+    class Cliente:
+        def query_points(self, erro):
+            chamadas.append(erro)
+            if len(chamadas) < 3:
+                raise erro()
+            return "ok"
+
+    cliente = ComRetentativas(Cliente(), "teste", tentativas=3, backoff=0.001, metodos=("query_points",))
+    assert cliente.query_points(_Erro503) == "ok"
+    assert len(chamadas) == 3
+
+    chamadas.clear()
+    with pytest.raises(ValueError):
+        cliente.query_points(ValueError)
+    assert len(chamadas) == 1
+
+    assert erro_transitorio(TimeoutError())
+    assert not erro_transitorio(KeyError("x"))
@@ -0,0 +1,24 @@
+from services.warmup import Aquecimento
+from tools.bench_imports import medir_import
+
+
+def test_aquecimento_em_background():
+    chamadas = []
+
+    def falha():
+        raise RuntimeError("sem rede")
+
+    aquecimento = Aquecimento({"ok": lambda: chamadas.append(1), "falha": falha}).iniciar()
+
+    assert aquecimento.aguardar(timeout=5)
+    assert aquecimento.pronto
+    assert chamadas == [1]
+    status = aquecimento.status()
+    assert status["ok"]["status"] == "ok"
+    assert status["falha"]["status"] == "erro"
+
+
+def test_import_do_pipeline_nao_carrega_dependencias_pesadas():
+    for modulo in ("graph.builder", "rag.pipeline"):
+        relatorio = medir_import(modulo)
+        assert relatorio["pesados_importados"] == []
@@ -70,4 +70,57 @@ def test_web_search_limits(monkeypatch):
 
     output = ws.execute("x")
     assert len(output["answer"]) < 2000
-    assert len(output["sources"]) == 1
\ No newline at end of file
+    assert len(output["sources"]) == 1
+
+class CountingTool(MockTool):
+    def __init__(self, results):
+        super().__init__(results)
+        self.chamadas = 0
+
+    def invoke(self, params):
+        self.chamadas += 1
+        return super().invoke(params)
+
+
+def test_web_search_cache_por_consulta_normalizada():
+    tool = CountingTool([{"url": "https://a", "snippet": "s", "content": "c"}])
+    ws = WebSearch(api_key="dummy", tool=tool)
+
+    primeira = ws.execute("Notícia reforma tributária")
+    segunda = ws.execute("  noticia   REFORMA tributaria ")
+
+    assert tool.chamadas == 1
+    assert segunda == primeira
+
+
+def test_web_search_timeout():
+    import time
+
+    class SlowTool:
+        def invoke(self, params):
+            time.sleep(0.5)
+            return [{"url": "https://a"}]
+
+    ws = WebSearch(api_key="dummy", tool=SlowTool(), timeout=0.05)
+
+    inicio = time.perf_counter()
+    output = ws.execute("x")
+    assert time.perf_counter() - inicio < 0.4
+    assert output["answer"] == ""
+
+
+def test_web_search_circuit_breaker_abre_apos_falhas():
+    class ErrTool:
+        chamadas = 0
+
+        def invoke(self, x):
+            ErrTool.chamadas += 1
+            raise RuntimeError("fail")
+
+    ws = WebSearch(api_key="dummy", tool=ErrTool(), falhas_para_abrir=2, tempo_aberto=60)
+
+    for i in range(5):
+        ws.execute(f"consulta {i}")
+
+    assert ErrTool.chamadas == 2
+    assert ws.breaker.estado == "aberto"
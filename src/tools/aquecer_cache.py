@@ -0,0 +1,236 @@
+# tools/aquecer_cache.py
+
+"""
+Aquecimento offline do cache de consultas (utils/cache.py) com as perguntas
+frequentes de cada regime tributário. Rodar após cada reindexação do corpus.
+
+Entrada (JSON): {"Simples Nacional": ["pergunta", ...], "Lucro Real": [...]}
+
+Para cada regime, o perfil {"regime_tributario": regime} é preparado como no
+PerfilStore (bloco, filtros e embedding) e cada pergunta passa pelo pipeline
+RAG — ou pelo grafo completo, com --respostas —, gravando embeddings,
+candidatos da busca, scores do reranking vetorial, respostas do LLM‑as‑Judge
+e, opcionalmente, as respostas finais. Busca e respostas vão para uma versão
+nova do corpus, publicada só ao final: o app troca de conjunto de uma vez.
+
+Uma passada de verificação repete cada pergunta e classifica cada etapa em
+"quente" (servida do cache), "fria" (executada) ou "dispensada" (não
+necessária, ex.: juiz pulado pela política de profundidade).
+
+Uso (a partir de src/):
+    python -m tools.aquecer_cache data/perguntas_frequentes.json [--cache data/cache_consultas.db] \\
+        --concorrencia 4 [--respostas] [--mesma-versao | --versao v2] [--fake]
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+from services.perfil_store import PerfilStore
+from services.montagem import aplicar_cache, contabilizar
+from tools.backends import modelos_por_etapa
+from utils.cache import CACHE_CONSULTAS_PADRAO, CachePersistente
+from utils.custos import livro_custos
+from utils.logs import logger
+from utils.metrics import percentil
+from utils.tracing import Rastro, ativar
+
+
+QUENTE = "quente"
+FRIA = "fria"
+DISPENSADA = "dispensada"
+
+# Etapas verificadas (a do embedding depende do resultado da busca)
+ETAPAS = ("rag.qdrant", "embedding", "rag.rerank_vector", "rag.llm_judge")
+
+
+def carregar_perguntas(caminho: str) -> list:
+    """{regime: [perguntas]} → [{"regime", "pergunta"}], sem repetições."""
+    with open(caminho, encoding="utf-8") as f:
+        dados = json.load(f)
+    itens = []
+    for regime, perguntas in dados.items():
+        for pergunta in dict.fromkeys(p.strip() for p in perguntas if p.strip()):
+            itens.append({"regime": regime, "pergunta": pergunta})
+    return itens
+
+
+def preparar_regimes(regimes, embedder, modelo: str = "") -> dict:
+    """{regime: (perfil, artefatos)}, com artefatos calculados como no PerfilStore."""
+    store = PerfilStore(caminho=":memory:", embedder=embedder, modelo=modelo)
+    preparados = {}
+    for regime in regimes:
+        perfil = {"regime_tributario": regime}
+        preparados[regime] = (perfil, store.preparar(perfil))
+    return preparados
+
+
+def consultar(item: dict, perfil: dict, artefatos: dict, rag_pipeline, graph=None) -> dict:
+    """Executa uma pergunta (pipeline RAG, ou grafo com `graph`) e retorna rastro e duração."""
+    rastro = Rastro()
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        with ativar(rastro):
+            if graph is None:
+                rag_pipeline.run(item["pergunta"], perfil, artefatos_perfil=artefatos)
+            else:
+                graph.invoke({
+                    "messages": [HumanMessage(content=item["pergunta"])],
+                    "perfil_cliente": perfil,
+                    "perfil_artefatos": artefatos,
+                    "ultima_pergunta": item["pergunta"],
+                })
+    except Exception as e:
+        erro = f"{type(e).__name__}: {e}"
+        logger.warning(f"🔥 Aquecimento de '{item['pergunta']}' falhou: {erro}")
+    return {"rastro": rastro, "duracao_s": time.perf_counter() - inicio, "erro": erro}
+
+
+def classificar(rastro: Rastro, etapas=ETAPAS) -> dict:
+    """Estado de cada etapa em uma consulta: quente, fria ou dispensada."""
+    quentes = {e["etapa"] for e in rastro.eventos if e.get("decisao") == "em_cache"}
+    estados = {}
+    for nome in etapas:
+        if nome in quentes:
+            estados[nome] = QUENTE
+        elif nome == "embedding":
+            # Sem acerto no cache, o embedding só roda quando a busca roda
+            estados[nome] = FRIA if estados.get("rag.qdrant") == FRIA else DISPENSADA
+        else:
+            estados[nome] = FRIA if nome in rastro.timings else DISPENSADA
+    return estados
+
+
+def _passada(itens, preparados, rag_pipeline, graph, concorrencia) -> list:
+    def executar(item):
+        perfil, artefatos = preparados[item["regime"]]
+        return consultar(item, perfil, artefatos, rag_pipeline, graph)
+
+    with ThreadPoolExecutor(max_workers=max(1, concorrencia)) as pool:
+        return list(pool.map(executar, itens))
+
+
+def aquecer(itens: list, preparados: dict, rag_pipeline, graph=None, concorrencia: int = 4) -> dict:
+    """
+    Aquece o cache com `itens` e verifica a cobertura. Retorna o relatório:
+    cobertura por regime e por etapa, perguntas com etapas frias, falhas e
+    tempo gasto (total, por etapa e latência fria × quente).
+    """
+    etapas = ETAPAS + (("generate_final",) if graph is not None else ())
+
+    inicio = time.perf_counter()
+    aquecimento = _passada(itens, preparados, rag_pipeline, graph, concorrencia)
+    duracao_aquecimento = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    verificacao = _passada(itens, preparados, rag_pipeline, graph, 1)
+    duracao_verificacao = time.perf_counter() - inicio
+
+    regimes, por_etapa, frias, falhas, soma_etapas = {}, {}, [], [], {}
+    for item, aquecida, verificada in zip(itens, aquecimento, verificacao):
+        for nome, dur in aquecida["rastro"].timings.items():
+            soma_etapas[nome] = soma_etapas.get(nome, 0.0) + dur
+
+        regime = regimes.setdefault(item["regime"], {"perguntas": 0, "cobertas": 0})
+        regime["perguntas"] += 1
+        erro = aquecida["erro"] or verificada["erro"]
+        if erro:
+            falhas.append({**item, "erro": erro})
+            continue
+
+        estados = classificar(verificada["rastro"], etapas)
+        for nome, estado in estados.items():
+            contagem = por_etapa.setdefault(nome, {QUENTE: 0, FRIA: 0, DISPENSADA: 0})
+            contagem[estado] += 1
+        frias_item = [nome for nome, estado in estados.items() if estado == FRIA]
+        if frias_item:
+            frias.append({**item, "etapas": frias_item})
+        else:
+            regime["cobertas"] += 1
+
+    for regime in regimes.values():
+        regime["cobertura"] = round(regime["cobertas"] / regime["perguntas"], 4)
+    cobertas = sum(r["cobertas"] for r in regimes.values())
+
+    return {
+        "perguntas": len(itens),
+        "cobertas": cobertas,
+        "cobertura": round(cobertas / len(itens), 4) if itens else 0.0,
+        "regimes": regimes,
+        "etapas": por_etapa,
+        "frias": frias,
+        "falhas": falhas,
+        "tempo": {
+            "aquecimento_s": round(duracao_aquecimento, 3),
+            "verificacao_s": round(duracao_verificacao, 3),
+            "etapas_s": {nome: round(soma_etapas[nome], 4) for nome in sorted(soma_etapas)},
+            "latencia_fria_p50_s": round(percentil(sorted(r["duracao_s"] for r in aquecimento), 50), 4),
+            "latencia_quente_p50_s": round(percentil(sorted(r["duracao_s"] for r in verificacao), 50), 4),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aquece o cache de consultas com perguntas frequentes por regime.")
+    parser.add_argument("entrada", help='JSON {"regime": ["pergunta", ...]}')
+    parser.add_argument("--cache", default=CACHE_CONSULTAS_PADRAO, help="Banco do cache (CACHE_CONSULTAS_DB do app)")
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--respostas", action="store_true", help="Gera e guarda também as respostas finais")
+    parser.add_argument("--versao", default=None, help="Nome da nova versão do corpus (padrão: data e hora)")
+    parser.add_argument(
+        "--mesma-versao", action="store_true",
+        help="Acrescenta à versão publicada (sem reindexação), em vez de criar uma nova",
+    )
+    parser.add_argument("--fake", action="store_true", help="Usa backends falsos (sem rede)")
+    parser.add_argument("--latencia-fake", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        from tools.backends import backends_falsos
+        llm, rag_pipeline, web_tool = backends_falsos(args.latencia_fake)
+    else:
+        from tools.backends import backends_reais
+        llm, rag_pipeline, web_tool = backends_reais()
+
+    if args.mesma_versao:
+        versao = CachePersistente(args.cache).versao_publicada()
+    else:
+        versao = args.versao or time.strftime("%Y%m%d-%H%M%S")
+    cache = CachePersistente(args.cache, versao=versao)
+
+    modelos = modelos_por_etapa()
+    llm = contabilizar(llm, rag_pipeline, modelos)
+    aplicar_cache(rag_pipeline, cache, modelos)
+    graph = None
+    if args.respostas:
+        from graph.builder import build_graph
+        graph = build_graph(llm=llm, retriever=rag_pipeline, web_tool=web_tool, cache_respostas=cache)
+
+    itens = carregar_perguntas(args.entrada)
+    preparados = preparar_regimes(
+        dict.fromkeys(item["regime"] for item in itens), rag_pipeline.retriever.embed_query, modelos["embedding"],
+    )
+    logger.info(f"🔥 Aquecendo {len(itens)} perguntas de {len(preparados)} regimes (versão '{versao}').")
+
+    relatorio = aquecer(itens, preparados, rag_pipeline, graph, args.concorrencia)
+
+    # Nada aquecido (ex.: Qdrant fora): a versão anterior continua valendo
+    publicar = not args.mesma_versao and relatorio["cobertas"] > 0
+    if publicar:
+        cache.publicar()
+    relatorio = {"versao": versao, "publicada": publicar, **relatorio}
+    relatorio["entradas"] = cache.contagem()
+    relatorio["custos"] = livro_custos.agregados()
+    cache.fechar()
+
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    return 0 if not relatorio["falhas"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
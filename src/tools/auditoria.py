@@ -0,0 +1,47 @@
+# tools/auditoria.py
+
+"""
+Consulta à trilha de auditoria (services/auditoria.py).
+
+Uso (a partir de src/):
+    python -m tools.auditoria --trace-id 55f53d9a...
+    python -m tools.auditoria --de 2025-01-01 --ate 2025-01-31 > consultas.jsonl
+    python -m tools.auditoria outro/diretorio --reindexar
+"""
+
+import argparse
+import json
+import sys
+
+from services.auditoria import AUDITORIA_DIR_PADRAO, AuditoriaConsultas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Leitura da trilha de auditoria das consultas.")
+    parser.add_argument("diretorio", nargs="?", default=AUDITORIA_DIR_PADRAO, help="AUDITORIA_DIR do app")
+    parser.add_argument("--trace-id", default=None)
+    parser.add_argument("--de", default=None, help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("--ate", default=None, help="Data final (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--reindexar", action="store_true", help="Reconstrói o índice a partir dos segmentos")
+    args = parser.parse_args(argv)
+
+    auditoria = AuditoriaConsultas(diretorio=args.diretorio)
+    try:
+        if args.reindexar:
+            print(json.dumps({"consultas_indexadas": auditoria.reindexar()}))
+        if args.trace_id:
+            registro = auditoria.buscar(args.trace_id)
+            if registro is None:
+                print(f"trace_id {args.trace_id} não encontrado", file=sys.stderr)
+                return 1
+            print(json.dumps(registro, ensure_ascii=False, indent=2))
+        if args.de:
+            for registro in auditoria.periodo(args.de, args.ate):
+                print(json.dumps(registro, ensure_ascii=False))
+    finally:
+        auditoria.fechar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
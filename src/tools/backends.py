@@ -0,0 +1,141 @@
+# tools/backends.py
+
+"""
+Montagem dos backends (LLM, pipeline RAG, WebSearch) fora do Streamlit:
+falsos, reais e por cassete. Os embrulhos aplicados também pelo app
+(razão de custos, hedge, agendador, cache) ficam em services/montagem.py.
+"""
+
+import os
+
+from rag.adaptive import PoliticaProfundidade
+from rag.dedup import Deduplicador
+from rag.pipeline import HybridRAGPipeline
+from rag.rerank_llm import LLMJudgeReranker
+from tools.fakes import FakeLLM, FakeQdrantRetriever, FakeVectorReranker, FakeWebSearch
+from utils.cassette import REPRODUZIR, Gravado
+from utils.custos import MODELOS_PADRAO
+
+# Valores usados no lugar das chaves ao reproduzir uma cassete (sem rede)
+CHAVES_REPRODUCAO = {
+    "OPENAI_API_KEY": "cassete",
+    "QDRANT_URL": "http://localhost:6333",
+    "QDRANT_API_KEY": "cassete",
+    "TAVILY_API_KEY": "cassete",
+}
+
+
+def backends_falsos(latencia: float = 0.0):
+    """
+    Backends sem rede. `latencia` (s) é aplicada a cada chamada de I/O simulada.
+    Retorna (llm, rag_pipeline, web_tool).
+    """
+    llm = FakeLLM(latencia=latencia)
+    pipeline = HybridRAGPipeline(
+        qdrant_retriever=FakeQdrantRetriever(latencia, latencia),
+        llm=llm,
+        vector_top_k=6,
+        final_top_k=4,
+        vector_reranker=FakeVectorReranker(),
+        llm_reranker=LLMJudgeReranker(llm),
+        politica_profundidade=PoliticaProfundidade(),
+        deduplicador=Deduplicador(),
+    )
+    return llm, pipeline, FakeWebSearch(latencia=latencia)
+
+
+def modelos_por_etapa(env=None) -> dict:
+    """Modelo de cada etapa: MODELO_JUIZ, MODELO_FINAL e MODELO_EMBEDDING, ou os padrões."""
+    env = env or os.environ
+    return {
+        "rag.llm_judge": env.get("MODELO_JUIZ", MODELOS_PADRAO["rag.llm_judge"]),
+        "generate_final": env.get("MODELO_FINAL", MODELOS_PADRAO["generate_final"]),
+        "embedding": env.get("MODELO_EMBEDDING", MODELOS_PADRAO["embedding"]),
+    }
+
+
+def backends_reais(env=None):
+    """
+    Backends reais, configurados pelas mesmas chaves de `.streamlit/secrets.toml`
+    lidas como variáveis de ambiente, com um modelo por etapa (`modelos_por_etapa`).
+    Retorna (llm, rag_pipeline, web_tool); `llm` é o da geração final.
+    """
+    from langchain_openai import ChatOpenAI
+    from rag.federado import ler_colecoes
+    from rag.qdrant import QdrantRetriever
+    from rag.web import WebSearch
+    from utils.transporte import cliente_httpx
+
+    env = env or os.environ
+    modelos = modelos_por_etapa(env)
+
+    openai_http = cliente_httpx("openai", timeout=60)
+    llm = ChatOpenAI(
+        model=modelos["generate_final"], api_key=env["OPENAI_API_KEY"], temperature=0.1,
+        stream_usage=True, http_client=openai_http, timeout=60, max_retries=3,
+    )
+    llm_juiz = ChatOpenAI(
+        model=modelos["rag.llm_judge"], api_key=env["OPENAI_API_KEY"], temperature=0.1,
+        http_client=openai_http, timeout=30, max_retries=3,
+    )
+
+    retriever = QdrantRetriever(
+        url=env["QDRANT_URL"],
+        api_key=env["QDRANT_API_KEY"],
+        collection=env.get("QDRANT_COLECAO", "leis_fiscais_v1"),
+        embedding_model=modelos["embedding"],
+        openai_key=env["OPENAI_API_KEY"],
+        prefer_grpc=env.get("QDRANT_PREFER_GRPC", "").lower() in ("1", "true", "sim"),
+    ).ativar_coalescencia(janela_ms=5)
+    colecoes_extras = ler_colecoes(env.get("QDRANT_COLECOES_EXTRAS", ""))
+    if colecoes_extras:
+        retriever.ativar_federacao(colecoes_extras, fusao=env.get("QDRANT_FUSAO", "rrf"))
+    retriever.dim_curta = int(env.get("QDRANT_DIM_CURTA") or 0) or None
+    if env.get("CHUNKS_DIR"):
+        retriever.usar_armazem(env["CHUNKS_DIR"])
+
+    pipeline = HybridRAGPipeline(
+        qdrant_retriever=retriever,
+        llm=llm_juiz,
+        vector_top_k=6,
+        final_top_k=4,
+        politica_profundidade=PoliticaProfundidade(),
+        deduplicador=Deduplicador(),
+    )
+
+    return llm, pipeline, WebSearch(api_key=env["TAVILY_API_KEY"])
+
+
+def aplicar_cassete(llm, rag_pipeline, web_tool, cassete):
+    """
+    Passa ChatOpenAI (geração e LLM‑as‑Judge), embeddings, Qdrant
+    (`query_points`) e Tavily pela cassete. Embeddings são gravados por
+    `embed_query` (acima do coalescedor), pois os lotes variam entre execuções.
+    Retorna o `llm` embrulhado para a geração final.
+    """
+    llm = Gravado(llm, cassete, "openai_chat")
+    rag_pipeline.llm_reranker.llm = Gravado(rag_pipeline.llm_reranker.llm, cassete, "openai_chat")
+
+    retriever = rag_pipeline.retriever
+    retriever.embeddings = Gravado(retriever.embeddings, cassete, "openai_embeddings", ("embed_query", "embed_documents"))
+    retriever.client = Gravado(retriever.client, cassete, "qdrant", ("query_points",))
+
+    if getattr(web_tool, "tool", None) is not None:
+        web_tool.tool = Gravado(web_tool.tool, cassete, "tavily")
+
+    return llm
+
+
+def backends_cassete(cassete, env=None):
+    """
+    Backends reais gravando/reproduzindo pela cassete. Ao reproduzir, as
+    chaves ausentes recebem valores fictícios — nenhuma chamada sai para a rede.
+    O CrossEncoder roda localmente (precisa do modelo em cache).
+    """
+    env = dict(env or os.environ)
+    if cassete.modo == REPRODUZIR:
+        for chave, valor in CHAVES_REPRODUCAO.items():
+            env.setdefault(chave, valor)
+
+    llm, pipeline, web_tool = backends_reais(env)
+    return aplicar_cassete(llm, pipeline, web_tool, cassete), pipeline, web_tool
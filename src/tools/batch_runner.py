@@ -0,0 +1,355 @@
+# tools/batch_runner.py
+
+"""
+Execução em lote (não interativa) de consultas a partir de um JSONL.
+
+Cada linha de entrada: {"id": "...", "perfil": {...}, "pergunta": "..."}
+("id" é opcional; na ausência usa-se o número da linha).
+
+Cada linha de saída: resposta, fontes, rota, tempos por etapa e erro (se houver).
+A saída também é o checkpoint: ao reexecutar com o mesmo arquivo de saída,
+itens já concluídos com sucesso são pulados e os que falharam são refeitos.
+
+Uso (a partir de src/):
+    python -m tools.batch_runner entrada.jsonl saida.jsonl --concorrencia 8 \\
+        --tentativas 3 --limite openai=5 --limite tavily=1 [--compartilhar] [--fake | --cassete gravacao.jsonl]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from langchain_core.messages import HumanMessage
+
+from graph.builder import build_graph
+from graph.consulta import ConsultasCompartilhadas
+from rag.adaptive import resumo_profundidade
+from rag.coalescer import EmbeddingCoalescer
+from services.montagem import aplicar_agendador, aplicar_hedging, contabilizar
+from tools.backends import modelos_por_etapa
+from utils.logs import logger
+from utils.deadline import criar_deadline
+from utils.agendador import INTERATIVO, LOTE, agendador, prioridade
+from utils.custos import livro_custos
+from utils.metrics import percentil
+from utils.profiler import PERFIS_CPU_DIR_PADRAO, Perfilador
+from utils.ratelimit import LimitadoPorTaxa, TokenBucket
+from utils.tracing import Rastro, ativar
+from utils.transporte import reuso_conexoes
+
+
+PROVEDORES = ("openai", "qdrant", "tavily")
+
+
+def carregar_entradas(caminho: str) -> list:
+    entradas = []
+    with open(caminho, encoding="utf-8") as f:
+        for n, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            item = json.loads(linha)
+            item.setdefault("id", f"linha-{n}")
+            item["id"] = str(item["id"])
+            entradas.append(item)
+    return entradas
+
+
+def carregar_concluidos(caminho: str) -> set:
+    """IDs já respondidos com sucesso em uma execução anterior."""
+    if not os.path.exists(caminho):
+        return set()
+
+    concluidos = set()
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue  # última linha truncada por interrupção
+            if not registro.get("erro"):
+                concluidos.add(str(registro.get("id")))
+    return concluidos
+
+
+def parse_limites(especificacoes: list) -> dict:
+    """["openai=5", "tavily=0.5"] → {provedor: TokenBucket} (requisições/s)."""
+    limites = {}
+    for spec in especificacoes or []:
+        provedor, _, taxa = spec.partition("=")
+        provedor = provedor.strip().lower()
+        if provedor not in PROVEDORES or not taxa:
+            raise ValueError(f"Limite inválido: {spec!r} (use {'|'.join(PROVEDORES)}=req/s)")
+        limites[provedor] = TokenBucket(float(taxa))
+    return limites
+
+
+def aplicar_limites(llm, rag_pipeline, web_tool, limites: dict):
+    """
+    Embrulha os clientes de cada provedor com o respectivo TokenBucket.
+    Retorna o `llm` (possivelmente embrulhado) para a geração final.
+    """
+    if "openai" in limites:
+        llm = LimitadoPorTaxa(llm, limites["openai"])
+        rag_pipeline.llm_reranker.llm = LimitadoPorTaxa(rag_pipeline.llm_reranker.llm, limites["openai"])
+        embeddings = getattr(rag_pipeline.retriever, "embeddings", None)
+        if isinstance(embeddings, EmbeddingCoalescer):
+            # Limita as requisições HTTP reais (lotes), não cada chamada coalescida
+            embeddings.embeddings = LimitadoPorTaxa(embeddings.embeddings, limites["openai"], ("embed_documents",))
+        elif embeddings is not None:
+            rag_pipeline.retriever.embeddings = LimitadoPorTaxa(
+                embeddings, limites["openai"], ("embed_query", "embed_documents")
+            )
+
+    if "qdrant" in limites and getattr(rag_pipeline.retriever, "client", None) is not None:
+        rag_pipeline.retriever.client = LimitadoPorTaxa(
+            rag_pipeline.retriever.client, limites["qdrant"], ("query_points",)
+        )
+
+    if "tavily" in limites and getattr(web_tool, "tool", None) is not None:
+        web_tool.tool = LimitadoPorTaxa(web_tool.tool, limites["tavily"])
+
+    return llm
+
+
+def executar_item(
+    graph, item: dict, tentativas: int = 3, backoff: float = 1.0, orcamento: float | None = None,
+    perfilador=None, classe: str = INTERATIVO,
+) -> dict:
+    """
+    Executa uma consulta com retentativas (backoff exponencial).
+    `orcamento` (s) vira o `deadline` de cada tentativa.
+    `perfilador` (Perfilador, opcional) perfila cada tentativa sorteada.
+    `classe`: classe de prioridade no agendador (utils/agendador.py).
+    """
+    pergunta = item.get("pergunta", "")
+    perfil = item.get("perfil", {})
+    erro = None
+    inicio = time.perf_counter()
+
+    for tentativa in range(1, tentativas + 1):
+        rastro = Rastro()
+        state = {
+            "messages": [HumanMessage(content=pergunta)],
+            "perfil_cliente": perfil,
+            "ultima_pergunta": pergunta,
+        }
+        if orcamento is not None:
+            state["deadline"] = criar_deadline(orcamento)
+        try:
+            with ativar(rastro), prioridade(classe):
+                if perfilador is not None:
+                    with perfilador.perfilar(rastro.trace_id):
+                        result = graph.invoke(state)
+                else:
+                    result = graph.invoke(state)
+
+            msgs = result.get("messages", [])
+            if not msgs:
+                raise RuntimeError("Grafo retornou messages vazio")
+
+            return {
+                "id": item["id"],
+                "perfil": perfil,
+                "pergunta": pergunta,
+                "resposta": msgs[-1].content,
+                "fontes": result.get("sources_data", []),
+                "rota": result.get("__route__"),
+                "trace_id": rastro.trace_id,
+                "timings": rastro.resumo()["timings"],
+                "eventos": rastro.eventos,
+                "tentativas": tentativa,
+                "duracao_s": round(time.perf_counter() - inicio, 4),
+                "erro": None,
+            }
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+            logger.warning(f"[LOTE] {item['id']} tentativa {tentativa}/{tentativas} falhou: {erro}")
+            if tentativa < tentativas:
+                time.sleep(backoff * (2 ** (tentativa - 1)))
+
+    return {
+        "id": item["id"],
+        "perfil": perfil,
+        "pergunta": pergunta,
+        "resposta": None,
+        "fontes": [],
+        "rota": None,
+        "trace_id": None,
+        "timings": {},
+        "eventos": [],
+        "tentativas": tentativas,
+        "duracao_s": round(time.perf_counter() - inicio, 4),
+        "erro": erro,
+    }
+
+
+def executar_lote(
+    graph,
+    entradas: list,
+    saida: str,
+    concorrencia: int = 4,
+    tentativas: int = 3,
+    backoff: float = 1.0,
+    orcamento: float | None = None,
+    perfilador=None,
+) -> dict:
+    """
+    Executa as entradas pendentes, gravando cada resultado assim que termina.
+    Retorna estatísticas agregadas (vazão, latências, tempo médio por etapa).
+    """
+    concluidos = carregar_concluidos(saida)
+    pendentes = [item for item in entradas if item["id"] not in concluidos]
+    logger.info(f"📦 Lote: {len(pendentes)} pendentes, {len(entradas) - len(pendentes)} já concluídos.")
+
+    lock = threading.Lock()
+    latencias, falhas = [], 0
+    soma_etapas, cont_etapas = {}, {}
+    inicio = time.perf_counter()
+
+    with open(saida, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, concorrencia)) as pool:
+        futuros = [
+            pool.submit(executar_item, graph, item, tentativas, backoff, orcamento, perfilador, LOTE)
+            for item in pendentes
+        ]
+
+        for futuro in as_completed(futuros):
+            registro = futuro.result()
+            with lock:
+                out.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                out.flush()
+
+            if registro["erro"]:
+                falhas += 1
+                continue
+
+            latencias.append(registro["duracao_s"])
+            for nome, dur in registro["timings"].items():
+                soma_etapas[nome] = soma_etapas.get(nome, 0.0) + dur
+                cont_etapas[nome] = cont_etapas.get(nome, 0) + 1
+
+    duracao = time.perf_counter() - inicio
+    return {
+        "total": len(entradas),
+        "executadas": len(pendentes),
+        "puladas": len(entradas) - len(pendentes),
+        "sucesso": len(pendentes) - falhas,
+        "falhas": falhas,
+        "duracao_s": round(duracao, 3),
+        "vazao_por_s": round(len(pendentes) / duracao, 3) if duracao > 0 else 0.0,
+        "latencia_p50_s": round(percentil(sorted(latencias), 50), 4),
+        "latencia_p95_s": round(percentil(sorted(latencias), 95), 4),
+        "etapas_media_s": {
+            nome: round(soma_etapas[nome] / cont_etapas[nome], 4) for nome in sorted(soma_etapas)
+        },
+        "profundidade": resumo_profundidade(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Execução em lote de consultas fiscais.")
+    parser.add_argument("entrada", help="JSONL com {perfil, pergunta}")
+    parser.add_argument("saida", help="JSONL de saída (também usado como checkpoint)")
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--tentativas", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=1.0, help="Espera base entre tentativas (s)")
+    parser.add_argument(
+        "--limite", action="append", default=[],
+        help="Limite por provedor em req/s, ex: openai=5 (repetível)",
+    )
+    parser.add_argument("--orcamento", type=float, default=None, help="Orçamento de latência por consulta (s)")
+    parser.add_argument(
+        "--compartilhar", action="store_true",
+        help="Consultas idênticas simultâneas (pergunta + perfil) compartilham uma execução",
+    )
+    parser.add_argument(
+        "--perfilar-taxa", type=float, default=0.0,
+        help="Fração das consultas perfiladas (pilhas dobradas em --perfis-dir)",
+    )
+    parser.add_argument("--perfis-dir", default=PERFIS_CPU_DIR_PADRAO)
+    parser.add_argument("--auditoria", default=None, help="Diretório da trilha de auditoria das consultas")
+    parser.add_argument("--fake", action="store_true", help="Usa backends falsos (sem rede)")
+    parser.add_argument("--cassete", default=None, help="Arquivo JSONL de gravação/reprodução das chamadas externas")
+    parser.add_argument("--modo-cassete", choices=["gravar", "reproduzir", "auto"], default="reproduzir")
+    parser.add_argument(
+        "--latencia-cassete", type=float, default=None,
+        help="Na reprodução, espera a latência gravada multiplicada por este fator",
+    )
+    parser.add_argument("--latencia-fake", type=float, default=0.0)
+    parser.add_argument(
+        "--hedge-percentil", type=float, default=0.0,
+        help="Duplica embeddings/Qdrant/juiz mais lentos que este percentil (0 = desligado)",
+    )
+    parser.add_argument("--hedge-max-extra", type=float, default=0.05, help="Fração máxima de requisições duplicadas")
+    parser.add_argument(
+        "--agendar", action="store_true",
+        help="Passa OpenAI e CrossEncoder pelo agendador como lote (--limite openai vira o bucket dele)",
+    )
+    parser.add_argument("--concorrencia-openai", type=int, default=8)
+    parser.add_argument("--concorrencia-rerank", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        from tools.backends import backends_falsos
+        llm, rag_pipeline, web_tool = backends_falsos(args.latencia_fake)
+    elif args.cassete:
+        from tools.backends import backends_cassete
+        from utils.cassette import Cassete
+        cassete = Cassete(
+            args.cassete, modo=args.modo_cassete,
+            reproduzir_latencia=bool(args.latencia_cassete),
+            fator_latencia=args.latencia_cassete or 1.0,
+        )
+        llm, rag_pipeline, web_tool = backends_cassete(cassete)
+    else:
+        from tools.backends import backends_reais
+        llm, rag_pipeline, web_tool = backends_reais()
+
+    # Razão de custos por dentro do hedge: cada tentativa faturada é lançada
+    llm = contabilizar(llm, rag_pipeline, modelos_por_etapa())
+    if args.hedge_percentil:
+        aplicar_hedging(rag_pipeline, args.hedge_percentil, args.hedge_max_extra)
+    limites = parse_limites(args.limite)
+    if args.agendar:
+        agendador.registrar("openai", concorrencia=args.concorrencia_openai, bucket=limites.pop("openai", None))
+        agendador.registrar("rerank", concorrencia=args.concorrencia_rerank)
+    llm = aplicar_limites(llm, rag_pipeline, web_tool, limites)
+    if args.agendar:
+        llm = aplicar_agendador(llm, rag_pipeline, agendador)
+    auditoria = None
+    if args.auditoria:
+        from services.auditoria import AuditoriaConsultas
+        auditoria = AuditoriaConsultas(diretorio=args.auditoria)
+
+    graph = build_graph(llm=llm, retriever=rag_pipeline, web_tool=web_tool, auditoria=auditoria)
+    if args.compartilhar:
+        graph = ConsultasCompartilhadas(graph, auditoria=auditoria)
+
+    stats = executar_lote(
+        graph,
+        carregar_entradas(args.entrada),
+        args.saida,
+        concorrencia=args.concorrencia,
+        tentativas=args.tentativas,
+        backoff=args.backoff,
+        orcamento=args.orcamento,
+        perfilador=Perfilador(args.perfis_dir, taxa=args.perfilar_taxa) if args.perfilar_taxa > 0 else None,
+    )
+    if args.compartilhar:
+        stats["compartilhamento"] = graph.resumo()
+    stats["custos"] = livro_custos.agregados()
+    stats["transporte"] = reuso_conexoes()
+    if args.agendar:
+        stats["agendador"] = agendador.resumo()
+    if auditoria is not None:
+        auditoria.fechar()
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0 if stats["falhas"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# tools/bench_historico.py
+
+"""
+Tempo de rerun do Streamlit em função do tamanho do histórico do chat.
+
+Roda, sem navegador (streamlit.testing.AppTest), um script que só exibe o
+histórico, em dois modos:
+  completo — sanitiza e exibe todas as mensagens a cada rerun (comportamento antigo);
+  janela   — sanitiza só as novas e exibe as últimas `--janela` (components/chat_history.py).
+
+Uso (a partir de src/):
+    python -m tools.bench_historico --tamanhos 10,100,500,2000 --reruns 5 --janela 20
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from utils.metrics import percentil
+
+
+def _script_completo():
+    import streamlit as st
+    from langchain_core.messages import AIMessage
+
+    from utils.messages import sanitize_messages
+
+    st.session_state.messages = sanitize_messages(st.session_state.messages)
+    for msg in st.session_state.messages:
+        with st.chat_message("assistant" if isinstance(msg, AIMessage) else "user"):
+            st.write(msg.content)
+
+
+def _script_janela():
+    import streamlit as st
+
+    from components.chat_history import renderizar_historico, sanitizar_novas
+
+    sanitizar_novas(st.session_state)
+    renderizar_historico(janela=st.session_state.janela)
+
+
+SCRIPTS = {"completo": _script_completo, "janela": _script_janela}
+
+
+def historico(n: int) -> list:
+    """`n` mensagens alternadas (dicts, como chegam de fora), com ~400 caracteres cada."""
+    texto = "A alíquota de referência do IBS e da CBS será fixada por resolução do Senado. " * 5
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i}: {texto}"}
+        for i in range(n)
+    ]
+
+
+def medir(modo: str, n: int, reruns: int, janela: int) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_function(SCRIPTS[modo], default_timeout=120)
+    app.session_state["messages"] = historico(n)
+    app.session_state["janela"] = janela
+
+    tempos = []
+    for _ in range(reruns + 1):
+        inicio = time.perf_counter()
+        app.run()
+        tempos.append(time.perf_counter() - inicio)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    tempos = sorted(tempos[1:])  # o 1º rerun inclui os imports do script
+
+    return {
+        "modo": modo,
+        "mensagens": n,
+        "exibidas": len(app.chat_message),
+        "rerun_p50_ms": round(percentil(tempos, 50) * 1000, 2),
+        "rerun_max_ms": round(tempos[-1] * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de rerun × tamanho do histórico do chat.")
+    parser.add_argument("--tamanhos", default="10,100,500,2000")
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--janela", type=int, default=20)
+    parser.add_argument("--modos", default="completo,janela")
+    args = parser.parse_args(argv)
+
+    resultados = [
+        medir(modo, int(n), args.reruns, args.janela)
+        for n in args.tamanhos.split(",")
+        for modo in args.modos.split(",")
+    ]
+    print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# tools/bench_imports.py
+
+"""
+Relatório de tempo de import (estilo `python -X importtime`) dos módulos do app.
+
+Cada módulo é importado em um processo novo; o relatório traz o tempo
+cumulativo, os imports mais caros e quais dependências pesadas foram
+carregadas como efeito colateral (devem ser importadas só no uso).
+
+Uso (a partir de src/):
+    python -m tools.bench_imports [--modulo graph.builder ...] [--max-ms 1500] [--json]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+MODULOS_PADRAO = [
+    "graph.builder",
+    "rag.pipeline",
+    "rag.web",
+    "services.montagem",
+    "services.warmup",
+    "tools.backends",
+]
+
+PESADOS = [
+    "torch",
+    "sentence_transformers",
+    "qdrant_client",
+    "langchain_community",
+    "langchain_openai",
+    "langfuse",
+    "tavily",
+]
+
+_LINHA = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def medir_import(modulo: str, top: int = 10) -> dict:
+    """Importa `modulo` com -X importtime em um subprocesso e resume o resultado."""
+    codigo = (
+        f"import sys, json; import {modulo}; "
+        f"print(json.dumps([m for m in {PESADOS!r} if m in sys.modules]))"
+    )
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=src, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modulo}: {proc.stderr[-500:]}")
+
+    entradas = []
+    for linha in proc.stderr.splitlines():
+        m = _LINHA.match(linha)
+        if m:
+            entradas.append({
+                "modulo": m.group(4),
+                "self_ms": int(m.group(1)) / 1000,
+                "cumulativo_ms": int(m.group(2)) / 1000,
+                "nivel": len(m.group(3)) // 2,
+            })
+
+    alvo = next((e for e in reversed(entradas) if e["modulo"] == modulo), None)
+    topo = sorted((e for e in entradas if e["nivel"] <= 1), key=lambda e: e["cumulativo_ms"], reverse=True)
+
+    return {
+        "modulo": modulo,
+        "total_ms": round(alvo["cumulativo_ms"], 1) if alvo else None,
+        "pesados_importados": json.loads(proc.stdout.strip().splitlines()[-1]),
+        "mais_caros": [
+            {"modulo": e["modulo"], "cumulativo_ms": round(e["cumulativo_ms"], 1)} for e in topo[:top]
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatório de tempo de import.")
+    parser.add_argument("--modulo", action="append", help="Módulo a medir (repetível)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None, help="Falha se algum módulo exceder o limite")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args(argv)
+
+    relatorios = [medir_import(m, args.top) for m in (args.modulo or MODULOS_PADRAO)]
+
+    if args.json:
+        print(json.dumps(relatorios, ensure_ascii=False, indent=2))
+    else:
+        for r in relatorios:
+            print(f"\n{r['modulo']}: {r['total_ms']} ms")
+            print(f"  dependências pesadas: {', '.join(r['pesados_importados']) or 'nenhuma'}")
+            for e in r["mais_caros"]:
+                print(f"  {e['cumulativo_ms']:>9.1f} ms  {e['modulo']}")
+
+    excedidos = [r for r in relatorios if args.max_ms and (r["total_ms"] or 0) > args.max_ms]
+    return 1 if excedidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# tools/bench_rerank.py
+
+"""
+Benchmark do reranking vetorial sob carga concorrente:
+chamadas diretas ao CrossEncoder por thread vs. micro‑lotes compartilhados.
+
+Uso (a partir de src/):
+    python -m tools.bench_rerank --clientes 16 --requisicoes 20 [--fake]
+
+Com --fake, o modelo é substituído por um custo sintético que segura o GIL
+(overhead fixo por chamada + custo por par), sem baixar o CrossEncoder.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+from rag.rerank_vector import VectorReranker
+from tools.fakes import CORPUS_FALSO
+from utils.metrics import metricas, percentil
+
+
+class ModeloSintetico:
+    """Custo de CPU: `overhead_ms` por chamada + `por_par_ms` por par (busy-wait)."""
+
+    def __init__(self, overhead_ms: float = 4.0, por_par_ms: float = 0.3):
+        self.overhead = overhead_ms / 1000
+        self.por_par = por_par_ms / 1000
+
+    def predict(self, pairs, batch_size=None):
+        fim = time.perf_counter() + self.overhead + self.por_par * len(pairs)
+        while time.perf_counter() < fim:
+            pass
+        return [float(len(q) % 7 + len(d) % 5) for q, d in pairs]
+
+
+def _novo_reranker(fake: bool, microlotes: bool, max_lote: int, max_espera_ms: float):
+    reranker = VectorReranker()
+    if fake:
+        reranker.model = ModeloSintetico()
+    else:
+        reranker.aquecer()
+    if microlotes:
+        reranker.ativar_microlotes(max_lote=max_lote, max_espera_ms=max_espera_ms)
+    return reranker
+
+
+def medir(reranker, clientes: int, requisicoes: int, n_docs: int) -> dict:
+    docs = [{"page_content": CORPUS_FALSO[i % len(CORPUS_FALSO)][1]} for i in range(n_docs)]
+    latencias = []
+    lock = threading.Lock()
+
+    def cliente(c):
+        for r in range(requisicoes):
+            inicio = time.perf_counter()
+            reranker.rerank(f"pergunta {c}-{r} sobre IBS", docs, top_k=6)
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+
+    threads = [threading.Thread(target=cliente, args=(c,)) for c in range(clientes)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "requisicoes": len(latencias),
+        "duracao_s": round(duracao, 3),
+        "vazao_req_s": round(len(latencias) / duracao, 2),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de reranking concorrente.")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--requisicoes", type=int, default=20)
+    parser.add_argument("--docs", type=int, default=12)
+    parser.add_argument("--max-lote", type=int, default=64)
+    parser.add_argument("--max-espera-ms", type=float, default=5.0)
+    parser.add_argument("--fake", action="store_true", help="Modelo sintético (sem CrossEncoder)")
+    args = parser.parse_args(argv)
+
+    resultado = {}
+    for modo, microlotes in (("direto", False), ("microlotes", True)):
+        metricas.resetar()
+        reranker = _novo_reranker(args.fake, microlotes, args.max_lote, args.max_espera_ms)
+        resultado[modo] = medir(reranker, args.clientes, args.requisicoes, args.docs)
+        if microlotes:
+            lote = metricas.distribuicao("rerank.tamanho_lote")
+            resultado[modo]["tamanho_medio_lote"] = round(lote["media"], 1)
+            reranker._batcher.fechar()
+
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# tools/bench_transporte.py
+
+"""
+Benchmark de latência por chamada ao Qdrant: REST (pool keep‑alive) vs. gRPC.
+
+Cria uma coleção temporária com vetores aleatórios em um Qdrant local,
+mede `query_points` sequencial (latência por chamada) e com `--clientes`
+threads (vazão) em cada transporte, e remove a coleção ao final.
+
+Uso (a partir de src/), com um Qdrant local:
+    docker run -p 6333:6333 -p 6334:6334 qdrant/qdrant
+    python -m tools.bench_transporte --pontos 20000 --dim 256 --consultas 500 --clientes 8
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+
+from utils.metrics import percentil
+from utils.transporte import pool_httpx, reuso_conexoes
+
+
+def _cliente(url: str, grpc: bool, timeout: int):
+    from qdrant_client import QdrantClient
+
+    if grpc:
+        return QdrantClient(url=url, prefer_grpc=True, timeout=timeout)
+    return QdrantClient(url=url, timeout=timeout, **pool_httpx("qdrant_rest"))
+
+
+def _vetor(rng: random.Random, dim: int) -> list:
+    return [rng.gauss(0, 1) for _ in range(dim)]
+
+
+def preparar_colecao(cliente, nome: str, pontos: int, dim: int, semente: int = 0):
+    from qdrant_client import models
+
+    rng = random.Random(semente)
+    cliente.create_collection(nome, vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE))
+    for inicio in range(0, pontos, 1000):
+        cliente.upsert(nome, points=[
+            models.PointStruct(id=i, vector=_vetor(rng, dim), payload={"page_content": f"doc {i}"})
+            for i in range(inicio, min(pontos, inicio + 1000))
+        ])
+
+
+def medir(cliente, colecao: str, consultas: list, clientes: int, limite: int) -> dict:
+    def consultar(vetor):
+        inicio = time.perf_counter()
+        cliente.query_points(collection_name=colecao, query=vetor, limit=limite, with_payload=True)
+        return time.perf_counter() - inicio
+
+    for vetor in consultas[:10]:  # aquecimento (conexão/canal)
+        consultar(vetor)
+
+    sequencial = sorted(consultar(v) for v in consultas)
+
+    fila = list(consultas)
+    lock = threading.Lock()
+
+    def trabalhador():
+        while True:
+            with lock:
+                if not fila:
+                    return
+                vetor = fila.pop()
+            consultar(vetor)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhador) for _ in range(clientes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "p50_ms": round(percentil(sequencial, 50) * 1000, 3),
+        "p95_ms": round(percentil(sequencial, 95) * 1000, 3),
+        "p99_ms": round(percentil(sequencial, 99) * 1000, 3),
+        "vazao_concorrente_por_s": round(len(consultas) / duracao, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Qdrant: REST vs. gRPC.")
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--pontos", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--limite", type=int, default=12)
+    parser.add_argument("--timeout", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    colecao = f"bench_{uuid.uuid4().hex[:8]}"
+    rest = _cliente(args.url, grpc=False, timeout=args.timeout)
+    preparar_colecao(rest, colecao, args.pontos, args.dim)
+
+    rng = random.Random(1)
+    consultas = [_vetor(rng, args.dim) for _ in range(args.consultas)]
+    try:
+        resultado = {
+            "rest": medir(rest, colecao, consultas, args.clientes, args.limite),
+            "grpc": medir(_cliente(args.url, grpc=True, timeout=args.timeout), colecao, consultas, args.clientes, args.limite),
+            "reuso_rest": reuso_conexoes().get("qdrant_rest"),
+        }
+    finally:
+        rest.delete_collection(colecao)
+
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+# tools/eval_retrieval.py
+
+"""
+Avaliação de qualidade × latência da recuperação (HybridRAGPipeline).
+
+Executa o conjunto ouro em cada combinação de parâmetros e reporta
+recall@k, MRR e nDCG@k (k = documentos finais), latência por etapa e tokens/
+custo do LLM‑as‑Judge e dos embeddings (razão de custos, utils/custos.py, pelos
+modelos de MODELO_JUIZ / MODELO_EMBEDDING), com a fronteira de Pareto
+(qualidade × latência p50).
+
+Com --dim-curta, avalia também a busca em dois estágios (vetor truncado no
+1º estágio, reavaliado com o completo; ver rag/ingest.py) e reporta o custo
+em recall ("perda_recall") frente à mesma configuração em um estágio (0).
+
+Conjunto ouro (JSONL): {"id", "pergunta", "perfil", "relevantes": [...]}.
+Um documento é relevante se seu id (`chunk_id` do payload ou
+"<source>#<chunk_index>") ou sua fonte (`source`, nível de artigo/lei)
+estiver em "relevantes".
+
+Uso (a partir de src/):
+    python -m tools.eval_retrieval --fake \\
+        --vector-top-k 4,6,8 --final-top-k 3,4 --limite 8,12,16 --hnsw-ef 64,128
+    python -m tools.eval_retrieval --fake --dim-curta 0,16,32 --fator-prefetch 2,4
+    python -m tools.eval_retrieval --cassete gravacao.jsonl --modo-cassete auto ...
+
+Offline: --fake usa o corpus local de tools/fakes.py; --cassete reproduz
+respostas gravadas do Qdrant/OpenAI (grave antes com --modo-cassete auto,
+pois cada combinação gera requisições diferentes).
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+
+from utils.custos import livro_custos
+from utils.metrics import percentil
+from utils.tracing import Rastro, ativar, etapa
+
+
+GOLDEN_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "golden_retrieval.jsonl")
+
+
+def carregar_golden(caminho: str) -> list:
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def id_documento(meta: dict) -> str:
+    if meta.get("chunk_id") is not None:
+        return str(meta["chunk_id"])
+    return f"{meta.get('source', '')}#{meta.get('chunk_index', '')}"
+
+
+def relevancias(fontes: list, relevantes: list) -> list:
+    """
+    Relevância binária de cada documento retornado, na ordem do ranking.
+    Cada item de `relevantes` conta uma vez (no primeiro documento que o cobre).
+    """
+    pendentes = set(relevantes)
+    rels = []
+    for meta in fontes:
+        cobertos = pendentes & {id_documento(meta), meta.get("source")}
+        pendentes -= cobertos
+        rels.append(1 if cobertos else 0)
+    return rels
+
+
+def recall(rels: list, n_relevantes: int) -> float:
+    return sum(rels) / n_relevantes if n_relevantes else 0.0
+
+
+def mrr(rels: list) -> float:
+    return next((1.0 / (i + 1) for i, r in enumerate(rels) if r), 0.0)
+
+
+def ndcg(rels: list, n_relevantes: int) -> float:
+    dcg = sum(r / math.log2(i + 2) for i, r in enumerate(rels))
+    ideal = sum(1 / math.log2(i + 2) for i in range(min(n_relevantes, len(rels))))
+    return dcg / ideal if ideal else 0.0
+
+
+def avaliar_configuracao(pipeline, golden: list, config: dict) -> dict:
+    """
+    Aplica `config` ao pipeline, roda o conjunto ouro e agrega métricas.
+    Tokens e custo vêm do razão de custos (zerado a cada configuração):
+    aplique `contabilizar` (services/montagem.py) ao pipeline antes.
+    """
+    pipeline.vector_top_k = config["vector_top_k"]
+    pipeline.final_top_k = config["final_top_k"]
+    pipeline.limite_qdrant = config["limite"]
+    pipeline.retriever.hnsw_ef = config["hnsw_ef"]
+    pipeline.retriever.dim_curta = config.get("dim_curta") or None
+    pipeline.retriever.fator_prefetch = config.get("fator_prefetch", 4)
+    livro_custos.resetar()
+
+    recalls, mrrs, ndcgs, totais, etapas = [], [], [], [], {}
+    for item in golden:
+        rastro = Rastro()
+        with ativar(rastro):
+            with etapa("rag"):
+                fontes, _ = pipeline.run(item["pergunta"], item.get("perfil", {}))
+
+        rels = relevancias(fontes, item["relevantes"])
+        recalls.append(recall(rels, len(item["relevantes"])))
+        mrrs.append(mrr(rels))
+        ndcgs.append(ndcg(rels, len(item["relevantes"])))
+        totais.append(rastro.timings.get("rag", 0.0))
+        for nome, dur in rastro.timings.items():
+            if nome != "rag":
+                etapas.setdefault(nome, []).append(dur)
+
+    n = len(golden) or 1
+    agregados = livro_custos.agregados()
+    tokens = sum(a["tokens_entrada"] + a["tokens_saida"] for a in agregados)
+    custo = sum(a["custo_usd"] for a in agregados)
+    return {
+        **config,
+        "recall": round(sum(recalls) / n, 4),
+        "mrr": round(sum(mrrs) / n, 4),
+        "ndcg": round(sum(ndcgs) / n, 4),
+        "latencia_p50_s": round(percentil(sorted(totais), 50), 4),
+        "latencia_p95_s": round(percentil(sorted(totais), 95), 4),
+        "etapas_p50_s": {k: round(percentil(sorted(v), 50), 4) for k, v in sorted(etapas.items())},
+        "tokens_por_consulta": round(tokens / n, 1),
+        "custo_usd_por_consulta": round(custo / n, 6),
+    }
+
+
+def marcar_pareto(resultados: list, objetivo: str = "ndcg") -> list:
+    """Marca as configurações não dominadas (maior `objetivo`, menor latência p50)."""
+    for r in resultados:
+        r["pareto"] = not any(
+            o[objetivo] >= r[objetivo] and o["latencia_p50_s"] <= r["latencia_p50_s"]
+            and (o[objetivo] > r[objetivo] or o["latencia_p50_s"] < r["latencia_p50_s"])
+            for o in resultados
+        )
+    return sorted(resultados, key=lambda r: (r["latencia_p50_s"], -r[objetivo]))
+
+
+def perda_recall(resultados: list) -> list:
+    """
+    Recall perdido pela busca em dois estágios: diferença para a mesma
+    configuração com dim_curta=0 (None se ela não estiver na grade).
+    """
+    base = {
+        (r["vector_top_k"], r["final_top_k"], r["limite"], r["hnsw_ef"]): r["recall"]
+        for r in resultados if not r.get("dim_curta")
+    }
+    for r in resultados:
+        referencia = base.get((r["vector_top_k"], r["final_top_k"], r["limite"], r["hnsw_ef"]))
+        r["perda_recall"] = None if referencia is None else round(referencia - r["recall"], 4)
+    return resultados
+
+
+def tabela_markdown(resultados: list) -> str:
+    colunas = ["vector_top_k", "final_top_k", "limite", "hnsw_ef", "dim_curta", "fator_prefetch",
+               "recall", "perda_recall", "mrr", "ndcg",
+               "latencia_p50_s", "latencia_p95_s", "tokens_por_consulta", "custo_usd_por_consulta", "pareto"]
+    linhas = ["| " + " | ".join(colunas) + " |", "|" + "---|" * len(colunas)]
+    for r in resultados:
+        linhas.append("| " + " | ".join("★" if c == "pareto" and r[c] else ("" if c == "pareto" else str(r.get(c, "")))
+                                         for c in colunas) + " |")
+    return "\n".join(linhas)
+
+
+def _inteiros(texto: str) -> list:
+    return [int(v) for v in texto.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Avaliação de recuperação: qualidade × latência.")
+    parser.add_argument("--golden", default=GOLDEN_PADRAO)
+    parser.add_argument("--vector-top-k", type=_inteiros, default=[6])
+    parser.add_argument("--final-top-k", type=_inteiros, default=[4])
+    parser.add_argument("--limite", type=_inteiros, default=[12], help="Candidatos buscados no Qdrant")
+    parser.add_argument("--hnsw-ef", type=_inteiros, default=[128])
+    parser.add_argument("--dim-curta", type=_inteiros, default=[0], help="Dimensão do 1º estágio (0 = um estágio)")
+    parser.add_argument("--fator-prefetch", type=_inteiros, default=[4], help="Candidatos do 1º estágio por resultado")
+    parser.add_argument("--objetivo", choices=["recall", "mrr", "ndcg"], default="ndcg")
+    parser.add_argument("--fake", action="store_true", help="Corpus local de tools/fakes.py (padrão sem --cassete)")
+    parser.add_argument("--latencia-fake", type=float, default=0.0)
+    parser.add_argument("--cassete", default=None)
+    parser.add_argument("--modo-cassete", choices=["gravar", "reproduzir", "auto"], default="reproduzir")
+    parser.add_argument("--latencia-cassete", type=float, default=None)
+    parser.add_argument("--json", default=None, help="Grava os resultados completos neste arquivo")
+    args = parser.parse_args(argv)
+
+    from services.montagem import contabilizar
+    from tools.backends import modelos_por_etapa
+
+    if args.cassete:
+        from tools.backends import backends_cassete
+        from utils.cassette import Cassete
+        cassete = Cassete(
+            args.cassete, modo=args.modo_cassete,
+            reproduzir_latencia=bool(args.latencia_cassete), fator_latencia=args.latencia_cassete or 1.0,
+        )
+        llm, pipeline, _ = backends_cassete(cassete)
+    else:
+        from tools.backends import backends_falsos
+        llm, pipeline, _ = backends_falsos(args.latencia_fake)
+
+    # A grade controla o número de candidatos; a política adaptativa o sobrescreveria
+    pipeline.profundidade = None
+    contabilizar(llm, pipeline, modelos_por_etapa())
+
+    golden = carregar_golden(args.golden)
+    resultados = []
+    grade = itertools.product(
+        args.vector_top_k, args.final_top_k, args.limite, args.hnsw_ef, args.dim_curta, args.fator_prefetch,
+    )
+    for vk, fk, lim, ef, dc, fp in grade:
+        if fk > vk or vk > lim or (not dc and fp != args.fator_prefetch[0]):
+            continue
+        config = {"vector_top_k": vk, "final_top_k": fk, "limite": lim, "hnsw_ef": ef,
+                  "dim_curta": dc, "fator_prefetch": fp if dc else None}
+        resultados.append(avaliar_configuracao(pipeline, golden, config))
+
+    resultados = marcar_pareto(perda_recall(resultados), args.objetivo)
+    print(tabela_markdown(resultados))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
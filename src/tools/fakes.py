@@ -0,0 +1,199 @@
+# tools/fakes.py
+
+"""
+Backends falsos (sem rede) para execução em lote, testes de carga e benchmarks.
+Mantêm a mesma interface dos componentes reais, com latência configurável.
+"""
+
+import hashlib
+import json
+import math
+import re
+import time
+
+from langchain_core.messages import AIMessage
+
+from rag.ingest import truncar
+from rag.qdrant import QdrantRetriever
+from rag.web import WebSearch
+
+
+CORPUS_FALSO = [
+    ("LC 214/2024", "O IBS incide sobre operações com bens e serviços, substituindo ICMS e ISS gradualmente."),
+    ("LC 214/2024", "A CBS substitui PIS e COFINS e adota regime não cumulativo com crédito amplo."),
+    ("EC 132/2023", "A transição do IBS ocorre entre 2029 e 2032 com redução progressiva do ICMS."),
+    ("LC 123/2006", "O Simples Nacional possui limite de receita bruta anual de R$ 4,8 milhões."),
+    ("LC 123/2006", "As alíquotas do Simples Nacional variam conforme o anexo e a faixa de faturamento."),
+    ("Convênio ICMS 142/2018", "A substituição tributária do ICMS atribui ao substituto o recolhimento do imposto."),
+    ("CF/88", "É vedado instituir impostos sobre livros, jornais, periódicos e o papel destinado à impressão."),
+    ("LC 87/1996", "O ICMS sobre energia elétrica integra sua própria base de cálculo."),
+    ("LC 116/2003", "O ISS é devido no local do estabelecimento prestador, salvo exceções legais."),
+    ("LC 214/2024", "A alíquota de referência do IBS e da CBS será fixada por resolução do Senado."),
+    ("Lei 10.637/2002", "O PIS não cumulativo permite créditos sobre insumos essenciais à atividade."),
+    ("Lei 10.833/2003", "A COFINS não cumulativa segue a alíquota de 7,6% com direito a créditos."),
+]
+
+DIMENSAO_FALSA = 64
+
+
+def _dormir(segundos: float):
+    if segundos > 0:
+        time.sleep(segundos)
+
+
+def _tokens(texto: str) -> list:
+    return re.findall(r"\w+", (texto or "").lower())
+
+
+def embedding_falso(texto: str, dim: int = DIMENSAO_FALSA) -> list:
+    """Bag-of-words com hashing, normalizado (determinístico)."""
+    vetor = [0.0] * dim
+    for tok in _tokens(texto):
+        h = int(hashlib.md5(tok.encode("utf-8")).hexdigest(), 16)
+        vetor[h % dim] += 1.0
+    norma = math.sqrt(sum(v * v for v in vetor)) or 1.0
+    return [v / norma for v in vetor]
+
+
+class FakeEmbeddings:
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+
+    def embed_query(self, text: str):
+        _dormir(self.latencia)
+        return embedding_falso(text)
+
+    def embed_documents(self, texts: list):
+        _dormir(self.latencia)
+        return [embedding_falso(t) for t in texts]
+
+
+class _Ponto:
+    def __init__(self, id, score, payload, vector=None):
+        self.id = id
+        self.score = score
+        self.payload = payload
+        self.vector = vector
+
+
+class _Resposta:
+    def __init__(self, points):
+        self.points = points
+
+
+class FakeQdrantClient:
+    """Busca exata por cosseno sobre o CORPUS_FALSO."""
+
+    def __init__(self, corpus=None, latencia: float = 0.0):
+        self.latencia = latencia
+        self.pontos = []
+        for i, (fonte, texto) in enumerate(corpus or CORPUS_FALSO):
+            self.pontos.append((
+                i,
+                embedding_falso(texto),
+                {"page_content": texto, "source": fonte, "document_type": "LEI", "chunk_index": i},
+            ))
+
+    def scroll(self, collection_name, limit=10, with_payload=True, with_vectors=False, **kwargs):
+        return [
+            _Ponto(pid, None, dict(payload) if with_payload else None, vetor if with_vectors else None)
+            for pid, vetor, payload in self.pontos[:limit]
+        ], None
+
+    def query_points(self, collection_name, query, limit=10, with_payload=True, with_vectors=False, prefetch=None, **kwargs):
+        _dormir(self.latencia)
+        pontos = self.pontos
+        if prefetch is not None:
+            # 1º estágio sobre o vetor truncado (como gravado por rag/ingest.py)
+            dim = len(prefetch.query)
+            candidatos = sorted(
+                pontos,
+                key=lambda p: sum(a * b for a, b in zip(prefetch.query, truncar(p[1], dim))),
+                reverse=True,
+            )
+            pontos = candidatos[:prefetch.limit]
+        scored = [
+            (sum(a * b for a, b in zip(query, vetor)), pid, vetor, payload)
+            for pid, vetor, payload in pontos
+        ]
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return _Resposta([
+            _Ponto(pid, score, dict(payload) if with_payload else None, vetor if with_vectors else None)
+            for score, pid, vetor, payload in scored[:limit]
+        ])
+
+
+class FakeQdrantRetriever(QdrantRetriever):
+    """QdrantRetriever real (mesmo `query`) sobre cliente e embeddings falsos."""
+
+    def __init__(self, latencia_embedding: float = 0.0, latencia_qdrant: float = 0.0):
+        self.client = FakeQdrantClient(latencia=latencia_qdrant)
+        self.collection = "fake"
+        self.embeddings = FakeEmbeddings(latencia=latencia_embedding)
+
+
+class FakeVectorReranker:
+    """Reranker por sobreposição de termos (substitui o CrossEncoder)."""
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+
+    def rerank(self, query: str, docs: list, top_k=6):
+        if not docs:
+            return []
+        _dormir(self.latencia)
+        termos = set(_tokens(query))
+        ranked = sorted(
+            ({**d, "score_vetorial": float(len(termos & set(_tokens(d["page_content"]))))} for d in docs),
+            key=lambda d: d["score_vetorial"],
+            reverse=True,
+        )
+        return ranked[:top_k]
+
+
+class FakeLLM:
+    """
+    Simula o ChatOpenAI: responde JSON de scores quando chamado pelo
+    LLM‑as‑Judge (response_format) e texto livre na geração final.
+    """
+
+    def __init__(self, latencia: float = 0.0, resposta: str = "Resposta simulada."):
+        self.latencia = latencia
+        self.resposta = resposta
+
+    def invoke(self, messages, **kwargs):
+        _dormir(self.latencia)
+
+        if kwargs.get("response_format"):
+            prompt = messages[-1]["content"] if isinstance(messages[-1], dict) else messages[-1].content
+            ids = [int(i) for i in re.findall(r'"doc_id": (\d+)', prompt.split("DOCUMENTOS:")[-1])]
+            scores = [
+                {"doc_id": doc_id, "score": round(1.0 - pos / (len(ids) + 1), 2)}
+                for pos, doc_id in enumerate(ids)
+            ]
+            return AIMessage(content=json.dumps({"scores": scores}))
+
+        return AIMessage(content=self.resposta)
+
+
+class FakeTavilyTool:
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+
+    def invoke(self, params):
+        _dormir(self.latencia)
+        query = params.get("query", "")
+        return [{
+            "url": "https://example.com/noticia",
+            "snippet": f"Resultado simulado para: {query}",
+            "content": "Conteúdo simulado de notícia tributária.",
+        }]
+
+
+class FakeWebSearch(WebSearch):
+    """WebSearch real (mesmo `execute`) sobre um Tavily falso."""
+
+    def __init__(self, latencia: float = 0.0, **kwargs):
+        super().__init__(api_key="", tool=FakeTavilyTool(latencia=latencia), **kwargs)
@@ -0,0 +1,53 @@
+# tools/importar_perfis.py
+
+"""
+Importação em lote de perfis (CSV ou JSONL) para o store de perfis.
+
+Campos: nome_empresa, cnae_principal, regime_tributario, faturamento_anual
+(colunas extras são mantidas no perfil). CNAE, regime e faturamento são
+validados e normalizados; linhas com erro ficam fora e vão para o relatório.
+Os perfis válidos são gravados em uma única transação.
+
+Uso (a partir de src/):
+    python -m tools.importar_perfis clientes.csv --usuario escritorio [--db data/perfis.db] [--baixar-cnae]
+
+Sem embedder aqui: o embedding de cada perfil é gerado na primeira leitura pelo app.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from services.cnae_api import TABELA_CNAE_PADRAO, baixar_tabela_cnae, carregar_tabela_cnae
+from services.perfil_import import importar_perfis
+from services.perfil_store import PERFIS_DB_PADRAO, PerfilStore
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa perfis de empresas em lote.")
+    parser.add_argument("arquivo", help="CSV ou JSONL com os perfis")
+    parser.add_argument("--usuario", default="padrao")
+    parser.add_argument("--db", default=PERFIS_DB_PADRAO, help="Banco de perfis (PERFIS_DB do app)")
+    parser.add_argument("--tabela-cnae", default=TABELA_CNAE_PADRAO, help="CSV codigo,titulo das subclasses")
+    parser.add_argument("--baixar-cnae", action="store_true", help="Baixa a tabela do IBGE antes de importar")
+    args = parser.parse_args(argv)
+
+    if args.baixar_cnae:
+        baixar_tabela_cnae(args.tabela_cnae)
+    tabela = carregar_tabela_cnae(args.tabela_cnae)
+
+    formato = os.path.splitext(args.arquivo)[1]
+    with open(args.arquivo, encoding="utf-8-sig") as f:
+        conteudo = f.read()
+
+    store = PerfilStore(args.db)
+    relatorio = importar_perfis(store, args.usuario, conteudo, formato, tabela)
+    store.fechar()
+
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    return 0 if not relatorio["erros"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# tools/ingerir.py
+
+"""
+Ingestão de chunks (JSONL) em uma coleção do Qdrant.
+
+Cada linha: {"page_content", "source", "chunk_index", ...} (campos extras vão
+para o payload). Com --dim-curta, grava também o vetor truncado para a busca
+em dois estágios (ver rag/ingest.py); ative-a no app com QDRANT_DIM_CURTA.
+Com --armazem, grava também o armazém local de chunks (rag/chunk_store.py)
+para buscas só de ids (CHUNKS_DIR no app); --sem-texto-no-qdrant deixa o
+texto apenas no armazém.
+
+Uso (a partir de src/), com QDRANT_URL, QDRANT_API_KEY e OPENAI_API_KEY no ambiente:
+    python -m tools.ingerir chunks.jsonl --colecao leis_fiscais_v2 --dim-curta 256 [--recriar]
+    python -m tools.ingerir chunks.jsonl --colecao leis_fiscais_v2 --armazem data/chunks --sem-texto-no-qdrant
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from rag.chunk_store import EscritorChunks
+from rag.ingest import criar_colecao, ingerir
+from tools.backends import modelos_por_etapa
+
+
+# Dimensão completa dos modelos de embedding da OpenAI
+DIMENSOES = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingere chunks JSONL no Qdrant.")
+    parser.add_argument("arquivo", help="JSONL com os chunks")
+    parser.add_argument("--colecao", default="leis_fiscais_v1")
+    parser.add_argument("--dim-curta", type=int, default=0, help="Dimensão do vetor do 1º estágio (0 = só o completo)")
+    parser.add_argument("--lote", type=int, default=64)
+    parser.add_argument("--armazem", default=None, help="Diretório do armazém local de chunks")
+    parser.add_argument("--sem-texto-no-qdrant", action="store_true", help="Texto só no armazém (exige --armazem)")
+    parser.add_argument("--recriar", action="store_true", help="Apaga a coleção antes de criar")
+    args = parser.parse_args(argv)
+    if args.sem_texto_no_qdrant and not args.armazem:
+        parser.error("--sem-texto-no-qdrant exige --armazem")
+
+    from langchain_openai import OpenAIEmbeddings
+    from qdrant_client import QdrantClient
+
+    with open(args.arquivo, encoding="utf-8") as f:
+        chunks = [json.loads(linha) for linha in f if linha.strip()]
+
+    modelo = modelos_por_etapa(os.environ)["embedding"]
+    client = QdrantClient(url=os.environ["QDRANT_URL"], api_key=os.environ.get("QDRANT_API_KEY"), timeout=60)
+    embeddings = OpenAIEmbeddings(model=modelo, api_key=os.environ["OPENAI_API_KEY"])
+
+    if args.recriar or not client.collection_exists(args.colecao):
+        criar_colecao(client, args.colecao, DIMENSOES.get(modelo, 1536), args.dim_curta or None, recriar=args.recriar)
+    # O armazém é regravado por inteiro: ids são as posições no arquivo de chunks
+    armazem = EscritorChunks(args.armazem) if args.armazem else None
+    try:
+        stats = ingerir(
+            client, args.colecao, chunks, embeddings, dim_curta=args.dim_curta or None, lote=args.lote,
+            armazem=armazem, texto_no_qdrant=not args.sem_texto_no_qdrant,
+        )
+    finally:
+        if armazem is not None:
+            armazem.fechar()
+
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
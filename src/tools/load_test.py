@@ -0,0 +1,286 @@
+# tools/load_test.py
+
+"""
+Teste de carga do grafo de consulta com chegadas em malha aberta.
+
+As consultas chegam em um processo de Poisson (`--taxa` por segundo) durante
+`--duracao` segundos e são atendidas por até `--usuarios` execuções
+simultâneas; quem chega com todos ocupados espera na fila. O relatório traz
+vazão, percentis de latência (total e por etapa), espera em fila e uma série
+temporal de CPU, RSS, consultas em andamento e fila.
+
+Uso (a partir de src/):
+    python -m tools.load_test --fake --taxa 20 --duracao 30 --usuarios 50 [--cpu-rerank]
+    python -m tools.load_test --cassete gravacao.jsonl --latencia-cassete 1.0 --taxa 10
+    python -m tools.load_test --perguntas perguntas.jsonl --fake ...
+
+--cpu-rerank troca o reranker falso por um CrossEncoder sintético que consome
+CPU (tools/bench_rerank.ModeloSintetico); com --microlotes ele é compartilhado
+entre consultas em micro‑lotes.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from graph.builder import build_graph
+from services.montagem import aplicar_agendador, aplicar_hedging, contabilizar
+from tools.backends import modelos_por_etapa
+from tools.batch_runner import carregar_entradas, executar_item
+from utils.agendador import INTERATIVO, LOTE, agendador
+from utils.custos import livro_custos
+from utils.metrics import metricas, percentil
+from utils.transporte import reuso_conexoes
+
+
+MIX_PADRAO = [
+    {"pergunta": "Qual a alíquota de referência do IBS e da CBS?", "perfil": {"regime_tributario": "Lucro Real"}},
+    {"pergunta": "Como funciona a transição do ICMS para o IBS?", "perfil": {"regime_tributario": "Lucro Presumido"}},
+    {"pergunta": "Qual o limite de faturamento do Simples Nacional?", "perfil": {"regime_tributario": "Simples Nacional"}},
+    {"pergunta": "A substituição tributária do ICMS continua após a reforma?", "perfil": {"regime_tributario": "Lucro Real"}},
+    {"pergunta": "O PIS não cumulativo permite crédito sobre insumos?", "perfil": {"regime_tributario": "Lucro Real"}},
+    {"pergunta": "Onde o ISS é devido na prestação de serviços?", "perfil": {"regime_tributario": "Simples Nacional"}},
+]
+
+
+def _rss_mb() -> float:
+    """RSS atual via /proc (Linux); fora dele, o pico (ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class AmostradorRecursos:
+    """Amostra CPU do processo (% de um núcleo), RSS e contadores a cada `intervalo` s."""
+
+    def __init__(self, intervalo: float = 1.0, contadores=None):
+        self.intervalo = intervalo
+        self.contadores = contadores or (lambda: {})
+        self.serie = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="amostrador", daemon=True)
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        cpu_ant, t_ant = time.process_time(), time.perf_counter()
+        while not self._parar.wait(self.intervalo):
+            cpu, t = time.process_time(), time.perf_counter()
+            self.serie.append({
+                "t_s": round(t - self._inicio, 2),
+                "cpu_pct": round(100 * (cpu - cpu_ant) / (t - t_ant), 1),
+                "rss_mb": round(_rss_mb(), 1),
+                **self.contadores(),
+            })
+            cpu_ant, t_ant = cpu, t
+
+    def parar(self) -> list:
+        self._parar.set()
+        self._thread.join(timeout=self.intervalo * 2)
+        return self.serie
+
+
+def _resumo(valores: list) -> dict:
+    ordenados = sorted(valores)
+    return {
+        "p50": round(percentil(ordenados, 50), 4),
+        "p95": round(percentil(ordenados, 95), 4),
+        "p99": round(percentil(ordenados, 99), 4),
+        "max": round(ordenados[-1], 4) if ordenados else 0.0,
+    }
+
+
+def executar_carga(
+    graph,
+    mix: list,
+    taxa: float,
+    duracao: float,
+    usuarios: int = 20,
+    orcamento: float | None = None,
+    intervalo_amostra: float = 1.0,
+    semente: int | None = None,
+    fracao_lote: float = 0.0,
+) -> dict:
+    """
+    Dispara consultas do `mix` com chegadas exponenciais (média 1/taxa)
+    e aguarda todas terminarem. Retorna o relatório agregado.
+    `fracao_lote`: fração das chegadas na classe de prioridade "lote"
+    (as demais são interativas); o relatório separa latências por classe.
+    """
+    rng = random.Random(semente)
+    lock = threading.Lock()
+    estado = {"em_andamento": 0, "na_fila": 0}
+    registros = []
+
+    def atender(item, chegada, classe):
+        inicio = time.perf_counter()
+        with lock:
+            estado["na_fila"] -= 1
+            estado["em_andamento"] += 1
+        try:
+            registro = executar_item(graph, item, tentativas=1, backoff=0, orcamento=orcamento, classe=classe)
+        finally:
+            with lock:
+                estado["em_andamento"] -= 1
+        registro["espera_fila_s"] = inicio - chegada
+        registro["classe"] = classe
+        with lock:
+            registros.append(registro)
+
+    def contadores():
+        with lock:
+            return dict(estado)
+
+    amostrador = AmostradorRecursos(intervalo_amostra, contadores).iniciar()
+    inicio = time.perf_counter()
+    enviadas = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, usuarios), thread_name_prefix="carga") as pool:
+        proxima = inicio
+        while True:
+            proxima += rng.expovariate(taxa)
+            if proxima - inicio > duracao:
+                break
+            time.sleep(max(0.0, proxima - time.perf_counter()))
+            item = dict(rng.choice(mix), id=f"carga-{enviadas}")
+            classe = LOTE if rng.random() < fracao_lote else INTERATIVO
+            with lock:
+                estado["na_fila"] += 1
+            pool.submit(atender, item, time.perf_counter(), classe)
+            enviadas += 1
+
+    total_s = time.perf_counter() - inicio
+    serie = amostrador.parar()
+
+    sucesso = [r for r in registros if not r["erro"]]
+    etapas = {}
+    for r in sucesso:
+        for nome, dur in r["timings"].items():
+            etapas.setdefault(nome, []).append(dur)
+
+    relatorio = {
+        "taxa_chegada_por_s": taxa,
+        "usuarios": usuarios,
+        "enviadas": enviadas,
+        "concluidas": len(sucesso),
+        "falhas": len(registros) - len(sucesso),
+        "duracao_s": round(total_s, 3),
+        "vazao_por_s": round(len(sucesso) / total_s, 3) if total_s > 0 else 0.0,
+        "latencia_s": _resumo([r["duracao_s"] for r in sucesso]),
+        "espera_fila_s": _resumo([r["espera_fila_s"] for r in registros]),
+        "etapas_s": {nome: _resumo(v) for nome, v in sorted(etapas.items())},
+        "cpu_pct_max": max((a["cpu_pct"] for a in serie), default=0.0),
+        "rss_mb_max": max((a["rss_mb"] for a in serie), default=round(_rss_mb(), 1)),
+        "serie": serie,
+    }
+    if fracao_lote:
+        relatorio["por_classe"] = {}
+        for classe in (INTERATIVO, LOTE):
+            da_classe = [r for r in registros if r["classe"] == classe]
+            ok = [r["duracao_s"] for r in da_classe if not r["erro"]]
+            relatorio["por_classe"][classe] = {
+                "enviadas": len(da_classe),
+                "falhas": len(da_classe) - len(ok),
+                "latencia_s": _resumo(ok),
+            }
+    return relatorio
+
+
+def _backends(args):
+    if args.cassete:
+        from tools.backends import backends_cassete
+        from utils.cassette import Cassete
+        cassete = Cassete(
+            args.cassete, modo="reproduzir",
+            reproduzir_latencia=bool(args.latencia_cassete),
+            fator_latencia=args.latencia_cassete or 1.0,
+        )
+        return backends_cassete(cassete)
+
+    from tools.backends import backends_falsos
+    return backends_falsos(args.latencia_fake)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do grafo de consulta.")
+    parser.add_argument("--taxa", type=float, default=10.0, help="Chegadas por segundo (Poisson)")
+    parser.add_argument("--duracao", type=float, default=30.0, help="Janela de chegadas (s)")
+    parser.add_argument("--usuarios", type=int, default=20, help="Máximo de consultas simultâneas")
+    parser.add_argument("--perguntas", default=None, help="JSONL {perfil, pergunta} (padrão: mix interno)")
+    parser.add_argument("--orcamento", type=float, default=None, help="Orçamento de latência por consulta (s)")
+    parser.add_argument("--fake", action="store_true", help="Backends falsos (padrão sem --cassete)")
+    parser.add_argument("--latencia-fake", type=float, default=0.05)
+    parser.add_argument("--cassete", default=None, help="Reproduz chamadas gravadas (utils/cassette.py)")
+    parser.add_argument("--latencia-cassete", type=float, default=None)
+    parser.add_argument("--cpu-rerank", action="store_true", help="CrossEncoder sintético que consome CPU")
+    parser.add_argument("--microlotes", action="store_true", help="Com --cpu-rerank, reranking em micro‑lotes")
+    parser.add_argument("--amostragem", type=float, default=1.0, help="Intervalo de amostragem de CPU/RSS (s)")
+    parser.add_argument(
+        "--hedge-percentil", type=float, default=0.0,
+        help="Duplica embeddings/Qdrant/juiz mais lentos que este percentil (0 = desligado)",
+    )
+    parser.add_argument("--hedge-max-extra", type=float, default=0.05, help="Fração máxima de requisições duplicadas")
+    parser.add_argument("--agendar", action="store_true", help="OpenAI e CrossEncoder pelo agendador de prioridades")
+    parser.add_argument("--fracao-lote", type=float, default=0.0, help="Fração das chegadas com prioridade de lote")
+    parser.add_argument("--concorrencia-openai", type=int, default=8)
+    parser.add_argument("--taxa-openai", type=float, default=None, help="Bucket do recurso openai (req/s)")
+    parser.add_argument("--concorrencia-rerank", type=int, default=2)
+    parser.add_argument("--semente", type=int, default=None)
+    parser.add_argument("--sem-serie", action="store_true", help="Omite a série temporal do relatório")
+    args = parser.parse_args(argv)
+
+    llm, rag_pipeline, web_tool = _backends(args)
+    if args.cpu_rerank:
+        from rag.rerank_vector import VectorReranker
+        from tools.bench_rerank import ModeloSintetico
+        reranker = VectorReranker()
+        reranker.model = ModeloSintetico()
+        if args.microlotes:
+            reranker.ativar_microlotes()
+        rag_pipeline.vector_reranker = reranker
+
+    # Razão de custos por dentro do hedge: cada tentativa faturada é lançada
+    llm = contabilizar(llm, rag_pipeline, modelos_por_etapa())
+    if args.hedge_percentil:
+        aplicar_hedging(rag_pipeline, args.hedge_percentil, args.hedge_max_extra)
+    if args.agendar:
+        agendador.registrar("openai", taxa=args.taxa_openai, concorrencia=args.concorrencia_openai)
+        agendador.registrar("rerank", concorrencia=args.concorrencia_rerank)
+        llm = aplicar_agendador(llm, rag_pipeline, agendador)
+    graph = build_graph(llm=llm, retriever=rag_pipeline, web_tool=web_tool)
+    mix = carregar_entradas(args.perguntas) if args.perguntas else MIX_PADRAO
+
+    relatorio = executar_carga(
+        graph, mix, args.taxa, args.duracao, args.usuarios,
+        orcamento=args.orcamento, intervalo_amostra=args.amostragem, semente=args.semente,
+        fracao_lote=args.fracao_lote,
+    )
+    relatorio["custos"] = livro_custos.agregados()
+    relatorio["transporte"] = reuso_conexoes()
+    if args.agendar:
+        relatorio["agendador"] = agendador.resumo()
+    if args.hedge_percentil:
+        relatorio["hedge"] = {
+            nome: {c: metricas.valor(f"{nome}.hedge.{c}") for c in ("chamadas", "emitidos", "vencidos", "negados")}
+            for nome in ("embedding", "qdrant", "rag.llm_judge")
+        }
+    if args.sem_serie:
+        relatorio.pop("serie")
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    return 0 if relatorio["falhas"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
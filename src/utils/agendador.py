@@ -0,0 +1,217 @@
+# utils/agendador.py
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from utils.logs import logger
+from utils.metrics import metricas
+from utils.ratelimit import TokenBucket
+
+
+# Classes de prioridade (menor = mais prioritária)
+INTERATIVO = "interativo"
+LOTE = "lote"
+CLASSES = (INTERATIVO, LOTE)
+
+_classe_atual: ContextVar = ContextVar("classe_prioridade", default=INTERATIVO)
+
+
+def classe_atual() -> str:
+    return _classe_atual.get()
+
+
+@contextmanager
+def prioridade(classe: str):
+    """Chamadas agendadas dentro do bloco entram na classe `classe` (padrão: interativo)."""
+    if classe not in CLASSES:
+        raise ValueError(f"Classe de prioridade desconhecida: {classe}")
+    token = _classe_atual.set(classe)
+    try:
+        yield classe
+    finally:
+        _classe_atual.reset(token)
+
+
+class SobrecargaAgendador(RuntimeError):
+    """Trabalho de lote recusado na admissão: fila do recurso cheia."""
+
+
+class Recurso:
+    """
+    Recurso limitado (provedor ou CPU): até `concorrencia` chamadas em
+    execução e, opcionalmente, um TokenBucket de requisições por segundo.
+
+    Interativo sempre passa à frente do lote. O lote nunca ocupa as últimas
+    `reserva_interativa` vagas nem consome a última fração `reserva_fichas`
+    do bucket, e é recusado (SobrecargaAgendador) com `fila_max_lote`
+    chamadas de lote já na fila.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        concorrencia: int = 8,
+        bucket: TokenBucket | None = None,
+        reserva_interativa: int = 1,
+        reserva_fichas: float = 0.2,
+        fila_max_lote: int = 32,
+        fila_degradar_lote: int = 4,
+    ):
+        self.nome = nome
+        self.concorrencia = max(1, concorrencia)
+        self.bucket = bucket
+        self.reserva_interativa = min(reserva_interativa, self.concorrencia - 1)
+        self.reserva_fichas = reserva_fichas
+        self.fila_max_lote = fila_max_lote
+        self.fila_degradar_lote = fila_degradar_lote
+        self._cond = threading.Condition()
+        self._filas = {classe: deque() for classe in CLASSES}
+        self._em_uso = 0
+
+    def _pode_entrar(self, classe: str, vez) -> bool:
+        if self._filas[classe][0] is not vez:
+            return False
+        if classe == INTERATIVO:
+            return self._em_uso < self.concorrencia
+        return not self._filas[INTERATIVO] and self._em_uso < self.concorrencia - self.reserva_interativa
+
+    def _publicar_fila(self):
+        for classe, fila in self._filas.items():
+            metricas.definir(f"agendador.{self.nome}.fila.{classe}", len(fila))
+
+    def na_fila(self, classe: str | None = None) -> int:
+        with self._cond:
+            if classe is None:
+                return sum(len(f) for f in self._filas.values())
+            return len(self._filas[classe])
+
+    def entrar(self, classe: str):
+        """Espera a vez (e a ficha do bucket); retorna a espera em segundos."""
+        inicio = time.perf_counter()
+        vez = object()
+        with self._cond:
+            if classe == LOTE and len(self._filas[LOTE]) >= self.fila_max_lote:
+                metricas.incrementar(f"agendador.{self.nome}.descartadas.{classe}")
+                raise SobrecargaAgendador(f"Fila de lote cheia em {self.nome} ({self.fila_max_lote})")
+            self._filas[classe].append(vez)
+            self._publicar_fila()
+            while not self._pode_entrar(classe, vez):
+                self._cond.wait()
+            self._filas[classe].popleft()
+            self._em_uso += 1
+            self._publicar_fila()
+            self._cond.notify_all()
+
+        if self.bucket is not None:
+            reserva = self.reserva_fichas * self.bucket.capacidade if classe == LOTE else 0.0
+            self.bucket.adquirir(reserva=reserva)
+        return time.perf_counter() - inicio
+
+    def sair(self):
+        with self._cond:
+            self._em_uso -= 1
+            self._cond.notify_all()
+
+
+class Agendador:
+    """
+    Ponto único pelo qual passam chamadas a LLM, embeddings e reranking
+    (via `Agendado`), com classes de prioridade (`prioridade`), limites por
+    recurso e controle de admissão pela profundidade da fila:
+    lote é recusado com a fila cheia e, antes disso, degradado (`degradar`,
+    ex.: pular o LLM‑as‑Judge).
+
+    Métricas por recurso e classe: `agendador.<recurso>.espera_s.<classe>`
+    (distribuição), `.chamadas.<classe>`, `.descartadas.<classe>`,
+    `.degradadas.<classe>` e o gauge `.fila.<classe>`.
+    """
+
+    def __init__(self):
+        self.recursos = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nome: str, taxa: float | None = None, capacidade: float | None = None, **config) -> Recurso:
+        """Cria (ou substitui) o recurso `nome`; `taxa` em requisições/s cria o TokenBucket."""
+        if taxa and "bucket" not in config:
+            config["bucket"] = TokenBucket(taxa, capacidade)
+        recurso = Recurso(nome, **config)
+        with self._lock:
+            self.recursos[nome] = recurso
+        logger.info(f"🚦 Agendador: recurso {nome} (concorrência {recurso.concorrencia}"
+                    f"{f', {recurso.bucket.taxa:g} req/s' if recurso.bucket else ''})")
+        return recurso
+
+    def recurso(self, nome: str) -> Recurso | None:
+        with self._lock:
+            return self.recursos.get(nome)
+
+    def executar(self, nome: str, funcao, *args, **kwargs):
+        recurso = self.recurso(nome)
+        if recurso is None:
+            return funcao(*args, **kwargs)
+
+        classe = classe_atual()
+        espera = recurso.entrar(classe)
+        metricas.incrementar(f"agendador.{nome}.chamadas.{classe}")
+        metricas.observar(f"agendador.{nome}.espera_s.{classe}", espera)
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            recurso.sair()
+
+    def degradar(self, nome: str) -> bool:
+        """True se o trabalho corrente é de lote e a fila de `nome` passou do limite de degradação."""
+        recurso = self.recurso(nome)
+        if recurso is None or classe_atual() != LOTE:
+            return False
+        if recurso.na_fila() < recurso.fila_degradar_lote:
+            return False
+        metricas.incrementar(f"agendador.{nome}.degradadas.{LOTE}")
+        return True
+
+    def resumo(self) -> dict:
+        with self._lock:
+            nomes = sorted(self.recursos)
+        resumo = {}
+        for nome in nomes:
+            resumo[nome] = {}
+            for classe in CLASSES:
+                espera = metricas.distribuicao(f"agendador.{nome}.espera_s.{classe}")
+                resumo[nome][classe] = {
+                    "chamadas": metricas.valor(f"agendador.{nome}.chamadas.{classe}"),
+                    "descartadas": metricas.valor(f"agendador.{nome}.descartadas.{classe}"),
+                    "degradadas": metricas.valor(f"agendador.{nome}.degradadas.{classe}"),
+                    "espera_p50_s": round(espera["p50"], 4),
+                    "espera_p95_s": round(espera["p95"], 4),
+                }
+        return resumo
+
+
+class Agendado:
+    """
+    Proxy que passa os métodos listados pelo recurso `recurso` do agendador.
+    Demais atributos são repassados (como LimitadoPorTaxa).
+    """
+
+    def __init__(self, alvo, agendador: Agendador, recurso: str, metodos=("invoke",)):
+        self._alvo = alvo
+        self._agendador = agendador
+        self._recurso = recurso
+        self._metodos = set(metodos)
+
+    def __getattr__(self, nome):
+        attr = getattr(self._alvo, nome)
+        if nome not in self._metodos or not callable(attr):
+            return attr
+
+        def chamada(*args, **kwargs):
+            return self._agendador.executar(self._recurso, attr, *args, **kwargs)
+
+        return chamada
+
+
+# Agendador do processo (app e ferramentas)
+agendador = Agendador()
@@ -0,0 +1,131 @@
+# utils/batching.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.logs import logger
+from utils.metrics import metricas
+from utils.profiler import em_thread_perfilada, perfil_ativo
+
+
+# Espera máxima padrão por um resultado (s): um lote travado não prende o chamador
+PRAZO_PADRAO_S = 30.0
+
+
+class MicroBatcher:
+    """
+    Agrupa itens enviados por várias threads em lotes dinâmicos, processados
+    por uma única thread trabalhadora.
+
+    funcao_lote(itens) -> resultados (mesmo tamanho e ordem de `itens`).
+    Um lote fecha ao atingir `max_lote` itens ou `max_espera_ms` após o
+    primeiro item chegar. Cada item recebe seu resultado por um Future.
+
+    `fechar()` recusa novos itens, processa os já enfileirados e falha com
+    RuntimeError os que a thread não chegar a processar.
+
+    Enquanto processa um lote, a thread trabalhadora entra no perfil de CPU
+    (utils/profiler.py) das consultas perfiladas que têm itens nele.
+    """
+
+    def __init__(self, funcao_lote, max_lote: int = 64, max_espera_ms: float = 5.0, nome: str = "lote"):
+        self.funcao_lote = funcao_lote
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self.nome = nome
+        self._fila = queue.Queue()
+        self._ativo = True
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name=f"microlote-{nome}", daemon=True)
+        self._thread.start()
+
+    def submeter(self, itens: list) -> list:
+        """Enfileira os itens e retorna um Future por item."""
+        futuros = []
+        agora = time.perf_counter()
+        perfil = perfil_ativo()
+        # Sob o lock: nenhum item entra na fila depois da sentinela de fechar()
+        with self._lock:
+            if not self._ativo:
+                raise RuntimeError(f"MicroBatcher '{self.nome}' encerrado")
+            for item in itens:
+                futuro = Future()
+                self._fila.put((item, futuro, agora, perfil))
+                futuros.append(futuro)
+        return futuros
+
+    def executar(self, itens: list, timeout: float | None = PRAZO_PADRAO_S) -> list:
+        """Atalho bloqueante: submete e aguarda todos os resultados (até `timeout` s por item)."""
+        return [f.result(timeout=timeout) for f in self.submeter(itens)]
+
+    def _coletar(self) -> list:
+        primeiro = self._fila.get()
+        if primeiro is None:
+            return []
+        lote = [primeiro]
+        limite = time.perf_counter() + self.max_espera
+
+        while len(lote) < self.max_lote:
+            restante = limite - time.perf_counter()
+            try:
+                item = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._fila.put(None)  # a próxima coleta encerra o loop
+                break
+            lote.append(item)
+        return lote
+
+    def _loop(self):
+        while True:
+            lote = self._coletar()
+            if not lote:
+                break
+
+            inicio = time.perf_counter()
+            for _, _, enfileirado, _ in lote:
+                metricas.observar(f"{self.nome}.espera_fila_s", inicio - enfileirado)
+            metricas.observar(f"{self.nome}.tamanho_lote", len(lote))
+
+            try:
+                with em_thread_perfilada(*[perfil for *_, perfil in lote if perfil is not None]):
+                    resultados = list(self.funcao_lote([item for item, *_ in lote]))
+                if len(resultados) != len(lote):
+                    raise RuntimeError(
+                        f"funcao_lote retornou {len(resultados)} resultados para {len(lote)} itens"
+                    )
+            except Exception as e:
+                logger.error(f"[MICROLOTE:{self.nome}] Falha no lote de {len(lote)} itens: {e}")
+                for _, futuro, *_ in lote:
+                    futuro.set_exception(e)
+                continue
+
+            for (_, futuro, *_), resultado in zip(lote, resultados):
+                futuro.set_result(resultado)
+
+    def fechar(self, timeout: float = 5.0):
+        with self._lock:
+            if not self._ativo:
+                return
+            self._ativo = False
+            self._fila.put(None)
+        self._thread.join(timeout=timeout)
+
+        # Thread travada em um lote: o que ficou na fila falha em vez de esperar
+        pendentes = 0
+        while True:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                continue
+            item[1].set_exception(RuntimeError(f"MicroBatcher '{self.nome}' encerrado"))
+            pendentes += 1
+        if self._thread.is_alive():
+            self._fila.put(None)
+        if pendentes:
+            logger.warning(f"[MICROLOTE:{self.nome}] {pendentes} itens pendentes falharam no encerramento.")
@@ -0,0 +1,287 @@
+# utils/cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.cassette import chave_requisicao, restaurar, serializar
+from utils.logs import logger
+from utils.metrics import metricas
+from utils.tracing import registrar_decisao
+
+
+class TTLCache:
+    """
+    Cache LRU com expiração por tempo (TTL), thread-safe.
+    `ttl` em segundos; `max_itens` limita a memória (remove o menos recente).
+    """
+
+    def __init__(self, ttl: float = 300.0, max_itens: int = 256):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave, padrao=None):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return padrao
+
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                return padrao
+
+            self._dados.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl: float | None = None):
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._dados)
+
+
+CACHE_CONSULTAS_PADRAO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cache_consultas.db"
+)
+
+
+def chave_cache(*partes) -> str:
+    """Chave estável (sha1) para partes serializáveis em JSON, independente da ordem das chaves."""
+    bruto = json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest()
+
+
+class CachePersistente:
+    """
+    Cache por estágio do pipeline em SQLite, compartilhado entre processos
+    (app e ferramentas, ex.: tools/aquecer_cache.py), com um TTLCache em
+    memória na frente. Valores são JSON.
+
+    Estágios em `estagios_corpus` (busca e resposta) dependem do corpus e
+    ficam presos a uma versão: leituras usam a versão publicada (relida a
+    cada `recarregar_s`), a menos que `versao` seja fixada — o aquecedor grava
+    em uma versão nova e só a publica (`publicar`) ao terminar. Os demais
+    (embeddings, scores de rerank, juiz) dependem só do texto e valem entre
+    versões, mas expiram após `ttl_texto_s` e ficam limitados a `max_linhas`
+    por estágio (as mais antigas saem; limpeza a cada `limpar_a_cada` gravações
+    e em `publicar`).
+
+    Métricas: `cache.<estagio>.acertos`, `cache.<estagio>.faltas` e `cache.removidas`.
+    """
+
+    def __init__(
+        self,
+        caminho: str = CACHE_CONSULTAS_PADRAO,
+        versao: str | None = None,
+        estagios_corpus=("rag.qdrant", "generate_final"),
+        recarregar_s: float = 30.0,
+        max_itens: int = 2048,
+        ttl_texto_s: float = 14 * 24 * 3600,
+        max_linhas: int = 50_000,
+        limpar_a_cada: int = 500,
+    ):
+        self.caminho = caminho
+        self.estagios_corpus = set(estagios_corpus)
+        self.recarregar_s = recarregar_s
+        self.ttl_texto_s = ttl_texto_s
+        self.max_linhas = max_linhas
+        self.limpar_a_cada = limpar_a_cada
+        self._gravacoes = 0
+        self._fixa = versao
+        self._memoria = TTLCache(ttl=recarregar_s, max_itens=max_itens)
+        self._lock = threading.RLock()
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entradas (
+                estagio TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                versao TEXT NOT NULL,
+                valor TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                PRIMARY KEY (estagio, chave, versao)
+            );
+            CREATE INDEX IF NOT EXISTS entradas_criado_em ON entradas (estagio, criado_em);
+            CREATE TABLE IF NOT EXISTS meta (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self._publicada = None
+        self._lida_em = 0.0
+
+    # ---------------------------------------------------------
+    # Versão do corpus
+    # ---------------------------------------------------------
+    def versao_publicada(self) -> str:
+        with self._lock:
+            agora = time.monotonic()
+            if self._publicada is None or agora - self._lida_em >= self.recarregar_s:
+                linha = self._conn.execute("SELECT valor FROM meta WHERE chave = 'versao_corpus'").fetchone()
+                self._publicada = linha[0] if linha else ""
+                self._lida_em = agora
+            return self._publicada
+
+    @property
+    def versao(self) -> str:
+        return self._fixa if self._fixa is not None else self.versao_publicada()
+
+    def _versao_de(self, estagio: str) -> str:
+        return self.versao if estagio in self.estagios_corpus else ""
+
+    def publicar(self) -> int:
+        """Publica a versão fixada e apaga entradas de corpus de outras versões. Retorna quantas."""
+        if self._fixa is None:
+            raise ValueError("Publicação exige uma versão fixada (CachePersistente(versao=...)).")
+        marcadores = ",".join("?" * len(self.estagios_corpus))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO meta (chave, valor) VALUES ('versao_corpus', ?) "
+                "ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor",
+                (self._fixa,),
+            )
+            removidas = self._conn.execute(
+                f"DELETE FROM entradas WHERE versao != ? AND estagio IN ({marcadores})",
+                (self._fixa, *self.estagios_corpus),
+            ).rowcount
+            self._publicada = self._fixa
+        self.limpar()
+        logger.info(f"🗄️ Cache: versão '{self._fixa}' publicada ({removidas} entradas antigas removidas).")
+        return removidas
+
+    # ---------------------------------------------------------
+    # Operações
+    # ---------------------------------------------------------
+    def limpar(self) -> int:
+        """Remove entradas independentes do corpus vencidas (`ttl_texto_s`) ou além de `max_linhas`."""
+        limite = time.time() - self.ttl_texto_s
+        removidas = 0
+        with self._lock, self._conn:
+            estagios = [e for (e,) in self._conn.execute("SELECT DISTINCT estagio FROM entradas WHERE versao = ''")]
+            for estagio in estagios:
+                removidas += self._conn.execute(
+                    "DELETE FROM entradas WHERE estagio = ? AND versao = '' AND criado_em < ?", (estagio, limite),
+                ).rowcount
+                removidas += self._conn.execute(
+                    "DELETE FROM entradas WHERE rowid IN ("
+                    "SELECT rowid FROM entradas WHERE estagio = ? AND versao = '' "
+                    "ORDER BY criado_em DESC LIMIT -1 OFFSET ?)",
+                    (estagio, self.max_linhas),
+                ).rowcount
+        if removidas:
+            self._memoria.limpar()
+            metricas.incrementar("cache.removidas", removidas)
+            logger.info(f"🗄️ Cache: {removidas} entradas vencidas ou excedentes removidas.")
+        return removidas
+
+    def obter(self, estagio: str, chave: str, padrao=None):
+        versao = self._versao_de(estagio)
+        valor = self._memoria.get((estagio, chave, versao))
+        if valor is None:
+            # Entradas independentes do corpus valem por `ttl_texto_s`
+            desde = time.time() - self.ttl_texto_s if versao == "" else 0.0
+            with self._lock:
+                linha = self._conn.execute(
+                    "SELECT valor FROM entradas WHERE estagio = ? AND chave = ? AND versao = ? AND criado_em >= ?",
+                    (estagio, chave, versao, desde),
+                ).fetchone()
+            if linha is not None:
+                valor = json.loads(linha[0])
+                self._memoria.set((estagio, chave, versao), valor)
+
+        if valor is None:
+            metricas.incrementar(f"cache.{estagio}.faltas")
+            return padrao
+        metricas.incrementar(f"cache.{estagio}.acertos")
+        return valor
+
+    def gravar(self, estagio: str, chave: str, valor):
+        versao = self._versao_de(estagio)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entradas (estagio, chave, versao, valor, criado_em) VALUES (?, ?, ?, ?, ?)",
+                (estagio, chave, versao, json.dumps(valor, ensure_ascii=False), time.time()),
+            )
+            self._gravacoes += 1
+            limpar = self._gravacoes % self.limpar_a_cada == 0
+        self._memoria.set((estagio, chave, versao), valor)
+        if limpar:
+            self.limpar()
+
+    def contagem(self) -> dict:
+        """Entradas válidas (versão corrente ou independentes de versão) por estágio."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT estagio, versao, COUNT(*) FROM entradas GROUP BY estagio, versao"
+            ).fetchall()
+        contagem = {}
+        for estagio, versao, n in linhas:
+            if versao == self._versao_de(estagio):
+                contagem[estagio] = contagem.get(estagio, 0) + n
+        return contagem
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ComCache:
+    """
+    Proxy que guarda no CachePersistente o resultado dos métodos listados,
+    pela requisição e `variante` (ex.: o modelo). `chave` (opcional):
+    callable(args, kwargs) que substitui os argumentos na chave. Exceções não
+    são gravadas. Demais atributos são repassados (como Gravado).
+    """
+
+    def __init__(
+        self, alvo, cache: CachePersistente, estagio: str, metodos=("invoke",), variante: str = "", chave=None,
+    ):
+        self._alvo = alvo
+        self._cache = cache
+        self._estagio = estagio
+        self._metodos = set(metodos)
+        self._variante = variante
+        self._chave = chave
+
+    def __getattr__(self, nome):
+        attr = getattr(self._alvo, nome)
+        if nome not in self._metodos or not callable(attr):
+            return attr
+
+        def chamada(*args, **kwargs):
+            if self._chave is not None:
+                requisicao = (self._chave(args, kwargs),), {}
+            else:
+                requisicao = args, kwargs
+            chave, _ = chave_requisicao(self._estagio, f"{nome}:{self._variante}", *requisicao)
+            valor = self._cache.obter(self._estagio, chave)
+            if valor is not None:
+                registrar_decisao(self._estagio, "em_cache")
+                return restaurar(valor)
+
+            resultado = attr(*args, **kwargs)
+            self._cache.gravar(self._estagio, chave, serializar(resultado))
+            return resultado
+
+        return chamada
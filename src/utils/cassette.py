@@ -0,0 +1,177 @@
+# utils/cassette.py
+
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from utils.logs import logger
+from utils.metrics import metricas
+
+
+GRAVAR = "gravar"
+REPRODUZIR = "reproduzir"
+AUTO = "auto"
+
+
+class CasseteAusente(KeyError):
+    """Requisição sem gravação correspondente no modo `reproduzir`."""
+
+
+class ErroGravado(RuntimeError):
+    """Erro do serviço original, reproduzido a partir da gravação."""
+
+
+def serializar(obj):
+    """
+    Converte para JSON preservando tipos pydantic (AIMessage, QueryResponse...)
+    como {"__classe__": "modulo.Classe", "dados": {...}}. Outros objetos viram
+    {"__atributos__": {...}} e voltam como SimpleNamespace (acesso por atributo).
+    """
+    if hasattr(obj, "model_dump") and hasattr(type(obj), "model_validate"):
+        classe = type(obj)
+        return {"__classe__": f"{classe.__module__}.{classe.__qualname__}", "dados": obj.model_dump(mode="json")}
+    if isinstance(obj, dict):
+        return {str(k): serializar(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [serializar(v) for v in obj]
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if hasattr(obj, "__dict__"):
+        return {"__atributos__": serializar(vars(obj))}
+    return repr(obj)
+
+
+def restaurar(dados):
+    if isinstance(dados, dict):
+        if "__classe__" in dados:
+            modulo, _, nome = dados["__classe__"].rpartition(".")
+            classe = getattr(importlib.import_module(modulo), nome)
+            return classe.model_validate(dados["dados"])
+        if "__atributos__" in dados:
+            return SimpleNamespace(**restaurar(dados["__atributos__"]))
+        return {k: restaurar(v) for k, v in dados.items()}
+    if isinstance(dados, list):
+        return [restaurar(v) for v in dados]
+    return dados
+
+
+def chave_requisicao(provedor: str, metodo: str, args, kwargs) -> tuple:
+    requisicao = {"args": serializar(list(args)), "kwargs": serializar(kwargs)}
+    bruto = json.dumps([provedor, metodo, requisicao], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(bruto.encode("utf-8")).hexdigest(), requisicao
+
+
+class Cassete:
+    """
+    Gravação em disco (JSONL) de pares requisição/resposta de serviços
+    externos, com a latência original de cada chamada.
+
+    modos:
+      gravar     → chama o serviço real e grava (anexa ao arquivo);
+      reproduzir → responde só a partir da gravação (sem rede);
+                   requisição desconhecida levanta CasseteAusente;
+      auto       → reproduz o que existe e grava o que faltar.
+
+    Requisições idênticas repetidas são reproduzidas na ordem gravada
+    (a última se repete). Com `reproduzir_latencia`, cada resposta espera
+    `latencia_s * fator_latencia` antes de retornar.
+    """
+
+    def __init__(self, caminho: str, modo: str = REPRODUZIR, reproduzir_latencia: bool = False, fator_latencia: float = 1.0):
+        if modo not in (GRAVAR, REPRODUZIR, AUTO):
+            raise ValueError(f"Modo de cassete inválido: {modo!r}")
+        self.caminho = caminho
+        self.modo = modo
+        self.reproduzir_latencia = reproduzir_latencia
+        self.fator_latencia = fator_latencia
+        self._gravacoes = {}
+        self._posicoes = {}
+        self._lock = threading.Lock()
+        self._carregar()
+
+    def _carregar(self):
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue  # última linha truncada por interrupção
+                self._gravacoes.setdefault(registro["chave"], []).append(registro)
+        logger.info(f"📼 Cassete {self.caminho}: {sum(map(len, self._gravacoes.values()))} gravações.")
+
+    def __len__(self):
+        return sum(len(v) for v in self._gravacoes.values())
+
+    def _proxima(self, chave: str):
+        with self._lock:
+            gravacoes = self._gravacoes.get(chave)
+            if not gravacoes:
+                return None
+            pos = self._posicoes.get(chave, 0)
+            self._posicoes[chave] = pos + 1
+            return gravacoes[min(pos, len(gravacoes) - 1)]
+
+    def _gravar(self, registro: dict):
+        with self._lock:
+            self._gravacoes.setdefault(registro["chave"], []).append(registro)
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def chamar(self, provedor: str, metodo: str, funcao, args, kwargs):
+        chave, requisicao = chave_requisicao(provedor, metodo, args, kwargs)
+
+        if self.modo != GRAVAR:
+            registro = self._proxima(chave)
+            if registro is not None:
+                metricas.incrementar("cassete.reproduzidas")
+                if self.reproduzir_latencia:
+                    time.sleep(registro["latencia_s"] * self.fator_latencia)
+                if registro.get("erro"):
+                    raise ErroGravado(registro["erro"])
+                return restaurar(registro["resposta"])
+            if self.modo == REPRODUZIR:
+                metricas.incrementar("cassete.ausentes")
+                raise CasseteAusente(f"Sem gravação para {provedor}.{metodo} ({chave[:12]})")
+
+        inicio = time.perf_counter()
+        registro = {"chave": chave, "provedor": provedor, "metodo": metodo, "requisicao": requisicao}
+        try:
+            resposta = funcao(*args, **kwargs)
+        except Exception as e:
+            self._gravar({**registro, "resposta": None, "erro": f"{type(e).__name__}: {e}",
+                          "latencia_s": round(time.perf_counter() - inicio, 6)})
+            raise
+
+        metricas.incrementar("cassete.gravadas")
+        self._gravar({**registro, "resposta": serializar(resposta), "erro": None,
+                      "latencia_s": round(time.perf_counter() - inicio, 6)})
+        return resposta
+
+
+class Gravado:
+    """
+    Proxy que passa os métodos listados do objeto embrulhado pela cassete.
+    Demais atributos são repassados (como LimitadoPorTaxa).
+    """
+
+    def __init__(self, alvo, cassete: Cassete, provedor: str, metodos=("invoke",)):
+        self._alvo = alvo
+        self._cassete = cassete
+        self._provedor = provedor
+        self._metodos = set(metodos)
+
+    def __getattr__(self, nome):
+        attr = getattr(self._alvo, nome)
+        if nome not in self._metodos or not callable(attr):
+            return attr
+
+        def chamada(*args, **kwargs):
+            return self._cassete.chamar(self._provedor, nome, attr, args, kwargs)
+
+        return chamada
@@ -0,0 +1,76 @@
+# utils/circuit.py
+
+import threading
+import time
+
+from utils.logs import logger
+from utils.metrics import metricas
+
+
+class CircuitBreaker:
+    """
+    Disjuntor clássico:
+    - FECHADO: chamadas liberadas; falhas consecutivas são contadas.
+    - ABERTO: após `falhas_para_abrir` falhas, recusa chamadas por `tempo_aberto` s.
+    - MEIO_ABERTO: passado o tempo, libera uma chamada de teste;
+      sucesso fecha o circuito, falha o reabre.
+    """
+
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+
+    def __init__(self, nome: str, falhas_para_abrir: int = 5, tempo_aberto: float = 30.0):
+        self.nome = nome
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self._estado = self.FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+        self._publicar()
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado
+
+    def _publicar(self):
+        metricas.definir(f"{self.nome}.circuito_estado", self._estado)
+
+    def _mudar(self, estado: str):
+        if estado != self._estado:
+            logger.warning(f"⚡ Circuito {self.nome}: {self._estado} → {estado}")
+            self._estado = estado
+            self._publicar()
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self._estado == self.FECHADO:
+                return True
+
+            if self._estado == self.ABERTO:
+                if time.monotonic() - self._aberto_em < self.tempo_aberto:
+                    return False
+                self._mudar(self.MEIO_ABERTO)
+
+            # MEIO_ABERTO: apenas uma chamada de teste por vez
+            if self._teste_em_andamento:
+                return False
+            self._teste_em_andamento = True
+            return True
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            self._teste_em_andamento = False
+            self._mudar(self.FECHADO)
+
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+            self._teste_em_andamento = False
+            if self._estado == self.MEIO_ABERTO or self._falhas >= self.falhas_para_abrir:
+                self._aberto_em = time.monotonic()
+                self._mudar(self.ABERTO)
@@ -0,0 +1,227 @@
+# utils/custos.py
+
+import threading
+import time
+from collections import deque
+
+from utils.metrics import metricas, percentil
+from utils.tracing import rastro_atual
+
+
+# USD por 1M de tokens: (entrada, entrada em cache, saída)
+PRECOS = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "text-embedding-3-small": (0.02, 0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.13, 0.0),
+}
+
+# Modelo por etapa (sobrescrito por MODELO_JUIZ / MODELO_FINAL / MODELO_EMBEDDING)
+MODELOS_PADRAO = {
+    "rag.llm_judge": "gpt-4o",
+    "generate_final": "gpt-4o",
+    "embedding": "text-embedding-3-small",
+}
+
+
+def custo_usd(modelo: str, entrada: int, saida: int = 0, cache: int = 0) -> float:
+    """Custo estimado; tokens em cache (já contidos em `entrada`) pagam o preço reduzido."""
+    preco_entrada, preco_cache, preco_saida = PRECOS.get(modelo, (0.0, 0.0, 0.0))
+    return ((entrada - cache) * preco_entrada + cache * preco_cache + saida * preco_saida) / 1e6
+
+
+def _texto(mensagens) -> str:
+    if isinstance(mensagens, str):
+        return mensagens
+    if not isinstance(mensagens, list):
+        mensagens = [mensagens]
+    return "".join(
+        m if isinstance(m, str) else m["content"] if isinstance(m, dict) else getattr(m, "content", str(m))
+        for m in mensagens
+    )
+
+
+def uso_tokens(resposta, mensagens) -> tuple:
+    """
+    (entrada, cache, saída, estimado) de uma resposta de chat: usa
+    `usage_metadata` (ou `token_usage` da OpenAI) e, na falta, estima
+    ~4 caracteres/token.
+    """
+    uso = getattr(resposta, "usage_metadata", None) or {}
+    if uso:
+        cache = (uso.get("input_token_details") or {}).get("cache_read") or 0
+        return uso.get("input_tokens", 0), cache, uso.get("output_tokens", 0), False
+
+    token_usage = (getattr(resposta, "response_metadata", None) or {}).get("token_usage") or {}
+    if token_usage:
+        cache = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        return token_usage.get("prompt_tokens", 0), cache, token_usage.get("completion_tokens", 0), False
+
+    return len(_texto(mensagens)) // 4, 0, len(getattr(resposta, "content", "") or "") // 4, True
+
+
+class LivroCustos:
+    """
+    Razão de chamadas a LLMs e embeddings: um lançamento por chamada com
+    etapa, modelo, tokens (entrada, cache, saída), custo estimado, latência
+    e o trace_id da consulta ativa.
+
+    Os últimos `max_lancamentos` ficam em memória para consulta por trace_id;
+    os agregados por (etapa, modelo) acumulam desde o início do processo.
+    """
+
+    def __init__(self, max_lancamentos: int = 10000, max_latencias: int = 1000):
+        self._lock = threading.Lock()
+        self._lancamentos = deque(maxlen=max_lancamentos)
+        self._agregados = {}
+        self._latencias = {}
+        self.max_latencias = max_latencias
+
+    def registrar(
+        self, etapa: str, modelo: str, entrada: int, saida: int = 0, cache: int = 0,
+        latencia_s: float = 0.0, estimado: bool = False,
+    ) -> dict:
+        rastro = rastro_atual()
+        lancamento = {
+            "trace_id": rastro.trace_id if rastro is not None else None,
+            "etapa": etapa,
+            "modelo": modelo,
+            "tokens_entrada": entrada,
+            "tokens_cache": cache,
+            "tokens_saida": saida,
+            "custo_usd": custo_usd(modelo, entrada, saida, cache),
+            "latencia_s": latencia_s,
+            "estimado": estimado,
+        }
+        chave = (etapa, modelo)
+        with self._lock:
+            self._lancamentos.append(lancamento)
+            agregado = self._agregados.setdefault(chave, {
+                "etapa": etapa, "modelo": modelo, "chamadas": 0, "tokens_entrada": 0,
+                "tokens_cache": 0, "tokens_saida": 0, "custo_usd": 0.0, "latencia_s": 0.0,
+            })
+            agregado["chamadas"] += 1
+            agregado["tokens_entrada"] += entrada
+            agregado["tokens_cache"] += cache
+            agregado["tokens_saida"] += saida
+            agregado["custo_usd"] += lancamento["custo_usd"]
+            agregado["latencia_s"] += latencia_s
+            self._latencias.setdefault(chave, deque(maxlen=self.max_latencias)).append(latencia_s)
+
+        metricas.incrementar(f"custo_usd.{etapa}", lancamento["custo_usd"])
+        metricas.incrementar(f"tokens.{etapa}", entrada + saida)
+        return lancamento
+
+    def vincular(self, trace_id_lider: str | None) -> dict:
+        """
+        Lançamento sem custo da consulta ativa servida pela execução de outra
+        (single-flight, graph/consulta.py): os custos estão no trace do líder.
+        Não entra nos agregados, que contam chamadas aos modelos.
+        """
+        rastro = rastro_atual()
+        lancamento = {
+            "trace_id": rastro.trace_id if rastro is not None else None,
+            "etapa": "consulta.compartilhada",
+            "modelo": None,
+            "tokens_entrada": 0,
+            "tokens_cache": 0,
+            "tokens_saida": 0,
+            "custo_usd": 0.0,
+            "latencia_s": 0.0,
+            "estimado": False,
+            "compartilhada_de": trace_id_lider,
+        }
+        with self._lock:
+            self._lancamentos.append(lancamento)
+        return lancamento
+
+    def consulta(self, trace_id: str) -> dict:
+        """Lançamentos e totais de uma consulta."""
+        with self._lock:
+            lancamentos = [l for l in self._lancamentos if l["trace_id"] == trace_id]
+        return {
+            "lancamentos": lancamentos,
+            "custo_usd": round(sum(l["custo_usd"] for l in lancamentos), 6),
+            "tokens": sum(l["tokens_entrada"] + l["tokens_saida"] for l in lancamentos),
+            "latencia_s": round(sum(l["latencia_s"] for l in lancamentos), 4),
+        }
+
+    def agregados(self) -> list:
+        """
+        Por (etapa, modelo): chamadas, tokens, custo e latência (total, p50,
+        p95) e a participação de cada etapa no custo e na latência totais,
+        ordenados pelo custo.
+        """
+        with self._lock:
+            linhas = [dict(a) for a in self._agregados.values()]
+            latencias = {k: sorted(v) for k, v in self._latencias.items()}
+
+        custo_total = sum(l["custo_usd"] for l in linhas) or 1.0
+        latencia_total = sum(l["latencia_s"] for l in linhas) or 1.0
+        for linha in linhas:
+            amostras = latencias[(linha["etapa"], linha["modelo"])]
+            linha["latencia_p50_s"] = round(percentil(amostras, 50), 4)
+            linha["latencia_p95_s"] = round(percentil(amostras, 95), 4)
+            linha["participacao_custo"] = round(linha["custo_usd"] / custo_total, 4)
+            linha["participacao_latencia"] = round(linha["latencia_s"] / latencia_total, 4)
+            linha["custo_usd"] = round(linha["custo_usd"], 6)
+            linha["latencia_s"] = round(linha["latencia_s"], 4)
+        return sorted(linhas, key=lambda l: l["custo_usd"], reverse=True)
+
+    def resetar(self):
+        with self._lock:
+            self._lancamentos.clear()
+            self._agregados.clear()
+            self._latencias.clear()
+
+
+# Razão único do processo (como `metricas`)
+livro_custos = LivroCustos()
+
+
+class Contabilizado:
+    """
+    Proxy que lança no razão cada chamada ao objeto embrulhado:
+    `invoke` de chat (tokens da resposta) e `embed_query`/`embed_documents`
+    (tokens estimados pelo texto). Demais atributos são repassados
+    (como LimitadoPorTaxa e Gravado).
+    """
+
+    def __init__(self, alvo, etapa: str, modelo: str, livro: LivroCustos | None = None):
+        self._alvo = alvo
+        self._etapa = etapa
+        self._modelo = modelo
+        self._livro = livro or livro_custos
+
+    def __getattr__(self, nome):
+        return getattr(self._alvo, nome)
+
+    def invoke(self, mensagens, **kwargs):
+        inicio = time.perf_counter()
+        resposta = self._alvo.invoke(mensagens, **kwargs)
+        entrada, cache, saida, estimado = uso_tokens(resposta, mensagens)
+        self._livro.registrar(
+            self._etapa, self._modelo, entrada, saida, cache,
+            latencia_s=time.perf_counter() - inicio, estimado=estimado,
+        )
+        return resposta
+
+    def embed_query(self, text: str):
+        inicio = time.perf_counter()
+        vetor = self._alvo.embed_query(text)
+        self._livro.registrar(
+            self._etapa, self._modelo, len(text) // 4,
+            latencia_s=time.perf_counter() - inicio, estimado=True,
+        )
+        return vetor
+
+    def embed_documents(self, texts: list):
+        inicio = time.perf_counter()
+        vetores = self._alvo.embed_documents(texts)
+        self._livro.registrar(
+            self._etapa, self._modelo, sum(len(t) for t in texts) // 4,
+            latencia_s=time.perf_counter() - inicio, estimado=True,
+        )
+        return vetores
@@ -0,0 +1,54 @@
+# utils/deadline.py
+
+import time
+
+
+def criar_deadline(orcamento_s: float | None) -> float | None:
+    """Deadline absoluto (epoch, serializável no state) a partir de um orçamento em segundos."""
+    if orcamento_s is None:
+        return None
+    return time.time() + orcamento_s
+
+
+def restante(deadline: float | None) -> float | None:
+    """Segundos restantes até o deadline (None = sem limite)."""
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+class PoliticaOrcamento:
+    """
+    Tempo mínimo restante (s) para executar cada etapa opcional.
+    Abaixo do mínimo a etapa é pulada (ou reduzida) e a decisão vai para o rastro.
+
+    min_rerank: CrossEncoder; abaixo disso usa a ordem do Qdrant.
+    min_juiz: LLM‑as‑Judge; abaixo disso usa a ordem do CrossEncoder.
+    min_web: busca web (também limita o prazo da chamada ao Tavily).
+    min_contexto_completo: abaixo disso o contexto é comprimido para
+        `max_chars_reduzido` caracteres antes da geração final.
+    reserva_geracao: tempo reservado para a geração final ao calcular prazos.
+    """
+
+    def __init__(
+        self,
+        min_rerank: float = 1.5,
+        min_juiz: float = 6.0,
+        min_web: float = 6.0,
+        min_contexto_completo: float = 8.0,
+        max_chars_reduzido: int = 4000,
+        reserva_geracao: float = 4.0,
+    ):
+        self.min_rerank = min_rerank
+        self.min_juiz = min_juiz
+        self.min_web = min_web
+        self.min_contexto_completo = min_contexto_completo
+        self.max_chars_reduzido = max_chars_reduzido
+        self.reserva_geracao = reserva_geracao
+
+    def permite(self, deadline: float | None, minimo: float) -> bool:
+        falta = restante(deadline)
+        return falta is None or falta >= minimo
+
+
+POLITICA_PADRAO = PoliticaOrcamento()
@@ -0,0 +1,171 @@
+# utils/hedging.py
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.logs import logger
+from utils.metrics import metricas, percentil
+from utils.profiler import em_thread_perfilada
+
+
+class PoliticaHedge:
+    """
+    Política de requisições "hedged" para chamadas idempotentes: se a
+    resposta não chega em `atraso()` — o percentil `percentil` das latências
+    recentes de tentativas individuais —, uma duplicata é disparada e vale
+    a primeira resposta.
+
+    A carga extra é limitada: cada chamada credita `max_extra` (ex.: 0.05 =
+    até 5% de requisições a mais) e cada duplicata consome 1 crédito, com
+    acúmulo máximo de `rajada`. Até `min_amostras` latências, não há hedge.
+
+    A tentativa primária roda na própria thread de quem chama, exceto quando
+    uma duplicata pode ser emitida (há crédito): só então as tentativas vão
+    para threads da política, no máximo `max_paralelas` ao mesmo tempo —
+    contando as perdedoras, que não são canceladas (clientes síncronos) e
+    seguem até terminar. Sem vaga, a chamada segue na thread de quem chama.
+
+    Métricas: `{nome}.hedge.chamadas`, `.emitidos`, `.vencidos` (a duplicata
+    respondeu primeiro) e `.negados` (passou do atraso sem crédito ou vaga).
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        percentil: float = 95,
+        max_extra: float = 0.05,
+        rajada: float = 5.0,
+        min_amostras: int = 20,
+        atraso_min_s: float = 0.005,
+        janela: int = 512,
+        max_paralelas: int = 8,
+    ):
+        self.nome = nome
+        self.percentil = percentil
+        self.max_extra = max_extra
+        self.rajada = rajada
+        self.min_amostras = min_amostras
+        self.atraso_min_s = atraso_min_s
+        self._latencias = deque(maxlen=janela)
+        self._creditos = 0.0
+        self._lock = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(max_paralelas)
+        self._executor = ThreadPoolExecutor(max_workers=max_paralelas, thread_name_prefix=f"hedge-{nome}")
+
+    def registrar_latencia(self, duracao: float):
+        with self._lock:
+            self._latencias.append(duracao)
+
+    def atraso(self) -> float | None:
+        """Espera antes da duplicata; None enquanto não houver amostras suficientes."""
+        with self._lock:
+            if len(self._latencias) < self.min_amostras:
+                return None
+            amostras = sorted(self._latencias)
+        return max(self.atraso_min_s, percentil(amostras, self.percentil))
+
+    def creditar(self):
+        with self._lock:
+            self._creditos = min(self.rajada, self._creditos + self.max_extra)
+
+    def tem_credito(self) -> bool:
+        with self._lock:
+            return self._creditos >= 1.0 - 1e-9
+
+    def permitir_hedge(self) -> bool:
+        with self._lock:
+            if self._creditos >= 1.0 - 1e-9:
+                self._creditos -= 1.0
+                return True
+            return False
+
+    def _direta(self, funcao, args, kwargs, atraso):
+        """Tentativa única na thread de quem chama; só mede a latência."""
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.registrar_latencia(duracao)
+            if atraso is not None and duracao > atraso:
+                metricas.incrementar(f"{self.nome}.hedge.negados")
+
+    def _tentativa(self, funcao, args, kwargs):
+        """Tentativa em thread da política, ou None sem vaga livre."""
+        if not self._vagas.acquire(blocking=False):
+            return None
+        contexto = contextvars.copy_context()
+        inicio = time.perf_counter()
+
+        def executar():
+            try:
+                with em_thread_perfilada():
+                    return funcao(*args, **kwargs)
+            finally:
+                self.registrar_latencia(time.perf_counter() - inicio)
+                self._vagas.release()
+
+        return self._executor.submit(contexto.run, executar)
+
+    def executar(self, funcao, *args, **kwargs):
+        """Chama `funcao` com hedge; erros só sobem se nenhuma tentativa tiver sucesso."""
+        metricas.incrementar(f"{self.nome}.hedge.chamadas")
+        self.creditar()
+        atraso = self.atraso()
+
+        # Sem histórico ou sem crédito para uma duplicata: chamada direta, só para medir
+        if atraso is None or not self.tem_credito():
+            return self._direta(funcao, args, kwargs, atraso)
+        primaria = self._tentativa(funcao, args, kwargs)
+        if primaria is None:
+            return self._direta(funcao, args, kwargs, atraso)
+
+        concluidas, _ = wait([primaria], timeout=atraso)
+        if concluidas:
+            return primaria.result()
+
+        duplicata = self._tentativa(funcao, args, kwargs) if self.permitir_hedge() else None
+        if duplicata is None:
+            metricas.incrementar(f"{self.nome}.hedge.negados")
+            return primaria.result()
+
+        metricas.incrementar(f"{self.nome}.hedge.emitidos")
+        pendentes = {primaria, duplicata}
+        erro = None
+        while pendentes:
+            concluidas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidas:
+                if futuro.exception() is not None:
+                    erro = futuro.exception()
+                    continue
+                if futuro is duplicata:
+                    metricas.incrementar(f"{self.nome}.hedge.vencidos")
+                    logger.debug(f"🏁 Hedge {self.nome}: duplicata venceu após {atraso:.3f}s")
+                return futuro.result()
+        raise erro
+
+
+class ComHedge:
+    """
+    Proxy que passa os métodos listados pela PoliticaHedge. Demais
+    atributos são repassados (como LimitadoPorTaxa). Use só em chamadas
+    idempotentes: a duplicata repete a requisição inteira.
+    """
+
+    def __init__(self, alvo, politica: PoliticaHedge, metodos=("invoke",)):
+        self._alvo = alvo
+        self._politica = politica
+        self._metodos = set(metodos)
+
+    def __getattr__(self, nome):
+        attr = getattr(self._alvo, nome)
+        if nome not in self._metodos or not callable(attr):
+            return attr
+
+        def chamada(*args, **kwargs):
+            return self._politica.executar(attr, *args, **kwargs)
+
+        return chamada
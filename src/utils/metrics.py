@@ -0,0 +1,88 @@
+# utils/metrics.py
+
+import threading
+from collections import deque
+
+
+class Metricas:
+    """
+    Registro de métricas em memória (contadores, gauges e distribuições), thread-safe.
+    Distribuições guardam contagem/soma totais e as últimas `janela` amostras
+    para percentis.
+    Pensado para leitura via `snapshot()` em logs, benchmarks e na UI.
+    """
+
+    def __init__(self, janela: int = 1024):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._gauges = {}
+        self._distribuicoes = {}
+        self._janela = janela
+
+    def incrementar(self, nome: str, n: float = 1):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + n
+
+    def definir(self, nome: str, valor):
+        with self._lock:
+            self._gauges[nome] = valor
+
+    def observar(self, nome: str, valor: float):
+        with self._lock:
+            dist = self._distribuicoes.get(nome)
+            if dist is None:
+                dist = self._distribuicoes[nome] = {
+                    "count": 0, "soma": 0.0, "amostras": deque(maxlen=self._janela)
+                }
+            dist["count"] += 1
+            dist["soma"] += valor
+            dist["amostras"].append(valor)
+
+    def distribuicao(self, nome: str) -> dict:
+        """count, média, p50, p95, p99 e máximo (percentis sobre a janela recente)."""
+        with self._lock:
+            dist = self._distribuicoes.get(nome)
+            if not dist:
+                return {"count": 0, "media": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+            amostras = sorted(dist["amostras"])
+            count, soma = dist["count"], dist["soma"]
+        return {
+            "count": count,
+            "media": soma / count,
+            "p50": percentil(amostras, 50),
+            "p95": percentil(amostras, 95),
+            "p99": percentil(amostras, 99),
+            "max": amostras[-1],
+        }
+
+    def valor(self, nome: str, padrao=0):
+        with self._lock:
+            if nome in self._contadores:
+                return self._contadores[nome]
+            return self._gauges.get(nome, padrao)
+
+    def snapshot(self, prefixo: str = "") -> dict:
+        with self._lock:
+            dados = {**self._contadores, **self._gauges}
+            nomes_dist = list(self._distribuicoes)
+        for nome in nomes_dist:
+            dados[nome] = self.distribuicao(nome)
+        return {k: v for k, v in sorted(dados.items()) if k.startswith(prefixo)}
+
+    def resetar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._gauges.clear()
+            self._distribuicoes.clear()
+
+
+def percentil(valores_ordenados: list, p: float) -> float:
+    """Percentil por posição mais próxima (lista já ordenada)."""
+    if not valores_ordenados:
+        return 0.0
+    idx = min(len(valores_ordenados) - 1, max(0, int(round(p / 100 * len(valores_ordenados))) - 1))
+    return valores_ordenados[idx]
+
+
+# Registro global do processo
+metricas = Metricas()
@@ -0,0 +1,191 @@
+# utils/profiler.py
+
+import contextvars
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from utils.logs import logger
+from utils.tracing import registrar_decisao
+
+
+# Frames-folha de threads paradas esperando (fila, lock, socket): não gastam CPU
+_OCIOSAS = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+    ("thread.py", "_worker"),
+}
+
+# Threads da consulta perfilada: a que abriu o perfil e as que rodam trabalho
+# dela — em contexto copiado (nós do grafo, busca federada, hedge,
+# singleflight) ou em workers compartilhados (micro‑lotes, coalescência)
+_threads_perfil = contextvars.ContextVar("threads_perfil", default=None)
+
+PERFIS_CPU_DIR_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "perfis_cpu")
+
+
+def perfil_ativo() -> set | None:
+    """Threads do perfil ativo no contexto atual (None sem perfil), para repassar a workers compartilhados."""
+    return _threads_perfil.get()
+
+
+@contextmanager
+def em_thread_perfilada(*perfis):
+    """
+    Inclui a thread atual no perfil da consulta ativa — ou nos `perfis`
+    dados (de `perfil_ativo()` de quem pediu o trabalho) — enquanto o bloco roda.
+    """
+    alvos = [p for p in (perfis or (_threads_perfil.get(),)) if p is not None]
+    ident = threading.get_ident()
+    incluidos = [p for p in {id(p): p for p in alvos}.values() if ident not in p]
+    for threads in incluidos:
+        threads.add(ident)
+    try:
+        yield
+    finally:
+        for threads in incluidos:
+            threads.discard(ident)
+
+
+def _pilha(frame) -> list:
+    pilha = []
+    while frame is not None:
+        codigo = frame.f_code
+        pilha.append((os.path.basename(codigo.co_filename), codigo.co_name, frame.f_lineno))
+        frame = frame.f_back
+    pilha.reverse()
+    return pilha
+
+
+class Amostrador:
+    """
+    Amostrador de pilhas em thread própria: a cada `intervalo_ms` lê as pilhas
+    das threads em `threads` (conjunto de idents, atualizado por quem o
+    passou; None = todas as do processo) e acumula pilhas "dobradas"
+    (formato do flamegraph.pl / speedscope: "a;b;c <amostras>").
+
+    Threads ociosas são descartadas por padrão. O nome da thread abre cada pilha.
+    """
+
+    def __init__(self, intervalo_ms: float = 20.0, incluir_ociosas: bool = False, threads: set | None = None):
+        self.intervalo = intervalo_ms / 1000
+        self.incluir_ociosas = incluir_ociosas
+        self.threads = threads
+        self.pilhas = Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _loop(self):
+        proprio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            nomes = {t.ident: t.name for t in threading.enumerate()}
+            alvos = None if self.threads is None else tuple(self.threads)
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio or (alvos is not None and ident not in alvos):
+                    continue
+                pilha = _pilha(frame)
+                if not pilha:
+                    continue
+                if not self.incluir_ociosas and pilha[-1][:2] in _OCIOSAS:
+                    continue
+                dobrada = ";".join([nomes.get(ident, str(ident))] + [f"{a}:{f}" for a, f, _ in pilha])
+                self.pilhas[dobrada] += 1
+            self.amostras += 1
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._loop, name="amostrador-perfil", daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self) -> Counter:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        return self.pilhas
+
+    def dobradas(self) -> str:
+        return "\n".join(f"{pilha} {n}" for pilha, n in self.pilhas.most_common()) + "\n"
+
+
+class Perfilador:
+    """
+    Perfilamento opcional por consulta. Ativado por requisição (`forcar`) ou
+    por amostragem (`taxa` ∈ [0, 1]); grava `<diretorio>/<trace_id>.folded`
+    e mantém no máximo `max_arquivos` perfis (remove os mais antigos).
+    O arquivo gravado é registrado no rastro ativo.
+
+    Só entram as threads da consulta: a que abre o perfil e as registradas
+    por `em_thread_perfilada` (nós do grafo, workers de micro‑lotes...) — as
+    demais consultas do processo ficam de fora.
+    """
+
+    def __init__(self, diretorio: str = PERFIS_CPU_DIR_PADRAO, taxa: float = 0.0, intervalo_ms: float = 20.0, max_arquivos: int = 50):
+        self.diretorio = diretorio
+        self.taxa = taxa
+        self.intervalo_ms = intervalo_ms
+        self.max_arquivos = max_arquivos
+        self._lock = threading.Lock()
+
+    def deve_perfilar(self, forcar: bool = False) -> bool:
+        return forcar or (self.taxa > 0 and random.random() < self.taxa)
+
+    def _podar(self):
+        arquivos = [
+            os.path.join(self.diretorio, nome)
+            for nome in os.listdir(self.diretorio) if nome.endswith(".folded")
+        ]
+        arquivos.sort(key=os.path.getmtime)
+        for caminho in arquivos[:max(0, len(arquivos) - self.max_arquivos)]:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+    def gravar(self, amostrador: Amostrador, trace_id: str, duracao: float) -> str:
+        os.makedirs(self.diretorio, exist_ok=True)
+        seguro = re.sub(r"[^\w.-]", "_", trace_id)
+        caminho = os.path.join(self.diretorio, f"{seguro}.folded")
+        with self._lock:
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(amostrador.dobradas())
+            self._podar()
+        logger.info(f"🔬 Perfil {trace_id}: {amostrador.amostras} amostras em {duracao:.2f}s → {caminho}")
+        return caminho
+
+    @contextmanager
+    def perfilar(self, trace_id: str, forcar: bool = False):
+        """Perfila o bloco se ativado; devolve o caminho do arquivo (ou None) via `.caminho`."""
+        resultado = _ResultadoPerfil()
+        if not self.deve_perfilar(forcar):
+            yield resultado
+            return
+
+        threads = {threading.get_ident()}
+        token = _threads_perfil.set(threads)
+        amostrador = Amostrador(self.intervalo_ms, threads=threads).iniciar()
+        inicio = time.perf_counter()
+        try:
+            yield resultado
+        finally:
+            amostrador.parar()
+            _threads_perfil.reset(token)
+            duracao = time.perf_counter() - inicio
+            try:
+                resultado.caminho = self.gravar(amostrador, trace_id, duracao)
+                registrar_decisao("perfil", "gravado", arquivo=resultado.caminho, amostras=amostrador.amostras)
+            except OSError as e:
+                logger.warning(f"🔬 Falha ao gravar perfil {trace_id}: {e}")
+
+
+class _ResultadoPerfil:
+    caminho = None
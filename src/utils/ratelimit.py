@@ -0,0 +1,72 @@
+# utils/ratelimit.py
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe.
+    `taxa` = fichas repostas por segundo; `capacidade` = rajada máxima.
+    """
+
+    def __init__(self, taxa: float, capacidade: float | None = None):
+        if taxa <= 0:
+            raise ValueError("taxa deve ser positiva")
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade if capacidade is not None else max(1.0, taxa))
+        self._fichas = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def tentar(self, n: float = 1.0) -> bool:
+        """Consome `n` fichas se disponíveis, sem bloquear."""
+        with self._lock:
+            self._repor()
+            if self._fichas >= n:
+                self._fichas -= n
+                return True
+            return False
+
+    def adquirir(self, n: float = 1.0, reserva: float = 0.0):
+        """
+        Bloqueia até haver `n` fichas disponíveis. Com `reserva`, só consome
+        se sobrarem ao menos `reserva` fichas (guardadas para quem não a usa).
+        """
+        reserva = min(reserva, max(0.0, self.capacidade - n))
+        while True:
+            with self._lock:
+                self._repor()
+                if self._fichas >= n + reserva:
+                    self._fichas -= n
+                    return
+                espera = (n + reserva - self._fichas) / self.taxa
+            time.sleep(espera)
+
+
+class LimitadoPorTaxa:
+    """
+    Proxy que consome uma ficha do bucket antes de cada chamada aos
+    métodos listados do objeto embrulhado. Demais atributos são repassados.
+    """
+
+    def __init__(self, alvo, bucket: TokenBucket, metodos=("invoke",)):
+        self._alvo = alvo
+        self._bucket = bucket
+        self._metodos = set(metodos)
+
+    def __getattr__(self, nome):
+        attr = getattr(self._alvo, nome)
+        if nome not in self._metodos or not callable(attr):
+            return attr
+
+        def chamada(*args, **kwargs):
+            self._bucket.adquirir()
+            return attr(*args, **kwargs)
+
+        return chamada
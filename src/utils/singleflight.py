@@ -0,0 +1,124 @@
+# utils/singleflight.py
+
+import contextvars
+import threading
+
+from utils.logs import logger
+from utils.metrics import metricas
+from utils.profiler import em_thread_perfilada
+
+
+class Voo:
+    """
+    Uma execução em andamento compartilhada por várias requisições.
+    Guarda os tokens já emitidos (quem chega depois recebe o replay desde
+    o início) e o resultado ou erro final. `dados`: metadados do líder
+    (ex.: trace_id), visíveis às seguidoras desde a criação.
+    """
+
+    def __init__(self, chave: str, dados: dict | None = None):
+        self.chave = chave
+        self.dados = dict(dados or {})
+        self.tokens = []
+        self.resultado = None
+        self.erro = None
+        self.concluido = False
+        self.participantes = 1
+        self._cond = threading.Condition()
+
+    def emitir(self, token: str):
+        with self._cond:
+            self.tokens.append(token)
+            self._cond.notify_all()
+
+    def concluir(self, resultado=None, erro: Exception | None = None):
+        with self._cond:
+            self.resultado = resultado
+            self.erro = erro
+            self.concluido = True
+            self._cond.notify_all()
+
+    def acompanhar(self, timeout: float | None = None):
+        """Itera os tokens (replay + ao vivo) até a execução terminar."""
+        i = 0
+        while True:
+            with self._cond:
+                if i >= len(self.tokens) and not self.concluido:
+                    if not self._cond.wait(timeout):
+                        raise TimeoutError(f"Voo '{self.chave}' sem progresso em {timeout}s")
+                novos = self.tokens[i:]
+                fim = self.concluido
+            for token in novos:
+                yield token
+            i += len(novos)
+            if fim and i >= len(self.tokens):
+                return
+
+    def aguardar(self, timeout: float | None = None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.concluido, timeout):
+                raise TimeoutError(f"Voo '{self.chave}' não concluiu em {timeout}s")
+        if self.erro is not None:
+            raise self.erro
+        return self.resultado
+
+
+class SingleFlight:
+    """
+    Deduplica execuções idênticas em voo: a primeira requisição de uma chave
+    (líder) dispara `funcao(emitir)` em uma thread; as demais que chegam
+    antes do fim (seguidoras) recebem o mesmo Voo. Concluída a execução, a
+    chave é liberada — não é cache.
+
+    Métricas: `{nome}.execucoes`, `{nome}.colapsadas`.
+    """
+
+    def __init__(self, nome: str = "singleflight"):
+        self.nome = nome
+        self._em_voo = {}
+        self._lock = threading.Lock()
+
+    def iniciar(self, chave: str, funcao, dados: dict | None = None) -> tuple:
+        """
+        Retorna (voo, lider). `funcao` recebe o callback `emitir(token)`;
+        `dados` só valem quando a chamada cria o voo (líder).
+        """
+        with self._lock:
+            voo = self._em_voo.get(chave)
+            if voo is not None:
+                voo.participantes += 1
+                metricas.incrementar(f"{self.nome}.colapsadas")
+                logger.info(f"🛬 [{self.nome}] Execução compartilhada ({voo.participantes} participantes)")
+                return voo, False
+            voo = Voo(chave, dados)
+            self._em_voo[chave] = voo
+
+        metricas.incrementar(f"{self.nome}.execucoes")
+        # Copia o contexto para o rastro ativo do líder continuar valendo na thread
+        contexto = contextvars.copy_context()
+        threading.Thread(
+            target=contexto.run, args=(self._executar, voo, funcao),
+            name=f"singleflight-{self.nome}", daemon=True,
+        ).start()
+        return voo, True
+
+    def _executar(self, voo: Voo, funcao):
+        try:
+            with em_thread_perfilada():
+                resultado, erro = funcao(voo.emitir), None
+        except Exception as e:
+            logger.error(f"[{self.nome}] Falha na execução compartilhada: {e}")
+            resultado, erro = None, e
+        with self._lock:
+            if self._em_voo.get(voo.chave) is voo:
+                del self._em_voo[voo.chave]
+        voo.concluir(resultado, erro)
+
+    def executar(self, chave: str, funcao, timeout: float | None = None):
+        """Atalho bloqueante: retorna o resultado compartilhado."""
+        voo, _ = self.iniciar(chave, funcao)
+        return voo.aguardar(timeout)
+
+    def em_voo(self) -> int:
+        with self._lock:
+            return len(self._em_voo)
@@ -0,0 +1,76 @@
+# utils/tracing.py
+
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from utils.logs import logger
+
+
+class Rastro:
+    """
+    Rastro de uma consulta: trace_id, tempos por etapa (em segundos) e
+    eventos (decisões tomadas durante a execução, ex.: etapa pulada).
+    Fica ativo em um ContextVar durante a execução do grafo, de modo que
+    nodes e pipeline registram tempos sem precisar receber o objeto.
+    """
+
+    def __init__(self, trace_id: str | None = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.inicio = time.perf_counter()
+        self.timings = {}
+        self.eventos = []
+
+    def registrar_tempo(self, etapa: str, duracao: float):
+        self.timings[etapa] = self.timings.get(etapa, 0.0) + duracao
+
+    def registrar_evento(self, evento: dict):
+        self.eventos.append(evento)
+
+    def resumo(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "timings": {k: round(v, 4) for k, v in self.timings.items()},
+            "eventos": list(self.eventos),
+        }
+
+
+_rastro_atual: ContextVar = ContextVar("rastro_atual", default=None)
+
+
+def rastro_atual() -> Rastro | None:
+    return _rastro_atual.get()
+
+
+@contextmanager
+def ativar(rastro: Rastro):
+    """Ativa o rastro no contexto corrente até o fim do bloco."""
+    token = _rastro_atual.set(rastro)
+    try:
+        yield rastro
+    finally:
+        _rastro_atual.reset(token)
+
+
+@contextmanager
+def etapa(nome: str):
+    """
+    Mede a duração do bloco e registra no rastro ativo.
+    Sem rastro ativo, apenas executa o bloco.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        rastro = _rastro_atual.get()
+        if rastro is not None:
+            rastro.registrar_tempo(nome, time.perf_counter() - inicio)
+
+
+def registrar_decisao(etapa: str, decisao: str, **dados):
+    """Registra uma decisão (ex.: "pulada", "reduzida") no rastro ativo e no log."""
+    logger.info(f"🧭 [{etapa}] {decisao} {dados or ''}".rstrip())
+    rastro = _rastro_atual.get()
+    if rastro is not None:
+        rastro.registrar_evento({"etapa": etapa, "decisao": decisao, **dados})
@@ -0,0 +1,221 @@
+# utils/transporte.py
+
+import random
+import threading
+import time
+
+from utils.logs import logger
+from utils.metrics import metricas
+
+
+# Códigos HTTP que valem nova tentativa
+STATUS_TRANSITORIOS = (408, 429, 500, 502, 503, 504)
+
+_CLASSES_TRANSITORIAS = {
+    "TransportError",             # httpx (conexão, timeout, protocolo)
+    "ResponseHandlingException",  # qdrant_client (envolve erros de conexão)
+    "ConnectionError",            # requests / builtins
+    "Timeout",                    # requests
+    "TimeoutError",
+}
+
+_CODIGOS_GRPC_TRANSITORIOS = {"UNAVAILABLE", "DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED"}
+
+_nomes = set()
+_clientes = {}
+_lock = threading.Lock()
+
+
+def erro_transitorio(erro: Exception) -> bool:
+    """Falha de rede, timeout, 429/5xx ou gRPC UNAVAILABLE/DEADLINE_EXCEEDED."""
+    resposta = getattr(erro, "response", None)
+    status = getattr(erro, "status_code", None) or getattr(resposta, "status_code", None)
+    if isinstance(status, int):
+        return status in STATUS_TRANSITORIOS
+
+    codigo = getattr(erro, "code", None)
+    if callable(codigo):
+        try:
+            return getattr(codigo(), "name", str(codigo())) in _CODIGOS_GRPC_TRANSITORIOS
+        except Exception:
+            pass
+
+    return any(c.__name__ in _CLASSES_TRANSITORIAS for c in type(erro).__mro__)
+
+
+# ---------------------------------------------------------
+# Métricas de reuso de conexões
+# ---------------------------------------------------------
+def _registrar_nome(nome: str):
+    with _lock:
+        _nomes.add(nome)
+
+
+def _gancho_httpx(nome: str):
+    """Hook de requisição do httpx: conta requisições e conexões TCP novas (trace do httpcore)."""
+    def gancho(request):
+        metricas.incrementar(f"transporte.{nome}.requisicoes")
+        anterior = request.extensions.get("trace")
+
+        def trace(evento, info):
+            if evento == "connection.connect_tcp.complete":
+                metricas.incrementar(f"transporte.{nome}.conexoes_novas")
+            if anterior is not None:
+                anterior(evento, info)
+
+        request.extensions["trace"] = trace
+
+    return gancho
+
+
+def reuso_conexoes() -> dict:
+    """{nome: requisições, conexões novas e taxa de reuso} de cada transporte criado."""
+    with _lock:
+        nomes = sorted(_nomes)
+    resumo = {}
+    for nome in nomes:
+        requisicoes = metricas.valor(f"transporte.{nome}.requisicoes")
+        novas = metricas.valor(f"transporte.{nome}.conexoes_novas")
+        resumo[nome] = {
+            "requisicoes": requisicoes,
+            "conexoes_novas": novas,
+            "taxa_reuso": round(1 - novas / requisicoes, 4) if requisicoes else 0.0,
+            "retentativas": metricas.valor(f"transporte.{nome}.retentativas"),
+        }
+    return resumo
+
+
+# ---------------------------------------------------------
+# httpx (OpenAI, Qdrant REST)
+# ---------------------------------------------------------
+def pool_httpx(nome: str, max_conexoes: int = 20, keepalive: int = 10, expiracao_keepalive: float = 30.0) -> dict:
+    """
+    Argumentos de pool para um cliente httpx (`limits` e `event_hooks`),
+    para clientes que criam o próprio httpx.Client (ex.: QdrantClient).
+    """
+    import httpx
+
+    _registrar_nome(nome)
+    return {
+        "limits": httpx.Limits(
+            max_connections=max_conexoes,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=expiracao_keepalive,
+        ),
+        "event_hooks": {"request": [_gancho_httpx(nome)]},
+    }
+
+
+def cliente_httpx(nome: str, timeout: float = 30.0, conectar_s: float = 5.0, **pool):
+    """
+    httpx.Client com keep‑alive, prazos explícitos e métricas de reuso,
+    um por `nome` no processo (ex.: "openai", compartilhado por chat e embeddings).
+    Novas tentativas ficam com o cliente de cada serviço (SDK da OpenAI) ou
+    com `ComRetentativas`.
+    """
+    import httpx
+
+    with _lock:
+        cliente = _clientes.get(("httpx", nome))
+    if cliente is not None:
+        return cliente
+
+    cliente = httpx.Client(timeout=httpx.Timeout(timeout, connect=conectar_s), **pool_httpx(nome, **pool))
+    with _lock:
+        cliente = _clientes.setdefault(("httpx", nome), cliente)
+    logger.info(f"🔌 Transporte {nome}: httpx com keep‑alive (timeout {timeout}s)")
+    return cliente
+
+
+# ---------------------------------------------------------
+# requests (Tavily, IBGE)
+# ---------------------------------------------------------
+def sessao_http(nome: str, timeout: float = 15.0, tentativas: int = 3, backoff: float = 0.5, max_conexoes: int = 10):
+    """
+    requests.Session com pool keep‑alive, prazo padrão e novas tentativas com
+    backoff exponencial (urllib3 Retry) em erros de conexão e 429/5xx.
+    Uma por `nome` no processo.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    with _lock:
+        sessao = _clientes.get(("requests", nome))
+    if sessao is not None:
+        return sessao
+
+    class AdaptadorMedido(HTTPAdapter):
+        _conexoes = 0
+
+        def send(self, request, **kwargs):
+            metricas.incrementar(f"transporte.{nome}.requisicoes")
+            if kwargs.get("timeout") is None:
+                kwargs["timeout"] = timeout
+            try:
+                return super().send(request, **kwargs)
+            finally:
+                pools = self.poolmanager.pools
+                total = sum(pools[chave].num_connections for chave in list(pools.keys()))
+                if total > self._conexoes:
+                    metricas.incrementar(f"transporte.{nome}.conexoes_novas", total - self._conexoes)
+                    self._conexoes = total
+
+    class RetryMedido(Retry):
+        def increment(self, *args, **kwargs):
+            metricas.incrementar(f"transporte.{nome}.retentativas")
+            return super().increment(*args, **kwargs)
+
+    retry = RetryMedido(
+        total=tentativas - 1,
+        backoff_factor=backoff,
+        status_forcelist=STATUS_TRANSITORIOS,
+        allowed_methods=None,  # inclui POST: as chamadas feitas aqui são consultas idempotentes
+        raise_on_status=False,
+    )
+    adaptador = AdaptadorMedido(pool_connections=max_conexoes, pool_maxsize=max_conexoes, max_retries=retry)
+    sessao = requests.Session()
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+
+    _registrar_nome(nome)
+    with _lock:
+        sessao = _clientes.setdefault(("requests", nome), sessao)
+    return sessao
+
+
+# ---------------------------------------------------------
+# Novas tentativas para clientes sem retry próprio (Qdrant)
+# ---------------------------------------------------------
+class ComRetentativas:
+    """
+    Proxy que repete os métodos listados em erro transitório
+    (`erro_transitorio`), com backoff exponencial e jitter.
+    Demais atributos são repassados (como LimitadoPorTaxa).
+    """
+
+    def __init__(self, alvo, nome: str, tentativas: int = 3, backoff: float = 0.2, metodos=("invoke",)):
+        self._alvo = alvo
+        self._nome = nome
+        self._tentativas = max(1, tentativas)
+        self._backoff = backoff
+        self._metodos = set(metodos)
+
+    def __getattr__(self, nome):
+        attr = getattr(self._alvo, nome)
+        if nome not in self._metodos or not callable(attr):
+            return attr
+
+        def chamada(*args, **kwargs):
+            for tentativa in range(1, self._tentativas + 1):
+                try:
+                    return attr(*args, **kwargs)
+                except Exception as e:
+                    if tentativa == self._tentativas or not erro_transitorio(e):
+                        raise
+                    espera = self._backoff * 2 ** (tentativa - 1) * random.uniform(0.5, 1.5)
+                    metricas.incrementar(f"transporte.{self._nome}.retentativas")
+                    logger.warning(f"🔌 {self._nome}.{nome} falhou ({type(e).__name__}); nova tentativa em {espera:.2f}s")
+                    time.sleep(espera)
+
+        return chamada